@@ -1,41 +1,38 @@
 # admin.py
 
+import time
 import streamlit as st
 import pandas as pd
-import os
 
-# Import the pipeline function
-from functions.sim_prep import run_sim_prep
-from functions.sim_prep.config import OUTPUT_FILE, PENDING_FILE
-from functions.sim_prep.name_mapping import append_name_mapping
-
-
-def load_pending_approvals():
-    if not os.path.exists(PENDING_FILE) or os.path.getsize(PENDING_FILE) == 0:
-        return pd.DataFrame(columns=["raw_name", "cand1", "score1", "cand2", "score2", "cand3", "score3"])
-    return pd.read_csv(PENDING_FILE)
-
-
-def remove_pending(raw_name):
-    if not os.path.exists(PENDING_FILE):
-        return
-    df = pd.read_csv(PENDING_FILE)
-    df = df[df["raw_name"] != raw_name]
-    df.to_csv(PENDING_FILE, index=False)
+# Sim prep runs as a background job
+from functions import app_cache
+from functions.jobs import get_runner
+from functions.sim_prep.config import CONTEXT_FILE, configure_logging
+from functions.sim_prep.name_mapping import export_name_mapping_csv
+from functions.sim_prep.name_store import approve_mapping
 
 
 def main():
     st.title("Admin Panel")
 
+    runner = get_runner()
+    if "sim_prep_job" not in st.session_state:
+        st.session_state["sim_prep_job"] = None
+
     # 1) Button to run sim prep
     if st.button("Run Sim Prep"):
+        # Writes data/sim_ready.csv (changed rows only)
+        st.session_state["sim_prep_job"] = runner.submit_sim_prep().key
+
+    job = runner.get(st.session_state["sim_prep_job"]) if st.session_state["sim_prep_job"] else None
+    if job is not None and job.status == "done":
         try:
-            df = run_sim_prep()  # Writes data/sim_ready.csv
+            df = app_cache.job_result(job)
             st.success("Sim prep complete! Wrote data/sim_ready.csv.")
 
             # Display match count confirmation
-            context_matches = len(df) // 2
-            prepped_matches = len(pd.read_csv(OUTPUT_FILE)) // 2
+            context_matches = len(app_cache.load_csv(CONTEXT_FILE)) // 2
+            prepped_matches = len(df) // 2
             if context_matches == prepped_matches:
                 st.success(f"Match count validation passed. Matches: {context_matches}")
             else:
@@ -53,13 +50,15 @@ def main():
             else:
                 st.dataframe(df_estimated)
 
-        except ValueError as e:
-            st.error(f"Error during sim prep: {e}")
         except Exception as e:
             st.error(f"Unexpected error: {e}")
+    elif job is not None and job.status == "failed":
+        st.error(f"Error during sim prep: {job.error}")
+    elif job is not None:
+        st.write("Running sim prep...")
 
     st.header("Pending Fuzzy Matches")
-    df_pending = load_pending_approvals()
+    df_pending = app_cache.load_pending()
     if df_pending.empty:
         st.write("No pending approvals.")
     else:
@@ -83,15 +82,35 @@ def main():
 
             if st.button(f"Approve {raw_name}", key=f"approve_{raw_name}"):
                 if choice == "No Match/Ignore":
+                    approve_mapping(raw_name, None)
                     st.write("No match chosen. Stats remain estimated.")
                 else:
                     chosen_name = choice.split(" (score=")[0]
-                    append_name_mapping(raw_name, chosen_name)
+                    approve_mapping(raw_name, chosen_name)
                     st.success(f"Saved mapping: {raw_name} -> {chosen_name}")
 
-                remove_pending(raw_name)
-                st.experimental_rerun()
+                # Mappings changed: drop cached pending/mapping views
+                app_cache.invalidate("pending")
+                app_cache.invalidate("mapping")
+
+                st.rerun()
+
+    st.header("Name Mappings")
+    mapping = app_cache.load_mapping()
+    if mapping:
+        st.dataframe(pd.DataFrame(sorted(mapping.items()), columns=["raw_name", "approved_name"]))
+    else:
+        st.write("No name mappings yet.")
+    if st.button("Export mappings to CSV"):
+        path = export_name_mapping_csv()
+        st.success(f"Wrote {path}.")
+
+    # Poll a running sim prep job
+    if job is not None and not job.done:
+        time.sleep(1)
+        st.rerun()
 
 
 if __name__ == "__main__":
+    configure_logging()
     main()
@@ -1,12 +1,18 @@
 # streamlit_app.py
 
+import time
 import streamlit as st
-import pandas as pd
-import csvs.tennis_sim.data_preparation as data_preparation
-import csvs.tennis_sim.simulation as simulation
+from functions import app_cache
+from functions.jobs import get_runner
+from functions.sim_prep.config import configure_logging
+
+configure_logging()
 
 st.title("Tennis Simulation Web App")
 
+# Prep and simulation run on a shared process pool; reruns only poll them
+runner = get_runner()
+
 # Keep some placeholders for global data
 if "cleaned_df" not in st.session_state:
     st.session_state["cleaned_df"] = None
@@ -14,6 +20,10 @@ if "cleaned_df" not in st.session_state:
 if "sim_results" not in st.session_state:
     st.session_state["sim_results"] = None
 
+for job_slot in ("prep_job", "sim_job"):
+    if job_slot not in st.session_state:
+        st.session_state[job_slot] = None
+
 st.header("Data Preparation")
 raw_file_path = st.text_input("Raw DFS CSV path", value="csvs/pool_sample.csv")
 atp_path = st.text_input("ATP Stats path", value="csvs/atp.csv")
@@ -22,35 +32,63 @@ wta_path = st.text_input("WTA Stats path", value="csvs/wta.csv")
 do_fuzzy = st.checkbox("Fuzzy Match with Stats?", value=True)
 
 if st.button("Run Data Prep"):
-    st.write("Running data prep...")
-    df = data_preparation.load_and_clean_data(
-        raw_csv_path=raw_file_path,
-        atp_file=atp_path,
-        wta_file=wta_path,
-        do_fuzzy_match=do_fuzzy,
-        threshold=90,
-        potential_warn=75
-    )
-
-    # Deduplicate matches
-    df = data_preparation.deduplicate_matches(df)
-
-    st.session_state["cleaned_df"] = df
-    st.write("Data prep complete. Here's a preview:")
-    st.dataframe(df.head(10))
+    job = runner.submit_data_prep(raw_file_path, atp_path, wta_path, do_fuzzy_match=do_fuzzy)
+    st.session_state["prep_job"] = job.key
+
+prep_job = runner.get(st.session_state["prep_job"]) if st.session_state["prep_job"] else None
+if prep_job is not None:
+    if prep_job.status == "done":
+        df = app_cache.job_result(prep_job)
+        st.session_state["cleaned_df"] = df
+        st.write("Data prep complete. Here's a preview:")
+        st.dataframe(df.head(10))
+    elif prep_job.status == "failed":
+        st.error(f"Data prep failed: {prep_job.error}")
+    else:
+        st.write("Running data prep...")
 
 st.header("Simulation")
+n_sims = st.number_input("Simulations", min_value=1, max_value=1_000_000, value=10000, step=1000)
+reuse_matches = st.checkbox("Only resimulate changed matches", value=True)
 if st.button("Run Simulation"):
     if st.session_state["cleaned_df"] is not None:
-        st.write("Simulating matches...")
-        sim_df = simulation.simulate_all_matches(st.session_state["cleaned_df"])
-        st.session_state["sim_results"] = sim_df
-        st.write("Simulation complete! Here's a preview:")
-        st.dataframe(sim_df.head(10))
+        job = runner.submit_simulation(st.session_state["cleaned_df"], int(n_sims), reuse_matches)
+        st.session_state["sim_job"] = job.key
     else:
         st.warning("No cleaned data found. Please run data prep first.")
 
+sim_job = runner.get(st.session_state["sim_job"]) if st.session_state["sim_job"] else None
+if sim_job is not None:
+    if sim_job.status == "done":
+        results = app_cache.job_result(sim_job)
+        # Keep only the path; results are read lazily from disk
+        st.session_state["sim_results"] = results.path
+        st.write("Simulation complete! Here's a preview:")
+        st.dataframe(results.to_long_frame(slice(0, 1)))
+    elif sim_job.status == "failed":
+        st.error(f"Simulation failed: {sim_job.error}")
+    else:
+        st.write("Simulating matches...")
+        st.progress(sim_job.progress)
+        partial = sim_job.partial_percentiles()
+        if partial is not None:
+            st.write("Running player statistics:")
+            st.dataframe(partial)
+
 st.header("Results")
 if st.session_state["sim_results"] is not None:
-    st.write("Final simulation results:")
-    st.dataframe(st.session_state["sim_results"])
+    results = app_cache.sim_results(st.session_state["sim_results"])
+    st.write(f"{results.n_sims} simulations of {len(results.categories)} players.")
+    stats = app_cache.sim_stats(results.path)
+    st.write("Player statistics:")
+    st.dataframe(stats.summary())
+    st.write("Score correlations:")
+    st.dataframe(stats.correlation_frame().round(3))
+    first_sim = st.number_input("Show simulations from", min_value=0,
+                                max_value=max(results.n_sims - 1, 0), value=0, step=100)
+    st.dataframe(results.to_long_frame(slice(int(first_sim), int(first_sim) + 100)))
+
+# Poll running jobs without blocking other sessions
+if any(job is not None and not job.done for job in (prep_job, sim_job)):
+    time.sleep(1)
+    st.rerun()
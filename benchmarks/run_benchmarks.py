@@ -0,0 +1,209 @@
+# benchmarks/run_benchmarks.py
+"""
+Times each pipeline stage on a synthetic slate and compares the run against
+a stored JSON baseline.
+
+    python -m benchmarks.run_benchmarks --matches 16 --sims 10000
+    python -m benchmarks.run_benchmarks --matches 500 --sims 100000 --stages simulate
+    python -m benchmarks.run_benchmarks --save-baseline
+
+Each stage records wall time (best of --repeat), throughput and peak traced
+memory. Results are keyed by slate size, so a baseline only compares
+against runs of the same shape. Exits 1 when a stage is slower than the
+baseline by more than --tolerance (and by at least --min-delta seconds).
+"""
+
+import argparse
+import contextlib
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from benchmarks.synthetic import make_events, make_slate
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_FILE = os.path.join(ROOT, "benchmarks", "baseline.json")
+STAGES = ["sim_prep", "data_prep", "simulate", "simulate_batch", "simulate_canonical",
+          "scoring", "scoring_array"]
+
+
+@contextlib.contextmanager
+def slate_workdir(pool_df, context_df):
+    """
+    Temporary working directory laid out like the repo (csvs/, data/), so
+    stages that use the relative paths from sim_prep.config run unchanged.
+    """
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="tennis_bench_")
+    try:
+        os.makedirs(os.path.join(workdir, "csvs"))
+        os.makedirs(os.path.join(workdir, "data"))
+        for name in ("atp.csv", "wta.csv"):
+            shutil.copy(os.path.join(ROOT, "csvs", name), os.path.join(workdir, "csvs", name))
+        pool_df.to_csv(os.path.join(workdir, "csvs", "pool.csv"), index=False)
+        context_df.to_csv(os.path.join(workdir, "data", "match_context.csv"), index=False)
+        os.chdir(workdir)
+        yield workdir
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def measure(fn, repeat, setup=None):
+    """
+    Best wall time over `repeat` runs and peak traced memory of one run.
+    setup() runs before every timed call (e.g. to clear caches).
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak / 2**20
+
+
+def run_stages(n_matches, n_sims, stages, repeat, seed):
+    from functions.sim_prep.stats_db import load_stats_store
+
+    universe = load_stats_store(os.path.join(ROOT, "csvs", "atp.csv"),
+                                os.path.join(ROOT, "csvs", "wta.csv")).players()
+    pool_df, context_df = make_slate(n_matches, universe, seed)
+    results = {}
+
+    with slate_workdir(pool_df, context_df) as workdir:
+        from functions import pool_prep, sim
+        from functions.dk_scoring import calculate_draftkings_points, calculate_draftkings_points_array
+        from functions.sim_prep import run_sim_prep
+
+        def cold_sim_prep():
+            # every timed sim prep starts from empty caches and mappings
+            shutil.rmtree(os.path.join(workdir, "data", "cache"), ignore_errors=True)
+            for name in os.listdir(os.path.join(workdir, "data")):
+                if name.startswith("names.db") or name == "pending_approvals.csv":
+                    os.remove(os.path.join(workdir, "data", name))
+
+        def data_prep():
+            df = pool_prep.load_and_clean_data("csvs/pool.csv")
+            return pool_prep.deduplicate_matches(df)
+
+        sim_df = data_prep()
+        sim_df["Elo"] = None
+        n_events = n_sims * 2 * n_matches
+        scalar_events = min(n_events, 20000)
+        events = make_events(n_events, seed)
+
+        def score_scalar():
+            keys = list(events)
+            for i in range(scalar_events):
+                calculate_draftkings_points({k: events[k][i] for k in keys})
+
+        plan = {
+            "sim_prep": (run_sim_prep, 2 * n_matches, "players", cold_sim_prep),
+            "data_prep": (data_prep, 2 * n_matches, "rows", None),
+            "simulate": (lambda: sim.simulate_all_matches(sim_df), len(sim_df), "match_sims", None),
+            "simulate_batch": (lambda: sim.simulate_all_matches_batch(sim_df, n_sims, rng=seed),
+                               n_sims * len(sim_df), "match_sims", None),
+            "simulate_canonical": (lambda: sim.simulate_all_matches_batch(sim_df, n_sims, rng=seed,
+                                                                          mode="canonical"),
+                                   n_sims * len(sim_df), "match_sims", None),
+            "scoring": (score_scalar, scalar_events, "events", None),
+            "scoring_array": (lambda: calculate_draftkings_points_array(events), n_events, "events", None),
+        }
+        for stage in stages:
+            fn, items, unit, setup = plan[stage]
+            seconds, peak_mb = measure(fn, repeat, setup)
+            results[stage] = {
+                "seconds": round(seconds, 6),
+                "throughput": round(items / seconds, 1),
+                "unit": f"{unit}/s",
+                "peak_mb": round(peak_mb, 2),
+            }
+            print(f"{stage:18s} {seconds:10.4f}s  {items / seconds:14,.0f} {unit}/s  "
+                  f"peak {peak_mb:8.1f} MB")
+    return results
+
+
+def compare(results, baseline, tolerance, min_delta):
+    """
+    Print time ratios against the baseline; return the regressed stages.
+    Slowdowns under min_delta seconds are treated as timer noise.
+    """
+    regressions = []
+    for stage, current in results.items():
+        reference = baseline.get(stage)
+        if reference is None:
+            print(f"{stage:18s} (no baseline)")
+            continue
+        ratio = current["seconds"] / reference["seconds"]
+        flag = ""
+        if ratio > 1 + tolerance and current["seconds"] - reference["seconds"] > min_delta:
+            flag = "  REGRESSION"
+            regressions.append(stage)
+        print(f"{stage:18s} {ratio:6.2f}x baseline time, "
+              f"peak {current['peak_mb']:.1f} vs {reference['peak_mb']:.1f} MB{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--matches", type=int, default=16, help="matches per slate (up to 500)")
+    parser.add_argument("--sims", type=int, default=10000, help="simulations for batch stages (up to 100000)")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown (0.25 = 25%%)")
+    parser.add_argument("--min-delta", type=float, default=0.01,
+                        help="ignore slowdowns smaller than this many seconds")
+    parser.add_argument("--output", help="also write this run's results to a JSON file")
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.INFO)
+    key = f"matches={args.matches},sims={args.sims}"
+    print(f"Benchmarking {key}")
+    results = run_stages(args.matches, args.sims, args.stages, args.repeat, args.seed)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({key: results}, f, indent=2)
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baselines = json.load(f)
+
+    if args.save_baseline:
+        baselines.setdefault(key, {}).update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        print(f"Saved baseline for {key} to {args.baseline}")
+        return 0
+
+    if key not in baselines:
+        print(f"No baseline for {key}; run with --save-baseline to create one.")
+        return 0
+    regressions = compare(results, baselines[key], args.tolerance, args.min_delta)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
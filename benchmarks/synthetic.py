@@ -0,0 +1,89 @@
+# benchmarks/synthetic.py
+
+import numpy as np
+import pandas as pd
+
+SURFACES = ["Hard", "Clay", "Grass"]
+
+
+def _misspell(name, rng):
+    """Drop or swap one character so the name needs fuzzy matching."""
+    chars = list(name)
+    i = int(rng.integers(1, len(chars) - 1))
+    if rng.random() < 0.5:
+        del chars[i]
+    else:
+        chars[i], chars[i + 1] = chars[i + 1], chars[i]
+    return "".join(chars)
+
+
+def make_slate(n_matches, universe, seed=0, exact_share=0.6, fuzzy_share=0.3):
+    """
+    Synthetic slate shaped like csvs/pool.csv and data/match_context.csv.
+
+    Player names are drawn from the stats universe: exact_share of them as-is,
+    fuzzy_share misspelled, the rest invented (so they get estimated stats).
+    Returns (pool_df, context_df).
+    """
+    rng = np.random.default_rng(seed)
+    n_players = 2 * n_matches
+    picks = rng.choice(len(universe), size=min(n_players, len(universe)), replace=False)
+    names = []
+    for k in range(n_players):
+        roll = rng.random()
+        if k < len(picks) and roll < exact_share:
+            names.append(universe[picks[k]])
+        elif k < len(picks) and roll < exact_share + fuzzy_share:
+            names.append(_misspell(universe[picks[k]], rng))
+        else:
+            names.append(f"Player{k} Synthetic{k}")
+    # Keep names unique across the slate
+    names = [n if names.index(n) == k else f"{n} {k}" for k, n in enumerate(names)]
+
+    surfaces = rng.choice(SURFACES, size=n_matches)
+    win_pct = rng.integers(10, 91, size=n_matches)
+    salaries = (rng.integers(40, 121, size=n_players) * 100).astype(int)
+
+    pool_rows, context_rows = [], []
+    for m in range(n_matches):
+        a, b = names[2 * m], names[2 * m + 1]
+        last_a, last_b = a.split()[-1], b.split()[-1]
+        hour = 10 + m % 9
+        game_info = f"{last_b}@{last_a} 03/21/2023 {hour:02d}:{15 * (m % 4):02d}PM ET"
+        for k, (name, last, pct) in enumerate(((a, last_a, win_pct[m]), (b, last_b, 100 - win_pct[m]))):
+            player_id = 27000000 + 2 * m + k
+            pool_rows.append({
+                "Position": "P",
+                "Name + ID": f"{name} ({player_id})",
+                "Name": name,
+                "ID": player_id,
+                "Roster Position": "P",
+                "Salary": salaries[2 * m + k],
+                "Game Info": game_info,
+                "TeamAbbrev": last,
+                "AvgPointsPerGame": round(float(rng.uniform(20, 60)), 2),
+            })
+            context_rows.append({
+                "Name": name,
+                "Opponent": b if k == 0 else a,
+                "Surface": surfaces[m],
+                "ImpliedWinPercentage": int(pct),
+            })
+    return pd.DataFrame(pool_rows), pd.DataFrame(context_rows)
+
+
+def make_events(n, seed=0):
+    """Random DK event counts (dict of arrays) for the scoring benchmarks."""
+    rng = np.random.default_rng(seed)
+    return {
+        'games_won': rng.integers(0, 20, n, dtype=np.int16),
+        'games_lost': rng.integers(0, 20, n, dtype=np.int16),
+        'sets_won': rng.integers(0, 3, n, dtype=np.int16),
+        'sets_lost': rng.integers(0, 3, n, dtype=np.int16),
+        'match_won': rng.integers(0, 2, n, dtype=np.int16),
+        'aces': rng.integers(0, 15, n, dtype=np.int16),
+        'double_faults': rng.integers(0, 6, n, dtype=np.int16),
+        'breaks': rng.integers(0, 6, n, dtype=np.int16),
+        'clean_sets': rng.integers(0, 2, n, dtype=np.int16),
+        'straight_sets': rng.integers(0, 2, n).astype(bool),
+    }
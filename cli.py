@@ -0,0 +1,195 @@
+# cli.py
+"""
+Headless pipeline runner for cron jobs and late swap, without Streamlit.
+
+    python cli.py run                               # prep -> sim -> optimize -> export
+    python cli.py run --stages sim,optimize --sims 50000 --lineups 20
+    python cli.py run --dry-run                     # print the plan, run nothing
+    python cli.py config                            # settings in effect
+
+Defaults come from functions/sim_prep/config.py, which reads a config file
+(SIM_PREP_CONFIG=path.toml|json) and SIM_PREP_<NAME> environment variables.
+pandas, NumPy and rapidfuzz are imported only by the stages that run, so
+--help, config and --dry-run start instantly.
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+STAGES = ["prep", "sim", "optimize", "export"]
+
+LINEUPS_FILE = "lineups.csv"
+UPLOAD_FILE = "dk_upload.csv"
+
+
+# ---------------------------------------------------------------------------
+# Stages
+# ---------------------------------------------------------------------------
+
+def run_prep(args, config):
+    from functions.sim_prep import run_sim_prep
+
+    df = run_sim_prep(incremental=not args.full_prep)
+    return f"{len(df)} rows in {config.OUTPUT_FILE}"
+
+
+def run_sim(args, config):
+    import pandas as pd
+
+    df = pd.read_csv(config.OUTPUT_FILE)
+    if args.reuse_matches:
+        from functions.sim_cache import simulate_to_disk_cached
+        results = simulate_to_disk_cached(df, args.sims, args.results_dir, seed=args.seed,
+                                          engine=args.engine)
+    else:
+        from functions.sim import simulate_to_disk
+        results = simulate_to_disk(df, args.sims, args.results_dir, rng=args.seed,
+                                   engine=args.engine, mode=args.mode)
+    return f"{results.n_sims} sims of {len(results.categories)} players in {results.path}"
+
+
+def run_optimize(args, config):
+    from functions.opto import build_lineups, load_pool
+    from functions.sim_results import SimResults
+
+    pool = load_pool(args.pool)
+    projections = SimResults(args.results_dir).projections(args.stat)
+    lineups = build_lineups(pool, projections, n_lineups=args.lineups)
+    os.makedirs(args.export_dir, exist_ok=True)
+    path = os.path.join(args.export_dir, LINEUPS_FILE)
+    lineups.to_csv(path, index=False)
+    return f"{len(lineups)} lineups in {path}"
+
+
+def run_export(args, config):
+    import pandas as pd
+    from functions.opto import ROSTER_POSITION
+
+    lineups = pd.read_csv(os.path.join(args.export_dir, LINEUPS_FILE))
+    slots = [c for c in lineups.columns if c.startswith("P") and c[1:].isdigit()]
+    upload = lineups[slots]
+    # DraftKings upload header: one roster position per slot
+    upload.columns = [ROSTER_POSITION] * len(slots)
+    path = os.path.join(args.export_dir, UPLOAD_FILE)
+    upload.to_csv(path, index=False)
+    return f"{len(upload)} entries in {path}"
+
+
+_RUNNERS = {
+    "prep": run_prep,
+    "sim": run_sim,
+    "optimize": run_optimize,
+    "export": run_export,
+}
+
+
+# ---------------------------------------------------------------------------
+# Commands
+# ---------------------------------------------------------------------------
+
+def parse_stages(value):
+    stages = [s.strip() for s in value.split(",") if s.strip()]
+    unknown = [s for s in stages if s not in STAGES]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown stage(s) {', '.join(unknown)}; "
+                                         f"choose from {', '.join(STAGES)}")
+    # Always run in pipeline order
+    return [s for s in STAGES if s in stages]
+
+
+def cmd_run(args, config):
+    args.results_dir = args.results_dir or config.SIM_RESULTS_DIR
+    args.export_dir = args.export_dir or config.EXPORT_DIR
+    args.pool = args.pool or config.POOL_FILE
+    args.sims = args.sims or config.N_SIMS
+    args.lineups = args.lineups or config.N_LINEUPS
+
+    if args.dry_run:
+        for stage in args.stages:
+            print(f"would run {stage}")
+        return 0
+
+    for stage in args.stages:
+        start = time.perf_counter()
+        try:
+            summary = _RUNNERS[stage](args, config)
+        except Exception as e:
+            logging.error("Stage %s failed: %s", stage, e)
+            if args.debug:
+                raise
+            return 1
+        logging.info("%s: %s (%.2fs)", stage, summary, time.perf_counter() - start)
+
+    if args.metrics:
+        from functions import metrics
+        logging.info("Metrics written to %s", metrics.write_json(args.metrics))
+    return 0
+
+
+def cmd_config(args, config):
+    for name, value in config.settings().items():
+        print(f"{name} = {value!r}")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="cli.py", description="Run the tennis DFS pipeline without Streamlit."
+    )
+    parser.add_argument("--debug", action="store_true",
+                        help="debug logging, and tracebacks on failure")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run pipeline stages")
+    run.add_argument("--stages", type=parse_stages, default=list(STAGES),
+                     help=f"comma-separated subset of {','.join(STAGES)} (default: all)")
+    run.add_argument("--dry-run", action="store_true", help="print the stages and exit")
+    run.add_argument("--full-prep", action="store_true",
+                     help="recompute every sim prep row instead of only changed ones")
+    run.add_argument("--sims", type=int, help="number of simulations (config N_SIMS)")
+    run.add_argument("--seed", type=int, default=None, help="random seed")
+    run.add_argument("--engine", choices=["poisson", "points", "table"], default="poisson")
+    run.add_argument("--mode", choices=["vectorized", "canonical"], default="vectorized")
+    run.add_argument("--reuse-matches", action="store_true",
+                     help="only resimulate matches whose inputs changed (sim cache; "
+                          "poisson / points engine, vectorized mode)")
+    run.add_argument("--results-dir", help="simulation results directory (config SIM_RESULTS_DIR)")
+    run.add_argument("--pool", help="DraftKings pool CSV (config POOL_FILE)")
+    run.add_argument("--lineups", type=int, help="number of lineups (config N_LINEUPS)")
+    run.add_argument("--stat", default="mean",
+                     help="projection to optimize: mean, median or e.g. p90")
+    run.add_argument("--export-dir", help="where lineups are written (config EXPORT_DIR)")
+    run.add_argument("--metrics", metavar="PATH", help="write stage metrics JSON to PATH")
+    run.set_defaults(func=cmd_run)
+
+    show = commands.add_parser("config", help="print the settings in effect")
+    show.set_defaults(func=cmd_config)
+    return parser
+
+
+def check_args(parser, args):
+    """Reject option combinations a stage cannot honour, before anything runs."""
+    if getattr(args, "reuse_matches", False):
+        # The sim cache stores per-match Monte Carlo draws (sim_cache.py)
+        if args.engine == "table":
+            parser.error("--reuse-matches supports --engine poisson or points, not table")
+        if args.mode != "vectorized":
+            parser.error("--reuse-matches simulates every match on its own; "
+                         "--mode canonical is not supported")
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    check_args(parser, args)
+    from functions.sim_prep import config
+
+    config.configure_logging(logging.DEBUG if args.debug else None)
+    return args.func(args, config)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,2 @@
+# conftest.py
+# Makes the repo root importable ("functions....") when pytest runs the tests.
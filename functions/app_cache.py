@@ -0,0 +1,99 @@
+# app_cache.py
+
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from functions.sim_prep import name_store
+from functions.sim_results import SimResults
+
+# Shared by every session of the app and admin pages in this process:
+# {(kind, args) -> (version, value)}. An entry is reused while its version
+# (file mtime/size, database revision) is unchanged; past MAX_ENTRIES the
+# least recently used entries are dropped (old result paths, job keys).
+MAX_ENTRIES = 64
+_CACHE = OrderedDict()
+_LOCK = threading.Lock()
+
+
+def _file_version(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _cached(kind, args, version, compute):
+    key = (kind, args)
+    with _LOCK:
+        hit = _CACHE.get(key)
+        if hit is not None and hit[0] == version:
+            _CACHE.move_to_end(key)
+            return hit[1]
+    value = compute()
+    with _LOCK:
+        _CACHE[key] = (version, value)
+        _CACHE.move_to_end(key)
+        while len(_CACHE) > MAX_ENTRIES:
+            _CACHE.popitem(last=False)
+    return value
+
+
+def invalidate(kind=None):
+    """
+    Drop cached entries (all, or one kind such as 'pending'). Call after
+    writes the version checks can't see, e.g. right after an approval.
+    """
+    with _LOCK:
+        for key in [k for k in _CACHE if kind is None or k[0] == kind]:
+            del _CACHE[key]
+
+
+def load_csv(path):
+    """
+    DataFrame of a CSV (pool files, match context, sim_ready), re-read only
+    when the file changes. Returns a copy, so callers may modify it.
+    """
+    return _cached("csv", path, _file_version(path), lambda: pd.read_csv(path)).copy()
+
+
+def load_pending():
+    """Pending approvals, re-read when the names database changes."""
+    return _cached("pending", None, name_store.revision(), name_store.load_pending).copy()
+
+
+def load_mapping():
+    """{raw_name -> approved_name}, re-read when the names database changes."""
+    return dict(_cached("mapping", None, name_store.revision(), name_store.load_mapping))
+
+
+def sim_results(path):
+    """SimResults reader, refreshed when the run writes more rows."""
+    meta = os.path.join(path, "meta.json")
+    return _cached("sim_results", path, _file_version(meta), lambda: SimResults(path))
+
+
+def sim_stats(path):
+    """SimResults.stats (summary moments, correlations), once per results version."""
+    meta = os.path.join(path, "meta.json")
+    return _cached("stats", path, _file_version(meta), lambda: sim_results(path).stats())
+
+
+def job_result(job):
+    """
+    A finished job's output, loaded once per job (prep DataFrames are
+    returned as copies).
+    """
+    if job.kind == "simulation":
+        return sim_results(job.result().path)
+    result = os.path.join(job.path, "result.pkl")
+
+    def load():
+        with open(result, "rb") as f:
+            return pickle.load(f)
+
+    return _cached("job", job.key, _file_version(result), load).copy()
@@ -0,0 +1,285 @@
+# contest_sim.py
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+from functions.lineup_eval import pool_score_matrix
+from functions.opto import ROSTER_SIZE, SALARY_CAP
+from functions.sim_results import SimResults
+
+DEFAULT_FIELD_SIZE = 50000
+DEFAULT_ENTRY_FEE = 20.0
+DEFAULT_RAKE = 0.15
+DEFAULT_PAID_FRACTION = 0.2
+# Field lineups leave at most this much of the cap unspent
+DEFAULT_MIN_SALARY = SALARY_CAP - 2000
+
+
+# ---------------------------------------------------------------------------
+# Field generation
+# ---------------------------------------------------------------------------
+
+def projected_ownership(pool, value_weight=0.5, temperature=0.35, roster_size=ROSTER_SIZE):
+    """
+    Projected ownership (0-1) of every pool row, from 'AvgPointsPerGame'
+    and points per $1000 of 'Salary': the field favours good players and
+    good value, mixed by value_weight. Both are z-scored and turned into
+    weights with a softmax at temperature (lower = chalkier field), scaled
+    so ownership sums to roster_size (every lineup rosters that many).
+    """
+    points = pool["AvgPointsPerGame"].to_numpy(dtype=float)
+    value = points / (pool["Salary"].to_numpy(dtype=float) / 1000)
+
+    def z(x):
+        return (x - x.mean()) / (x.std() or 1.0)
+
+    score = (1 - value_weight) * z(points) + value_weight * z(value)
+    weights = np.exp((score - score.max()) / temperature)
+    ownership = weights / weights.sum() * roster_size
+    # Nobody is owned above 100%: clip and hand the excess to the rest
+    for _ in range(roster_size):
+        over = ownership > 1
+        if not over.any():
+            break
+        excess = (ownership[over] - 1).sum()
+        ownership[over] = 1
+        rest = ~over & (ownership < 1)
+        ownership[rest] += excess * ownership[rest] / ownership[rest].sum()
+    return ownership
+
+
+def generate_field(pool, n_entries=DEFAULT_FIELD_SIZE, ownership=None, rng=None,
+                   salary_cap=SALARY_CAP, min_salary=DEFAULT_MIN_SALARY, roster_size=ROSTER_SIZE,
+                   batch_size=20000):
+    """
+    Synthetic opponent lineups drawn from projected ownership.
+
+    Each lineup is a weighted sample without replacement (Gumbel top-k on
+    log ownership) keeping at most one player per match (pool 'MatchID');
+    lineups outside [min_salary, salary_cap] are redrawn. Duplicate
+    lineups are kept, as in a real field.
+
+    Returns (n_entries, roster_size) pool row indices, each row sorted.
+    """
+    rng = np.random.default_rng(rng)
+    if ownership is None:
+        ownership = projected_ownership(pool, roster_size=roster_size)
+    log_weights = np.log(np.clip(np.asarray(ownership, dtype=float), 1e-9, None))
+    salaries = pool["Salary"].to_numpy()
+    match_ids = pool["MatchID"].to_numpy()
+    if len(np.unique(match_ids)) < roster_size:
+        raise ValueError("Fewer matches in the pool than roster spots.")
+    matches = [np.flatnonzero(match_ids == m) for m in np.unique(match_ids)]
+
+    field = np.empty((n_entries, roster_size), dtype=np.int32)
+    filled = 0
+    attempts = 0
+    while filled < n_entries:
+        keys = log_weights + rng.gumbel(size=(batch_size, len(pool)))
+        # Only the best key within each match can make the lineup
+        for players in matches:
+            block = keys[:, players]
+            block[block < block.max(axis=1, keepdims=True)] = -np.inf
+            keys[:, players] = block
+        picks = np.argpartition(-keys, roster_size - 1, axis=1)[:, :roster_size]
+
+        total = salaries[picks].sum(axis=1)
+        valid = (total <= salary_cap) & (total >= min_salary)
+        take = picks[valid][:n_entries - filled]
+        field[filled:filled + len(take)] = np.sort(take, axis=1)
+        filled += len(take)
+
+        attempts += batch_size
+        if filled == 0 and attempts >= 50 * batch_size:
+            raise ValueError("No sampled lineup fits the salary limits.")
+    return field
+
+
+# ---------------------------------------------------------------------------
+# Payouts
+# ---------------------------------------------------------------------------
+
+def payout_table(n_entries, entry_fee=DEFAULT_ENTRY_FEE, rake=DEFAULT_RAKE,
+                 paid_fraction=DEFAULT_PAID_FRACTION, min_cash=1.5, exponent=1.1):
+    """
+    A top-heavy GPP payout structure as a DataFrame of
+    [MinRank, MaxRank, Payout]: the prize pool (fees less rake) is split
+    over the top paid_fraction of entries, each place paying at least
+    min_cash entry fees, the rest decaying as 1 / rank**exponent.
+    """
+    paid = max(1, int(n_entries * paid_fraction))
+    pool_total = n_entries * entry_fee * (1 - rake)
+    floor = min(min_cash * entry_fee, pool_total / paid)
+    decay = 1.0 / np.arange(1, paid + 1) ** exponent
+    prizes = floor + (pool_total - floor * paid) * decay / decay.sum()
+    prizes = np.round(prizes, 2)
+    return pd.DataFrame({"MinRank": np.arange(1, paid + 1),
+                         "MaxRank": np.arange(1, paid + 1), "Payout": prizes})
+
+
+def payout_vector(payouts, n_entries):
+    """
+    Prize by finishing place (index 0 = 1st), zero past the last paid place,
+    from a [MinRank, MaxRank, Payout] table (or an array of prizes by place).
+    """
+    vector = np.zeros(n_entries)
+    if isinstance(payouts, pd.DataFrame):
+        for low, high, prize in payouts[["MinRank", "MaxRank", "Payout"]].itertuples(index=False):
+            vector[int(low) - 1:min(int(high), n_entries)] = prize
+    else:
+        payouts = np.asarray(payouts, dtype=float)[:n_entries]
+        vector[:len(payouts)] = payouts
+    return vector
+
+
+# ---------------------------------------------------------------------------
+# Contest simulation
+# ---------------------------------------------------------------------------
+
+def lineup_matrix(lineups, n_players):
+    """
+    (n_players, n_lineups) 0/1 roster matrix, so that scores @ matrix gives
+    every lineup's points in every simulation in one multiply. Kept dense:
+    with a tennis slate's few dozen players, BLAS on the dense matrix beats
+    any sparse format.
+    """
+    lineups = np.asarray(lineups)
+    matrix = np.zeros((n_players, len(lineups)), dtype=np.float32)
+    np.put_along_axis(matrix.T, lineups, 1.0, axis=1)
+    return matrix
+
+
+def _batched_searchsorted(sorted_rows, values, side):
+    """np.searchsorted of each row of values into the same row of sorted_rows."""
+    n_rows, width = sorted_rows.shape
+    # Shift every row into its own band so one flat search does all rows
+    span = max(np.abs(sorted_rows).max(), np.abs(values).max()) * 2 + 1
+    offsets = np.arange(n_rows)[:, None] * span
+    flat = (sorted_rows + offsets).ravel()
+    found = np.searchsorted(flat, (values + offsets).ravel(), side=side)
+    return found.reshape(values.shape) - np.arange(n_rows)[:, None] * width
+
+
+def _contest_chunk(ours, field, prizes, depth):
+    """
+    Finishing place and payout of our entries in a chunk of simulations.
+
+    Only the top `depth` field scores of each sim can push an entry out of
+    the top `depth` places, so they are pulled out with np.partition and
+    merged with our own entries; an entry's place is 1 + the entries
+    strictly ahead of it, and tied entries split the prizes of the places
+    they span. Places past depth are reported as depth + 1.
+    """
+    n_ours = ours.shape[1]
+    n_total = n_ours + field.shape[1]
+    k = min(depth, field.shape[1])
+    top = np.partition(field, field.shape[1] - k, axis=1)[:, field.shape[1] - k:]
+    contenders = np.sort(np.concatenate([top, ours], axis=1).astype(np.float64), axis=1)
+    values = ours.astype(np.float64)
+    below = _batched_searchsorted(contenders, values, "left")
+    upto = _batched_searchsorted(contenders, values, "right")
+    ahead = contenders.shape[1] - upto
+    tied = upto - below
+
+    # At the cutoff score, equal field entries left out by the partition also tie
+    cutoff = values == top.min(axis=1, keepdims=True)
+    if cutoff.any():
+        rows, cols = np.nonzero(cutoff)
+        in_field = (field[rows] == ours[rows, cols][:, None]).sum(axis=1)
+        in_top = (top[rows] == ours[rows, cols][:, None]).sum(axis=1)
+        tied[rows, cols] += in_field - in_top
+
+    # Mean prize over places ahead+1 .. ahead+tied
+    cumulative = np.concatenate([[0.0], np.cumsum(prizes)])
+    first = np.minimum(ahead, n_total)
+    last = np.minimum(ahead + tied, n_total)
+    payout = (cumulative[last] - cumulative[first]) / tied
+    return np.minimum(ahead + 1, depth + 1), payout
+
+
+def simulate_contest(sim_result, pool, lineups, field=None, field_size=DEFAULT_FIELD_SIZE,
+                     payouts=None, entry_fee=DEFAULT_ENTRY_FEE, chunk_size=200, rng=None,
+                     percentiles=(10, 50, 90)):
+    """
+    GPP contest simulation: our lineups against a synthetic field, under
+    every simulated outcome.
+
+    sim_result is a simulate_all_matches_batch result or a SimResults reader,
+    pool comes from opto.load_pool (with 'AvgPointsPerGame'), lineups are
+    tuples of pool row indices (as returned by opto.optimize_lineups).
+    field defaults to generate_field(field_size), payouts to payout_table
+    for the full contest. Simulations are processed chunk_size at a time, so
+    memory stays at a few (chunk_size, field_size) float32 blocks.
+
+    Returns a dict:
+      - 'entries':   per lineup: mean payout, ROI, cash / win / top-1% rates,
+                     best place and median place when cashing
+      - 'portfolio': per-simulation profit of all lineups together, with
+                     mean, ROI, P(profit > 0) and percentiles
+      - 'field':     the field lineups (pool row indices)
+    """
+    if isinstance(sim_result, SimResults):
+        sim_result = sim_result.as_batch_result()
+    scores, usable = pool_score_matrix(sim_result, pool)
+    pool_index = np.flatnonzero(usable)
+    to_usable = -np.ones(len(pool), dtype=int)
+    to_usable[pool_index] = np.arange(len(pool_index))
+    sub_pool = pool[usable].reset_index(drop=True)
+
+    ours_idx = to_usable[np.asarray(lineups, dtype=int)]
+    if (ours_idx < 0).any():
+        raise ValueError("Lineups include players missing from the simulation.")
+    if field is None:
+        field = generate_field(sub_pool, field_size, rng=rng)
+    else:
+        field = to_usable[np.asarray(field, dtype=int)]
+        if (field < 0).any():
+            raise ValueError("Field lineups include players missing from the simulation.")
+
+    n_ours, n_field = len(ours_idx), len(field)
+    n_total = n_ours + n_field
+    if payouts is None:
+        payouts = payout_table(n_total, entry_fee)
+    prizes = payout_vector(payouts, n_total)
+    top_1pct = max(1, n_total // 100)
+    # Places are only resolved as deep as the payouts and the top 1% need
+    depth = max(int(np.max(np.flatnonzero(prizes), initial=0)) + 1, top_1pct)
+
+    ours_matrix = lineup_matrix(ours_idx, len(sub_pool))
+    field_matrix = lineup_matrix(field, len(sub_pool))
+
+    n_sims = scores.shape[0]
+    places = np.empty((n_sims, n_ours), dtype=np.int32)
+    winnings = np.empty((n_sims, n_ours), dtype=np.float32)
+    for start in range(0, n_sims, chunk_size):
+        chunk = np.asarray(scores[start:start + chunk_size], dtype=np.float32)
+        place, payout = _contest_chunk(chunk @ ours_matrix, chunk @ field_matrix, prizes, depth)
+        places[start:start + len(chunk)] = place
+        winnings[start:start + len(chunk)] = payout
+
+    entries = pd.DataFrame({
+        "Players": [", ".join(sub_pool.loc[list(l), "Name"]) for l in ours_idx],
+        "Salary": sub_pool["Salary"].to_numpy()[ours_idx].sum(axis=1),
+        "MeanPayout": winnings.mean(axis=0),
+        "ROI": winnings.mean(axis=0) / entry_fee - 1,
+        "CashRate": (winnings > 0).mean(axis=0),
+        "WinRate": (places == 1).mean(axis=0),
+        "Top1%Rate": (places <= top_1pct).mean(axis=0),
+        "BestPlace": places.min(axis=0),
+        "MedianCashPlace": np.nanmedian(np.where(winnings > 0, places, np.nan), axis=0),
+    })
+
+    profit = winnings.sum(axis=1, dtype=np.float64) - n_ours * entry_fee
+    portfolio = {
+        "profit": profit,
+        "mean_profit": float(profit.mean()),
+        "roi": float(profit.mean() / (n_ours * entry_fee)),
+        "profit_rate": float((profit > 0).mean()),
+        "percentiles": dict(zip(percentiles, np.percentile(profit, percentiles))),
+    }
+    logging.info("Simulated a %s-entry contest over %s sims: portfolio ROI %.1f%%.",
+                 n_total, n_sims, 100 * portfolio["roi"])
+    return {"entries": entries, "portfolio": portfolio, "field": pool_index[field]}
+
@@ -1,5 +1,8 @@
 # draftkings_scoring.py
 
+import numpy as np
+from functions.metrics import timer
+
 def calculate_draftkings_points(events, best_of_3=True):
     """
     Calculate DraftKings fantasy points based on a dictionary of match events.
@@ -36,3 +39,62 @@ def calculate_draftkings_points(events, best_of_3=True):
         points += no_double_fault_bonus
 
     return points
+
+
+# Per-format rule values, in the order calculate_draftkings_points applies them.
+# Index 0 is best-of-5, index 1 is best-of-3.
+_RULES = {
+    'game_won': (2, 2.5),
+    'game_lost': (-1.6, -2),
+    'set_won': (5, 6),
+    'set_lost': (-2.5, -3),
+    'match_won': (5, 6),
+    'ace': (0.25, 0.4),
+    'double_fault': (-1, -1),
+    'break': (0.5, 0.75),
+    'clean_set': (2.5, 4),
+    'straight_sets': (5, 6),
+    'no_double_fault': (5, 2.5),
+}
+
+
+def _rule(name, best_of_3):
+    bo5_value, bo3_value = _RULES[name]
+    return np.where(best_of_3, bo3_value, bo5_value)
+
+
+@timer("scoring")
+def calculate_draftkings_points_array(events, best_of_3=True):
+    """
+    Array version of calculate_draftkings_points.
+    'events' is anything indexable by event name that returns arrays of equal
+    shape: a dict of arrays, a structured numpy array or a DataFrame.
+    best_of_3 may be a single bool or a bool array broadcastable to the events.
+    Returns a float32 array of points.
+    """
+    best_of_3 = np.asarray(best_of_3, dtype=bool)
+    double_faults = np.asarray(events['double_faults'])
+
+    points = np.full(double_faults.shape, 30.0)
+    term = np.empty_like(points)
+
+    def add(values, rule):
+        # points += values * rule, without allocating a temporary per rule
+        np.multiply(values, _rule(rule, best_of_3), out=term)
+        np.add(points, term, out=points)
+
+    add(events['games_won'], 'game_won')
+    add(events['games_lost'], 'game_lost')
+    add(events['sets_won'], 'set_won')
+    add(events['sets_lost'], 'set_lost')
+    add(events['match_won'], 'match_won')
+    add(events['aces'], 'ace')
+    add(double_faults, 'double_fault')
+    add(events['breaks'], 'break')
+
+    add(np.maximum(events['clean_sets'], 0), 'clean_set')
+    add(np.asarray(events['straight_sets'], dtype=bool), 'straight_sets')
+    add(double_faults == 0, 'no_double_fault')
+
+    return points.astype(np.float32)
+
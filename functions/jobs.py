@@ -0,0 +1,338 @@
+# jobs.py
+
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import pickle
+import shutil
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+JOBS_DIR = "data/cache/jobs"
+DEFAULT_WORKERS = 2
+
+_STATUS = "job.json"
+_RESULT = "result.pkl"
+_SIM_RESULTS = "results"
+
+
+# ---------------------------------------------------------------------------
+# Job functions (run in worker processes)
+# ---------------------------------------------------------------------------
+
+def _save_result(out_dir, result):
+    tmp = os.path.join(out_dir, _RESULT + ".tmp")
+    with open(tmp, "wb") as f:
+        pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, os.path.join(out_dir, _RESULT))
+
+
+def _data_prep_job(out_dir, raw_csv_path, atp_file, wta_file, do_fuzzy_match):
+    import functions.pool_prep as data_preparation
+
+    df = data_preparation.load_and_clean_data(
+        raw_csv_path=raw_csv_path,
+        atp_file=atp_file,
+        wta_file=wta_file,
+        do_fuzzy_match=do_fuzzy_match,
+        threshold=90,
+        potential_warn=75
+    )
+    _save_result(out_dir, data_preparation.deduplicate_matches(df))
+
+
+def _sim_prep_job(out_dir):
+    from functions.sim_prep import run_sim_prep
+
+    _save_result(out_dir, run_sim_prep(incremental=True))
+
+
+def _simulation_job(out_dir, df, n_sims, reuse_matches):
+    import functions.sim as simulation
+    import functions.sim_cache as sim_cache
+
+    path = os.path.join(out_dir, _SIM_RESULTS)
+    if reuse_matches:
+        sim_cache.simulate_to_disk_cached(df, n_sims, path)
+    else:
+        simulation.simulate_to_disk(df, n_sims, path)
+
+
+_JOB_FUNCTIONS = {
+    "data_prep": _data_prep_job,
+    "sim_prep": _sim_prep_job,
+    "simulation": _simulation_job,
+}
+
+
+def _run_job(kind, out_dir, kwargs, outputs=()):
+    """
+    Worker entry point: run the job and record its final status on disk,
+    with the signatures of the files it wrote (outputs) at that point.
+    """
+    started = time.time()
+    try:
+        _JOB_FUNCTIONS[kind](out_dir, **kwargs)
+    except Exception as e:
+        _write_status(out_dir, {"status": "failed", "error": repr(e)})
+        raise
+    _write_status(out_dir, {"status": "done", "seconds": time.time() - started,
+                            "outputs": [_file_signature(p) or [os.path.abspath(p)] for p in outputs]})
+
+
+def _write_status(out_dir, status):
+    tmp = os.path.join(out_dir, _STATUS + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(status, f)
+    os.replace(tmp, os.path.join(out_dir, _STATUS))
+
+
+def _read_status(out_dir):
+    try:
+        with open(os.path.join(out_dir, _STATUS)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Input hashing
+# ---------------------------------------------------------------------------
+
+def _file_signature(path):
+    if path is None or not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return [os.path.abspath(path), stat.st_mtime_ns, stat.st_size]
+
+
+def _outputs_current(status):
+    """
+    Whether the files a finished job wrote are still as it left them
+    (not deleted or overwritten by another run since).
+    """
+    return all(_file_signature(signature[0]) == signature
+               for signature in status.get("outputs", []))
+
+
+def job_key(kind, **inputs):
+    """
+    Hash of a job kind and its inputs. DataFrames hash by content, paths
+    given as ('file', path) by mtime and size.
+    """
+    digest = hashlib.sha1(kind.encode())
+    for name in sorted(inputs):
+        value = inputs[name]
+        digest.update(name.encode())
+        if isinstance(value, pd.DataFrame):
+            digest.update(pd.util.hash_pandas_object(value, index=False).to_numpy().tobytes())
+            digest.update(",".join(map(str, value.columns)).encode())
+        elif isinstance(value, tuple) and value and value[0] == "file":
+            digest.update(json.dumps(_file_signature(value[1])).encode())
+        else:
+            digest.update(json.dumps(value, default=str).encode())
+    return digest.hexdigest()[:20]
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+class Job:
+    """
+    Handle on a submitted (or previously finished) job. State is read from
+    the worker's future when this process submitted it, else from disk, so
+    any session or process can follow the same job.
+    """
+
+    def __init__(self, key, kind, path, n_sims=None, future=None):
+        self.key = key
+        self.kind = kind
+        self.path = path
+        self.n_sims = n_sims
+        self.future = future
+
+    @property
+    def status(self):
+        """'queued', 'running', 'done' or 'failed'."""
+        on_disk = _read_status(self.path)
+        if on_disk is not None:
+            return on_disk["status"]
+        if self.future is None:
+            return "failed"
+        if self.future.done():
+            return "failed" if self.future.exception() else "done"
+        return "running" if self.future.running() else "queued"
+
+    @property
+    def done(self):
+        return self.status in ("done", "failed")
+
+    @property
+    def error(self):
+        on_disk = _read_status(self.path) or {}
+        if on_disk.get("error"):
+            return on_disk["error"]
+        if self.future is not None and self.future.done() and self.future.exception():
+            return repr(self.future.exception())
+        return None
+
+    def _sim_results(self):
+        from functions.sim_results import SimResults
+
+        path = os.path.join(self.path, _SIM_RESULTS)
+        if not os.path.exists(os.path.join(path, "meta.json")):
+            return None
+        return SimResults(path)
+
+    @property
+    def progress(self):
+        """Fraction complete (0-1)."""
+        if self.status == "done":
+            return 1.0
+        if self.kind == "simulation" and self.n_sims:
+            results = self._sim_results()
+            if results is not None:
+                return min(results.n_sims / self.n_sims, 1.0)
+        return 0.0
+
+    def partial_percentiles(self, percentiles=(10, 50, 90)):
+        """
+        Running per-player score summary of a simulation job (Sims, Mean,
+        Std, percentiles, win rate) over every simulation written so far,
+        from the writer's streaming stats. None before the first chunk lands.
+        """
+        results = self._sim_results()
+        if results is None or results.n_sims == 0:
+            return None
+        return results.stats().summary(percentiles)
+
+    def result(self):
+        """
+        The job output: a DataFrame for prep jobs, a SimResults reader for
+        simulations. Raises if the job failed or is not finished.
+        """
+        status = self.status
+        if status == "failed":
+            raise RuntimeError(f"Job {self.key} failed: {self.error}")
+        if status != "done":
+            raise RuntimeError(f"Job {self.key} is still {status}.")
+        if self.kind == "simulation":
+            return self._sim_results()
+        with open(os.path.join(self.path, _RESULT), "rb") as f:
+            return pickle.load(f)
+
+
+class JobRunner:
+    """
+    Runs prep and simulation jobs on a process pool, off the Streamlit
+    script thread.
+
+    Jobs are keyed by a hash of their inputs: submitting a job whose inputs
+    match a finished (or running) one returns that job instead of doing the
+    work again, across reruns, sessions and restarts (finished outputs live
+    under JOBS_DIR/<key>).
+    """
+
+    def __init__(self, jobs_dir=JOBS_DIR, max_workers=DEFAULT_WORKERS):
+        self.jobs_dir = jobs_dir
+        self.max_workers = max_workers
+        self._executor = None
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        if self._executor is None:
+            # spawn: forking a threaded server process is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def _submit(self, kind, key, kwargs, n_sims=None, outputs=()):
+        """
+        Start a job, or return the running / finished one with the same key.
+        outputs are files the job writes outside its directory: a finished
+        job is only reused while they are unchanged.
+        """
+        path = os.path.join(self.jobs_dir, key)
+        with self._lock:
+            on_disk = _read_status(path)
+            reusable = (on_disk is not None and on_disk["status"] == "done"
+                        and _outputs_current(on_disk))
+
+            job = self._jobs.get(key)
+            if job is not None and (not job.done or reusable):
+                return job
+
+            if reusable:
+                job = Job(key, kind, path, n_sims)
+                logging.info("Reusing finished %s job %s.", kind, key)
+            else:
+                # Start clean: drop output of a failed, interrupted or stale run
+                shutil.rmtree(path, ignore_errors=True)
+                os.makedirs(path)
+                future = self._pool().submit(_run_job, kind, path, kwargs, tuple(outputs))
+                job = Job(key, kind, path, n_sims, future)
+                logging.info("Submitted %s job %s.", kind, key)
+            self._jobs[key] = job
+            return job
+
+    def submit_data_prep(self, raw_csv_path, atp_file, wta_file, do_fuzzy_match=True):
+        key = job_key("data_prep", raw=("file", raw_csv_path), atp=("file", atp_file),
+                      wta=("file", wta_file), fuzzy=do_fuzzy_match)
+        return self._submit("data_prep", key, {
+            "raw_csv_path": raw_csv_path, "atp_file": atp_file,
+            "wta_file": wta_file, "do_fuzzy_match": do_fuzzy_match,
+        })
+
+    def submit_sim_prep(self):
+        from functions.sim_prep.config import ATP_FILE, WTA_FILE, CONTEXT_FILE, NAMES_DB, OUTPUT_FILE
+
+        key = job_key("sim_prep", context=("file", CONTEXT_FILE), atp=("file", ATP_FILE),
+                      wta=("file", WTA_FILE), names=("file", NAMES_DB),
+                      names_wal=("file", NAMES_DB + "-wal"))
+        # The simulation stage reads OUTPUT_FILE, so rerun if it was
+        # deleted or overwritten (e.g. by cli.py) since the job finished
+        return self._submit("sim_prep", key, {}, outputs=[OUTPUT_FILE])
+
+    def submit_simulation(self, df, n_sims, reuse_matches=True):
+        key = job_key("simulation", df=df, n_sims=int(n_sims), reuse=reuse_matches)
+        return self._submit("simulation", key, {
+            "df": df, "n_sims": int(n_sims), "reuse_matches": reuse_matches,
+        }, n_sims=int(n_sims))
+
+    def get(self, key):
+        """Job by key, including finished jobs from other processes."""
+        with self._lock:
+            job = self._jobs.get(key)
+        if job is not None:
+            return job
+        path = os.path.join(self.jobs_dir, key)
+        status = _read_status(path)
+        if status is None:
+            return None
+        kind = "simulation" if os.path.isdir(os.path.join(path, _SIM_RESULTS)) else "prep"
+        return Job(key, kind, path)
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+_RUNNER = None
+
+
+def get_runner():
+    """Process-wide JobRunner shared by every session."""
+    global _RUNNER
+    if _RUNNER is None:
+        _RUNNER = JobRunner()
+    return _RUNNER
+
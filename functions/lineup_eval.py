@@ -0,0 +1,245 @@
+# lineup_eval.py
+
+import logging
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from functions.opto import ROSTER_SIZE, SALARY_CAP, salary_units
+
+
+def pool_score_matrix(sim_result, pool):
+    """
+    Columns of the sim score matrix in pool row order (matched on 'Name').
+    Returns (scores, usable) where usable marks pool rows found in the sim;
+    scores has one column per usable pool row.
+    """
+    columns = pd.Series(np.arange(len(sim_result["players"])), index=sim_result["players"])
+    columns = columns[~columns.index.duplicated()]
+    pool_columns = pool["Name"].map(columns)
+    usable = pool_columns.notna().to_numpy()
+    if not usable.all():
+        logging.warning("%s pool players are not in the simulation.", (~usable).sum())
+    return sim_result["scores"][:, pool_columns[usable].astype(int).to_numpy()], usable
+
+
+def optimal_lineups_per_sim(scores, salaries, match_ids, salary_cap=SALARY_CAP,
+                            roster_size=ROSTER_SIZE, chunk_size=500, k=1):
+    """
+    The k best lineups of every simulation (k=1: the optimal lineup).
+
+    Solves the same knapsack-over-matches as opto.bound_table, but forward and
+    for a whole chunk of simulations at once, so each salary/roster state is
+    updated for chunk_size sims in one array operation. Every state keeps its
+    k best values, sorted: each player's candidates are inserted in place (for
+    k=1 a plain masked maximum), and the choice (and the rank of the state it
+    came from) behind each is kept per match for a vectorized backtrack.
+    Chunks shrink by k so the choice tables stay the same size.
+
+    Returns (lineups, points): lineups is (n_sims, k, roster_size) player
+    indices, best first (-1 where fewer lineups fit), points is (n_sims, k)
+    lineup points (-inf where no lineup).
+    """
+    scores = np.asarray(scores, dtype=np.float32)
+    n_sims = scores.shape[0]
+    unit, steps = salary_units(salaries)
+    cap = int(salary_cap // unit)
+    match_ids = np.asarray(match_ids)
+    matches = [np.flatnonzero(match_ids == m) for m in np.unique(match_ids)]
+    chunk_size = max(chunk_size // k, 1)
+
+    lineups = np.full((n_sims, k, roster_size), -1, dtype=np.int32)
+    points = np.full((n_sims, k), -np.inf, dtype=np.float32)
+
+    for start in range(0, n_sims, chunk_size):
+        chunk = scores[start:start + chunk_size]
+        n = chunk.shape[0]
+        value = np.full((k, n, roster_size + 1, cap + 1), -np.inf, dtype=np.float32)
+        value[0, :, 0, :] = 0
+        choices = np.zeros((len(matches), k, n, roster_size + 1, cap + 1), dtype=np.int8)
+        sources = np.zeros((len(matches), k, n, roster_size + 1, cap + 1), dtype=np.int8)
+
+        for i, players in enumerate(matches):
+            # Start from skipping the match (option 0), then insert each
+            # player's candidates into the sorted k best of every state
+            new_value = value.copy()
+            choice = choices[i]
+            source = sources[i]
+            source[:] = np.arange(k, dtype=np.int8)[:, None, None, None]
+            for option, p in enumerate(players, start=1):
+                w = steps[p]
+                if w > cap:
+                    continue
+                best = new_value[:, :, 1:, w:]
+                best_choice = choice[:, :, 1:, w:]
+                best_source = source[:, :, 1:, w:]
+                for rank in range(k):
+                    candidate = value[rank, :, :-1, :cap + 1 - w] + chunk[:, p, None, None]
+                    if not (candidate > best[k - 1]).any():
+                        break  # later candidates are lower still
+                    for j in range(k - 1, -1, -1):
+                        better = candidate > best[j]
+                        if j > 0:
+                            # Shift the entry above down, or insert below it
+                            shift = candidate > best[j - 1]
+                            np.copyto(best[j], best[j - 1], where=shift)
+                            np.copyto(best_choice[j], best_choice[j - 1], where=shift)
+                            np.copyto(best_source[j], best_source[j - 1], where=shift)
+                            better &= ~shift
+                        np.copyto(best[j], candidate, where=better)
+                        np.copyto(best_choice[j], option, where=better)
+                        np.copyto(best_source[j], rank, where=better)
+            value = new_value
+
+        # Backtrack every (sim, rank) pair at once
+        rows = np.repeat(np.arange(n), k)
+        rank = np.tile(np.arange(k), n)
+        left = np.full(n * k, roster_size)
+        cap_left = np.full(n * k, cap)
+        picks = np.full((n * k, roster_size), -1, dtype=np.int32)
+        for i in range(len(matches) - 1, -1, -1):
+            option = choices[i, rank, rows, left, cap_left]
+            rank = sources[i, rank, rows, left, cap_left]
+            took = option > 0
+            if not took.any():
+                continue
+            player = matches[i][option[took] - 1]
+            picks[took, roster_size - left[took]] = player
+            cap_left[took] -= steps[player]
+            left[took] -= 1
+
+        chunk_points = value[:, :, roster_size, cap].T
+        feasible = np.isfinite(chunk_points).ravel()
+        picks[feasible] = np.sort(picks[feasible], axis=1)
+        picks[~feasible] = -1
+        lineups[start:start + n] = picks.reshape(n, k, roster_size)
+        points[start:start + n] = chunk_points
+    return lineups, points
+
+
+def lineup_scores(scores, lineups):
+    """
+    (n_sims, n_lineups) total points of each lineup (rows of player indices)
+    in each simulation.
+    """
+    lineups = np.asarray(lineups)
+    total = np.zeros((scores.shape[0], len(lineups)), dtype=np.float32)
+    for slot in range(lineups.shape[1]):
+        total += scores[:, lineups[:, slot]]
+    return total
+
+
+def evaluate_lineups(sim_result, pool, candidates=None, percentiles=(10, 50, 90),
+                     salary_cap=SALARY_CAP, roster_size=ROSTER_SIZE, chunk_size=500,
+                     tolerance=1e-3, max_optimal=500, k=1, ownership=None,
+                     rank_by="OptimalRate"):
+    """
+    Optimal-rate evaluation of a simulated slate.
+
+    sim_result is a simulate_all_matches_batch result, pool comes from
+    opto.load_pool, candidates is an optional list of lineups (tuples of
+    pool row indices, as returned by opto.optimize_lineups).
+
+    k > 1 also counts how often a player / lineup is among the k best
+    lineups of a sim (TopKCount / TopKRate), which separates near-optimal
+    lineups that a single optimum per sim hides.
+
+    ownership is the projected ownership (0-1) per pool row; by default the
+    pool's 'Ownership' column, else contest_sim.projected_ownership. Both
+    optimal rate and ownership sum to roster_size over the pool, so a
+    player's Leverage is OptimalRate - Ownership (positive: optimal more
+    often than the field plays them); a lineup's Ownership and Leverage are
+    the sums over its players. rank_by ('OptimalRate', 'TopKRate' or
+    'Leverage') orders the frames.
+
+    Returns a dict of DataFrames:
+      - 'players':    optimal / top-k count and rate, ownership, leverage and
+                      score percentiles per player
+      - 'optimal':    the max_optimal lineups that were optimal (or top-k)
+                      most often, with the same columns and lineup points
+      - 'candidates': the same columns for the candidate lineups (a candidate
+                      counts as optimal when within tolerance of the optimum,
+                      and as top-k when within tolerance of the k-th best)
+    """
+    scores, usable = pool_score_matrix(sim_result, pool)
+    pool_index = np.flatnonzero(usable)
+    to_usable = -np.ones(len(pool), dtype=int)
+    to_usable[pool_index] = np.arange(len(pool_index))
+    sub_pool = pool[usable].reset_index(drop=True)
+    n_sims = scores.shape[0]
+
+    if ownership is None:
+        if "Ownership" in pool.columns:
+            ownership = pool["Ownership"].to_numpy(dtype=float)
+        else:
+            from functions.contest_sim import projected_ownership
+            ownership = projected_ownership(pool, roster_size=roster_size)
+    ownership = np.asarray(ownership, dtype=float)[usable]
+
+    best, best_points = optimal_lineups_per_sim(
+        scores, sub_pool["Salary"].to_numpy(), sub_pool["MatchID"].to_numpy(),
+        salary_cap, roster_size, chunk_size, k
+    )
+    optimum = best_points[:, 0]
+    kth = best_points[:, -1]
+    feasible = best[:, :, 0] >= 0
+    optimal_lineups = best[:, 0][feasible[:, 0]]
+    top_lineups = best[feasible]
+
+    # Per player
+    optimal_counts = np.bincount(optimal_lineups.ravel(), minlength=len(sub_pool))
+    players = sub_pool[["Name", "ID", "Salary"]].copy()
+    players["OptimalCount"] = optimal_counts
+    players["OptimalRate"] = optimal_counts / n_sims
+    if k > 1:
+        top_counts = np.bincount(top_lineups.ravel(), minlength=len(sub_pool))
+        players["TopKCount"] = top_counts
+        players["TopKRate"] = top_counts / n_sims
+    players["Ownership"] = ownership
+    players["Leverage"] = players["OptimalRate"] - ownership
+    leverage = players["Leverage"].to_numpy()
+    for q, values in zip(percentiles, np.percentile(scores, percentiles, axis=0)):
+        players[f"P{q}"] = values
+    players = players.sort_values(rank_by, ascending=False).reset_index(drop=True)
+
+    def lineup_frame(lineups, optimal_counts, top_counts):
+        points = lineup_scores(scores, lineups)
+        frame = pd.DataFrame({
+            "Players": [", ".join(sub_pool.loc[list(l), "Name"]) for l in lineups],
+            "Salary": sub_pool["Salary"].to_numpy()[lineups].sum(axis=1),
+            "OptimalCount": optimal_counts,
+            "OptimalRate": np.asarray(optimal_counts) / n_sims,
+        })
+        if k > 1:
+            frame["TopKCount"] = top_counts
+            frame["TopKRate"] = np.asarray(top_counts) / n_sims
+        frame["Ownership"] = ownership[lineups].sum(axis=1)
+        frame["Leverage"] = leverage[lineups].sum(axis=1)
+        frame["Mean"] = points.mean(axis=0)
+        for q, values in zip(percentiles, np.percentile(points, percentiles, axis=0)):
+            frame[f"P{q}"] = values
+        return frame
+
+    # Per optimal (or top-k) lineup
+    optimal_by_lineup = Counter(map(tuple, optimal_lineups))
+    top_by_lineup = Counter(map(tuple, top_lineups))
+    ranked = [l for l, _ in top_by_lineup.most_common(max_optimal)]
+    optimal = lineup_frame(np.array(ranked, dtype=int).reshape(-1, roster_size),
+                           [optimal_by_lineup[l] for l in ranked],
+                           [top_by_lineup[l] for l in ranked])
+    optimal = optimal.sort_values(rank_by, ascending=False, kind="stable").reset_index(drop=True)
+
+    result = {"players": players, "optimal": optimal}
+
+    if candidates is not None:
+        candidate_idx = to_usable[np.asarray(candidates, dtype=int)]
+        if (candidate_idx < 0).any():
+            raise ValueError("Candidate lineups include players missing from the simulation.")
+        points = lineup_scores(scores, candidate_idx)
+        hits = (points >= optimum[:, None] - tolerance).sum(axis=0)
+        top_hits = (points >= kth[:, None] - tolerance).sum(axis=0)
+        result["candidates"] = lineup_frame(candidate_idx, hits, top_hits)
+
+    logging.info("Evaluated %s sims: %s distinct optimal lineups.", n_sims, len(optimal_by_lineup))
+    return result
@@ -0,0 +1,372 @@
+# lookup_tables.py
+
+import json
+import logging
+import os
+
+import numpy as np
+
+from functions.dk_scoring import _rule, calculate_draftkings_points_array
+from functions.match_engine import (
+    game_win_table, serve_point_probability, simulate_match_events,
+    tiebreak_win_probability,
+)
+
+LOOKUP_DIR = "data/cache/lookup"
+
+# Hold probability grid the tables are built on; inputs are clipped to it.
+HOLD_MIN = 0.30
+HOLD_MAX = 0.98
+HOLD_STEP = 0.02
+
+FORMATS = (3, 5)
+DEFAULT_SAMPLES = 1024
+# More service games than a best-of-5 match can have (5 sets x 6)
+MAX_SERVICE_GAMES = 32
+
+# Bump when the engine, scoring or table layout changes
+TABLE_VERSION = 1
+
+_TABLES = {}
+
+
+def hold_grid():
+    n = int(round((HOLD_MAX - HOLD_MIN) / HOLD_STEP)) + 1
+    return np.linspace(HOLD_MIN, HOLD_MAX, n)
+
+
+# ---------------------------------------------------------------------------
+# Exact expectations
+# ---------------------------------------------------------------------------
+
+def _set_scores(hold_a, hold_b, tiebreak_a, a_serves_first):
+    """
+    Final score distribution of one set, {(games_a, games_b): probability},
+    and each player's expected breaks (games won on the other's serve).
+    """
+    reach = {(0, 0): np.ones(np.broadcast(hold_a, hold_b).shape)}
+    scores = {}
+    breaks_a = np.zeros_like(reach[(0, 0)])
+    breaks_b = np.zeros_like(reach[(0, 0)])
+    for total in range(12):
+        for i in range(0, total + 1):
+            j = total - i
+            if (i, j) not in reach:
+                continue
+            prob = reach.pop((i, j))
+            a_serving = (total % 2 == 0) == a_serves_first
+            if a_serving:
+                p_game = hold_a
+                breaks_b = breaks_b + prob * (1 - hold_a)
+            else:
+                p_game = 1 - hold_b
+                breaks_a = breaks_a + prob * (1 - hold_b)
+            for a_game, p in ((True, p_game), (False, 1 - p_game)):
+                ni, nj = (i + 1, j) if a_game else (i, j + 1)
+                if (ni >= 6 or nj >= 6) and abs(ni - nj) >= 2:
+                    scores[(ni, nj)] = scores.get((ni, nj), 0) + prob * p
+                else:
+                    reach[(ni, nj)] = reach.get((ni, nj), 0) + prob * p
+
+    scores[(7, 6)] = reach[(6, 6)] * tiebreak_a
+    scores[(6, 7)] = reach[(6, 6)] * (1 - tiebreak_a)
+    return scores, breaks_a, breaks_b
+
+
+def _service_games(games_a, games_b, a_serves_first):
+    """Service games of A and B in a finished set (the tiebreak excluded)."""
+    regular = min(games_a + games_b, 12)
+    first = (regular + 1) // 2
+    return (first, regular - first) if a_serves_first else (regular - first, first)
+
+
+def match_expectations(hold_a, hold_b, best_of=3):
+    """
+    Exact expected events of player A over a match with a random first
+    server, as in simulate_match_events: a dict of arrays for games won /
+    lost, sets won / lost, match win, breaks, clean sets and straight sets,
+    plus 'service_games_pmf' (..., MAX_SERVICE_GAMES) for A's service games.
+    """
+    hold_a = np.asarray(hold_a, dtype=float)
+    hold_b = np.asarray(hold_b, dtype=float)
+    pa = serve_point_probability(hold_a)
+    pb = serve_point_probability(hold_b)
+    set_tables = {
+        True: _set_scores(hold_a, hold_b, tiebreak_win_probability(pa, pb), True),
+        False: _set_scores(hold_a, hold_b, 1 - tiebreak_win_probability(pb, pa), False),
+    }
+    sets_needed = best_of // 2 + 1
+    shape = np.broadcast(hold_a, hold_b).shape
+    zero = np.zeros(shape)
+
+    out = {name: zero.copy() for name in (
+        'games_won', 'games_lost', 'sets_won', 'sets_lost', 'match_won',
+        'breaks', 'clean_sets', 'straight_sets')}
+    pmf_done = np.zeros(shape + (MAX_SERVICE_GAMES,))
+
+    # state (sets_a, sets_b, a_serves_first) -> joint pmf of A's service games
+    start = np.zeros(shape + (MAX_SERVICE_GAMES,))
+    start[..., 0] = 0.5
+    reach = {(0, 0, True): start, (0, 0, False): start.copy()}
+    while reach:
+        next_reach = {}
+        for (sa, sb, a_first), pmf in reach.items():
+            prob = pmf.sum(axis=-1)
+            scores, breaks_a, _ = set_tables[a_first]
+            out['breaks'] += prob * breaks_a
+            for (ga, gb), p_set in scores.items():
+                p = prob * p_set
+                out['games_won'] += p * ga
+                out['games_lost'] += p * gb
+                if (ga, gb) == (6, 0):
+                    out['clean_sets'] += p
+
+                sg_a, _ = _service_games(ga, gb, a_first)
+                moved = np.zeros_like(pmf)
+                moved[..., sg_a:] = pmf[..., :MAX_SERVICE_GAMES - sg_a] * p_set[..., None]
+
+                nsa, nsb = (sa + 1, sb) if ga > gb else (sa, sb + 1)
+                if nsa == sets_needed or nsb == sets_needed:
+                    out['sets_won'] += p * nsa
+                    out['sets_lost'] += p * nsb
+                    if nsa == sets_needed:
+                        out['match_won'] += p
+                        if nsb == 0:
+                            out['straight_sets'] += p
+                    pmf_done += moved
+                else:
+                    key = (nsa, nsb, a_first == ((ga + gb) % 2 == 0))
+                    if key in next_reach:
+                        next_reach[key] += moved
+                    else:
+                        next_reach[key] = moved
+        reach = next_reach
+
+    out['service_games_pmf'] = pmf_done
+    return out
+
+
+def _base_points(expected, best_of_3):
+    """
+    Expected DK points from everything but aces and double faults
+    (linear terms only; the no-double-fault bonus is added separately).
+    """
+    return (30.0
+            + expected['games_won'] * _rule('game_won', best_of_3)
+            + expected['games_lost'] * _rule('game_lost', best_of_3)
+            + expected['sets_won'] * _rule('set_won', best_of_3)
+            + expected['sets_lost'] * _rule('set_lost', best_of_3)
+            + expected['match_won'] * _rule('match_won', best_of_3)
+            + expected['breaks'] * _rule('break', best_of_3)
+            + expected['clean_sets'] * _rule('clean_set', best_of_3)
+            + expected['straight_sets'] * _rule('straight_sets', best_of_3))
+
+
+# ---------------------------------------------------------------------------
+# Build / load
+# ---------------------------------------------------------------------------
+
+def build_tables(path=LOOKUP_DIR, samples=DEFAULT_SAMPLES, seed=0):
+    """
+    Build every table on the hold grid and save them as .npy files in path:
+
+      match_win.npy            (format, hold_a, hold_b) P(A wins)
+      expected_base.npy        (format, hold_a, hold_b) expected DK points of
+                               A without the ace / double-fault terms
+      service_games_pmf.npy    (format, hold_a, hold_b, k) P(A serves k games)
+      sample_base.npy          (format, hold_a, hold_b, sample, side) joint
+                               Monte Carlo draws of both players' base points
+      sample_service_games.npy same layout, service games of each draw
+    """
+    os.makedirs(path, exist_ok=True)
+    grid = hold_grid()
+    hold_a, hold_b = np.meshgrid(grid, grid, indexing="ij")
+    n = len(grid)
+    rng = np.random.default_rng(seed)
+
+    match_win = np.empty((len(FORMATS), n, n))
+    expected_base = np.empty((len(FORMATS), n, n))
+    pmf = np.empty((len(FORMATS), n, n, MAX_SERVICE_GAMES))
+    sample_base = np.empty((len(FORMATS), n, n, samples, 2), dtype=np.float32)
+    sample_sg = np.empty((len(FORMATS), n, n, samples, 2), dtype=np.int8)
+
+    for f, best_of in enumerate(FORMATS):
+        expected = match_expectations(hold_a, hold_b, best_of)
+        match_win[f] = expected['match_won']
+        expected_base[f] = _base_points(expected, best_of == 3)
+        pmf[f] = expected['service_games_pmf']
+
+        cells = n * n
+        events = simulate_match_events(
+            serve_point_probability(hold_a.ravel()), serve_point_probability(hold_b.ravel()),
+            np.zeros(cells), np.zeros(cells), np.zeros(cells), np.zeros(cells),
+            np.full(cells, best_of), samples, rng, return_service_games=True,
+        )
+        # No aces / double faults were drawn: strip the no-double-fault bonus
+        base = calculate_draftkings_points_array(events, best_of == 3) - _rule('no_double_fault', best_of == 3)
+        sample_base[f] = base.reshape(samples, n, n, 2).transpose(1, 2, 0, 3)
+        # Centre each cell's draws on the exact expectation (B's is A's with
+        # the holds swapped), so sampled means carry no finite-sample bias
+        sample_base[f, ..., 0] += (expected_base[f] - sample_base[f, ..., 0].mean(axis=-1))[..., None]
+        sample_base[f, ..., 1] += (expected_base[f].T - sample_base[f, ..., 1].mean(axis=-1))[..., None]
+        sample_sg[f] = events['service_games'].reshape(samples, n, n, 2).transpose(1, 2, 0, 3)
+        logging.info("Built best-of-%s lookup tables (%s cells).", best_of, cells)
+
+    for name, array in (("match_win", match_win), ("expected_base", expected_base),
+                        ("service_games_pmf", pmf), ("sample_base", sample_base),
+                        ("sample_service_games", sample_sg)):
+        np.save(os.path.join(path, f"{name}.npy"), array)
+    meta = {"version": TABLE_VERSION, "grid": grid.tolist(), "formats": list(FORMATS),
+            "samples": samples, "seed": seed}
+    # meta last, so half-built tables are never picked up
+    tmp = os.path.join(path, "meta.json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp, os.path.join(path, "meta.json"))
+
+
+def load_tables(path=LOOKUP_DIR):
+    """
+    LookupTables for path, memory-mapped; built first if missing or stale.
+    """
+    meta_file = os.path.join(path, "meta.json")
+    meta = None
+    if os.path.exists(meta_file):
+        with open(meta_file) as f:
+            meta = json.load(f)
+    if meta is None or meta.get("version") != TABLE_VERSION:
+        logging.info("Building lookup tables in %s...", path)
+        build_tables(path)
+        _TABLES.pop(path, None)
+
+    tables = _TABLES.get(path)
+    if tables is None:
+        tables = LookupTables(path)
+        _TABLES[path] = tables
+    return tables
+
+
+class LookupTables:
+    """
+    Memory-mapped lookup tables indexed by (format, hold_a, hold_b).
+
+    Lookups interpolate bilinearly between grid points; sampling picks a
+    neighbouring grid cell with the bilinear weights (a mixture with the same
+    interpolated distribution) and then one of its stored draws.
+    """
+
+    def __init__(self, path=LOOKUP_DIR):
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.grid = np.array(self.meta["grid"])
+        self.samples = self.meta["samples"]
+
+        def load(name):
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+
+        self.match_win_table = load("match_win")
+        self.expected_base = load("expected_base")
+        self.service_games_pmf = load("service_games_pmf")
+        self.sample_base = load("sample_base")
+        self.sample_service_games = load("sample_service_games")
+
+    def _format_index(self, best_of):
+        best_of = np.asarray(best_of)
+        if not np.isin(best_of, FORMATS).all():
+            raise ValueError(f"Unsupported format in {np.unique(best_of)}; tables cover {FORMATS}.")
+        return np.where(best_of == 5, 1, 0)
+
+    def _locate(self, hold):
+        """Lower grid index and fractional offset of each hold."""
+        position = (np.clip(hold, self.grid[0], self.grid[-1]) - self.grid[0]) / HOLD_STEP
+        lower = np.minimum(np.floor(position).astype(int), len(self.grid) - 2)
+        return lower, position - lower
+
+    def _interpolate(self, table, hold_a, hold_b, best_of):
+        f = self._format_index(best_of)
+        i, u = self._locate(np.asarray(hold_a, dtype=float))
+        j, v = self._locate(np.asarray(hold_b, dtype=float))
+        if table.ndim > 3:
+            u, v = u[..., None], v[..., None]
+        return ((1 - u) * (1 - v) * table[f, i, j] + u * (1 - v) * table[f, i + 1, j]
+                + (1 - u) * v * table[f, i, j + 1] + u * v * table[f, i + 1, j + 1])
+
+    def match_win(self, hold_a, hold_b, best_of=3):
+        """P(A wins), random first server."""
+        return self._interpolate(self.match_win_table, hold_a, hold_b, best_of)
+
+    def expected_points(self, hold_a, hold_b, aces_a, aces_b, double_faults_a,
+                        double_faults_b, best_of=3):
+        """
+        Expected DK points of both players, (n_matches, 2), with no Monte
+        Carlo: the base expectation plus aces / double faults (Poisson per
+        service game) over the service-game distribution.
+        """
+        columns = []
+        for ha, hb, aces, dfs in ((hold_a, hold_b, aces_a, double_faults_a),
+                                  (hold_b, hold_a, aces_b, double_faults_b)):
+            # B's view of the match is A's table with the holds swapped
+            best_of_3 = np.asarray(best_of) == 3
+            base = self._interpolate(self.expected_base, ha, hb, best_of)
+            pmf = self._interpolate(self.service_games_pmf, ha, hb, best_of)
+            k = np.arange(MAX_SERVICE_GAMES)
+            mean_sg = pmf @ k
+            # P(no double fault) = E[exp(-rate * service games)]
+            no_df = (pmf * np.exp(-np.asarray(dfs, dtype=float)[..., None] * k)).sum(axis=-1)
+            columns.append(base
+                           + np.asarray(aces) * mean_sg * _rule('ace', best_of_3)
+                           + np.asarray(dfs) * mean_sg * _rule('double_fault', best_of_3)
+                           + no_df * _rule('no_double_fault', best_of_3))
+        return np.stack(columns, axis=-1)
+
+    def sample_scores(self, hold_a, hold_b, aces_a, aces_b, double_faults_a,
+                      double_faults_b, best_of, n_sims, rng):
+        """
+        (n_sims, 2 * n_matches) float32 DK scores drawn from the stored
+        per-cell distributions, in the simulate_match_events column layout.
+        """
+        hold_a = np.asarray(hold_a, dtype=float)
+        hold_b = np.asarray(hold_b, dtype=float)
+        n_matches = len(hold_a)
+        f = self._format_index(np.broadcast_to(best_of, hold_a.shape))
+        i, u = self._locate(hold_a)
+        j, v = self._locate(hold_b)
+        shape = (n_sims, n_matches)
+        i = i + (rng.random(shape) < u)
+        j = j + (rng.random(shape) < v)
+        k = rng.integers(self.samples, size=shape)
+
+        base = self.sample_base[f, i, j, k]
+        sg = self.sample_service_games[f, i, j, k].astype(np.int32)
+        aces = rng.poisson(sg * np.stack([aces_a, aces_b], axis=-1))
+        dfs = rng.poisson(sg * np.stack([double_faults_a, double_faults_b], axis=-1))
+
+        best_of_3 = (np.asarray(best_of) == 3)[..., None]
+        scores = (base + aces * _rule('ace', best_of_3)
+                  + dfs * _rule('double_fault', best_of_3)
+                  + (dfs == 0) * _rule('no_double_fault', best_of_3))
+        return scores.reshape(n_sims, 2 * n_matches).astype(np.float32)
+
+
+def hold_inputs(inputs):
+    """
+    Lookup-table arguments from a match_engine.match_inputs dict
+    (serve point probabilities converted back to holds).
+    """
+    return {
+        'hold_a': np.interp(inputs['pa'], *game_win_table()),
+        'hold_b': np.interp(inputs['pb'], *game_win_table()),
+        'aces_a': inputs['aces_a'],
+        'aces_b': inputs['aces_b'],
+        'double_faults_a': inputs['double_faults_a'],
+        'double_faults_b': inputs['double_faults_b'],
+        'best_of': inputs['best_of'],
+    }
+
+
+if __name__ == "__main__":
+    import time
+
+    start = time.perf_counter()
+    build_tables()
+    print(f"Built tables in {LOOKUP_DIR} in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,308 @@
+# match_engine.py
+
+import numpy as np
+import pandas as pd
+from functools import lru_cache
+
+# Fallbacks when a row has no serve/return or ace/double-fault stats
+# (same values as sim_prep.baseline_estimation.baseline_stats).
+DEFAULT_STATS = {
+    "ServiceGamesWon": 0.60,
+    "ReturnGamesWon": 0.35,
+    "AcesPerServiceGame": 0.35,
+    "DoubleFaultsPerServiceGame": 0.28,
+}
+
+# Keep every probability away from 0/1 so the tables stay invertible.
+MIN_PROB = 0.01
+MAX_PROB = 0.99
+
+GRID_SIZE = 2001
+
+
+def game_win_probability(p):
+    """
+    Probability that the server holds, given the probability p of winning
+    each service point (standard closed form incl. deuce).
+    """
+    p = np.asarray(p, dtype=float)
+    q = 1 - p
+    before_deuce = p**4 * (1 + 4 * q + 10 * q**2)
+    deuce = 20 * p**3 * q**3 * p**2 / (1 - 2 * p * q)
+    return before_deuce + deuce
+
+
+@lru_cache(maxsize=None)
+def game_win_table():
+    """
+    Precomputed (serve point prob -> hold prob) table on a fine grid.
+    Returns (point_probs, hold_probs); hold_probs is strictly increasing.
+    """
+    point_probs = np.linspace(0, 1, GRID_SIZE)
+    return point_probs, game_win_probability(point_probs)
+
+
+def serve_point_probability(hold_prob):
+    """
+    Invert the game-win table: serve point prob that gives hold_prob.
+    """
+    point_probs, hold_probs = game_win_table()
+    hold_prob = np.clip(hold_prob, MIN_PROB, MAX_PROB)
+    return np.interp(hold_prob, hold_probs, point_probs)
+
+
+def tiebreak_win_probability(pa, pb):
+    """
+    Probability that A wins a 7-point tiebreak where A serves first.
+    pa / pb are each player's serve point probabilities (arrays allowed).
+    """
+    pa = np.asarray(pa, dtype=float)
+    pb = np.asarray(pb, dtype=float)
+
+    def a_wins_point(n):
+        # A serves point 0, then players alternate every two points
+        return pa if ((n + 1) // 2) % 2 == 0 else 1 - pb
+
+    reach = {(0, 0): np.ones(np.broadcast(pa, pb).shape)}
+    win = np.zeros_like(reach[(0, 0)])
+    for total in range(12):
+        for i in range(max(0, total - 6), min(total, 6) + 1):
+            j = total - i
+            if (i, j) not in reach:
+                continue
+            prob = reach.pop((i, j))
+            p_point = a_wins_point(total)
+            if i == 6 and j <= 5:
+                win += prob * p_point
+            else:
+                reach[(i + 1, j)] = reach.get((i + 1, j), 0) + prob * p_point
+            if j == 6 and i <= 5:
+                continue
+            reach[(i, j + 1)] = reach.get((i, j + 1), 0) + prob * (1 - p_point)
+
+    # From 6-6 every pair of points has one A serve and one B serve
+    a_pair = pa * (1 - pb)
+    b_pair = (1 - pa) * pb
+    return win + reach[(6, 6)] * a_pair / (a_pair + b_pair)
+
+
+def set_outcome_probabilities(hold_a, hold_b, tiebreak_a, a_serves_first=True):
+    """
+    Joint distribution of a set's winner and the parity of its game count
+    (an odd count hands the first serve of the next set to the other player).
+    tiebreak_a is P(A wins the 6-6 tiebreak), which is served first by
+    whoever served first in the set.
+    Returns {(a_won, even_games): probability}.
+    """
+    hold_a = np.asarray(hold_a, dtype=float)
+    hold_b = np.asarray(hold_b, dtype=float)
+    tiebreak_a = np.asarray(tiebreak_a, dtype=float)
+
+    reach = {(0, 0): np.ones(np.broadcast(hold_a, hold_b).shape)}
+    outcomes = {key: 0 for key in ((True, True), (True, False), (False, True), (False, False))}
+    for total in range(12):
+        for i in range(0, total + 1):
+            j = total - i
+            if (i, j) not in reach:
+                continue
+            prob = reach.pop((i, j))
+            a_serving = (total % 2 == 0) == a_serves_first
+            p_game = hold_a if a_serving else 1 - hold_b
+            for a_game, p in ((True, p_game), (False, 1 - p_game)):
+                ni, nj = (i + 1, j) if a_game else (i, j + 1)
+                if (ni >= 6 or nj >= 6) and abs(ni - nj) >= 2:
+                    key = (ni > nj, (total + 1) % 2 == 0)
+                    outcomes[key] = outcomes[key] + prob * p
+                else:
+                    reach[(ni, nj)] = reach.get((ni, nj), 0) + prob * p
+
+    # 6-6 => tiebreak, 13 games in the set
+    outcomes[(True, False)] = outcomes[(True, False)] + reach[(6, 6)] * tiebreak_a
+    outcomes[(False, False)] = outcomes[(False, False)] + reach[(6, 6)] * (1 - tiebreak_a)
+    return outcomes
+
+
+def match_win_probability(pa, pb, best_of=3):
+    """
+    Exact probability that A wins the match from serve point probabilities,
+    with A serving first and a standard tiebreak at 6-6 in every set.
+    """
+    pa = np.asarray(pa, dtype=float)
+    pb = np.asarray(pb, dtype=float)
+    hold_a = game_win_probability(pa)
+    hold_b = game_win_probability(pb)
+    set_tables = {
+        True: set_outcome_probabilities(hold_a, hold_b, tiebreak_win_probability(pa, pb), True),
+        False: set_outcome_probabilities(hold_a, hold_b, 1 - tiebreak_win_probability(pb, pa), False),
+    }
+
+    sets_needed = best_of // 2 + 1
+    # state: (sets_a, sets_b, a_serves_first) -> probability
+    reach = {(0, 0, True): np.ones(np.broadcast(pa, pb).shape)}
+    win = np.zeros_like(reach[(0, 0, True)])
+    while reach:
+        next_reach = {}
+        for (sa, sb, a_first), prob in reach.items():
+            for (a_won, even_games), p_set in set_tables[a_first].items():
+                nsa, nsb = (sa + 1, sb) if a_won else (sa, sb + 1)
+                p = prob * p_set
+                if nsa == sets_needed:
+                    win = win + p
+                elif nsb < sets_needed:
+                    key = (nsa, nsb, a_first == even_games)
+                    next_reach[key] = next_reach.get(key, 0) + p
+        reach = next_reach
+    return win
+
+
+def simulate_match_events(pa, pb, aces_a, aces_b, double_faults_a, double_faults_b,
+                          best_of, n_sims, rng, return_service_games=False):
+    """
+    Game-by-game Monte Carlo of n_matches matches at once, n_sims times each.
+    Every input is an array of length n_matches: serve point probabilities,
+    aces / double faults per service game, and best_of (3 or 5).
+    Service games are drawn from the precomputed hold table, 6-6 sets from
+    the tiebreak table; aces and double faults are Poisson per service game.
+
+    Returns a dict of int16 event arrays shaped (n_sims, 2 * n_matches) where
+    column 2*j is player A of match j and 2*j + 1 is player B. With
+    return_service_games=True it also holds 'service_games' (tiebreaks
+    excluded), the exposure the ace / double-fault counts are drawn over.
+    """
+    n_matches = len(pa)
+    shape = (n_sims, n_matches)
+    hold_a = np.interp(pa, *game_win_table())
+    hold_b = np.interp(pb, *game_win_table())
+    tb_a_first = tiebreak_win_probability(pa, pb)
+    tb_b_first = 1 - tiebreak_win_probability(pb, pa)
+    sets_needed = np.asarray(best_of) // 2 + 1
+
+    sets_a = np.zeros(shape, dtype=np.int16)
+    sets_b = np.zeros(shape, dtype=np.int16)
+    games_a = np.zeros(shape, dtype=np.int16)
+    games_b = np.zeros(shape, dtype=np.int16)
+    breaks_a = np.zeros(shape, dtype=np.int16)
+    breaks_b = np.zeros(shape, dtype=np.int16)
+    clean_a = np.zeros(shape, dtype=np.int16)
+    clean_b = np.zeros(shape, dtype=np.int16)
+    service_games_a = np.zeros(shape, dtype=np.int16)
+    service_games_b = np.zeros(shape, dtype=np.int16)
+    a_serving = rng.random(shape) < 0.5
+
+    for _ in range(int(np.max(best_of))):
+        in_match = (sets_a < sets_needed) & (sets_b < sets_needed)
+        if not in_match.any():
+            break
+        tiebreak_a = np.where(a_serving, tb_a_first, tb_b_first)
+        set_a = np.zeros(shape, dtype=np.int16)
+        set_b = np.zeros(shape, dtype=np.int16)
+        in_set = in_match.copy()
+
+        for _ in range(13):
+            tiebreak = (set_a == 6) & (set_b == 6)
+            p_game = np.where(tiebreak, tiebreak_a, np.where(a_serving, hold_a, 1 - hold_b))
+            a_won = rng.random(shape) < p_game
+            b_won = ~a_won & in_set
+            a_won &= in_set
+            regular = in_set & ~tiebreak
+
+            set_a += a_won
+            set_b += b_won
+            breaks_a += a_won & ~a_serving & regular
+            breaks_b += b_won & a_serving & regular
+            service_games_a += a_serving & regular
+            service_games_b += ~a_serving & regular
+            a_serving ^= in_set
+
+            in_set &= ~(((set_a >= 6) | (set_b >= 6)) & (np.abs(set_a - set_b) >= 2)
+                        | (set_a == 7) | (set_b == 7))
+            if not in_set.any():
+                break
+
+        a_took_set = in_match & (set_a > set_b)
+        b_took_set = in_match & (set_b > set_a)
+        sets_a += a_took_set
+        sets_b += b_took_set
+        games_a += set_a
+        games_b += set_b
+        clean_a += a_took_set & (set_b == 0)
+        clean_b += b_took_set & (set_a == 0)
+
+    aces_a = rng.poisson(service_games_a * np.asarray(aces_a))
+    aces_b = rng.poisson(service_games_b * np.asarray(aces_b))
+    double_faults_a = rng.poisson(service_games_a * np.asarray(double_faults_a))
+    double_faults_b = rng.poisson(service_games_b * np.asarray(double_faults_b))
+
+    def interleave(a, b):
+        out = np.empty((n_sims, 2 * n_matches), dtype=np.int16)
+        out[:, 0::2] = a
+        out[:, 1::2] = b
+        return out
+
+    match_won = interleave(sets_a == sets_needed, sets_b == sets_needed)
+    sets_lost = interleave(sets_b, sets_a)
+    events = {
+        'games_won': interleave(games_a, games_b),
+        'games_lost': interleave(games_b, games_a),
+        'sets_won': interleave(sets_a, sets_b),
+        'sets_lost': sets_lost,
+        'match_won': match_won,
+        'aces': interleave(aces_a, aces_b),
+        'double_faults': interleave(double_faults_a, double_faults_b),
+        'breaks': interleave(breaks_a, breaks_b),
+        'clean_sets': interleave(clean_a, clean_b),
+        'straight_sets': (match_won == 1) & (sets_lost == 0),
+    }
+    if return_service_games:
+        events['service_games'] = interleave(service_games_a, service_games_b)
+    return events
+
+
+def _player_stat(df, column, opponent=False):
+    """
+    Column values for each row's player (or opponent) with DEFAULT_STATS
+    fallbacks. Opponent values come from an 'Opponent<column>' column if
+    present, else from the opponent's own row in df (as in sim_ready.csv).
+    """
+    default = DEFAULT_STATS[column]
+    own = df[column] if column in df else pd.Series(np.nan, index=df.index)
+    if not opponent:
+        return own.fillna(default).to_numpy(dtype=float)
+
+    opponent_column = f"Opponent{column}"
+    if opponent_column in df:
+        values = df[opponent_column]
+    else:
+        by_name = pd.Series(own.to_numpy(), index=df["Name"].to_numpy())
+        by_name = by_name[~by_name.index.duplicated()]
+        values = df["Opponent"].map(by_name)
+    return values.fillna(default).to_numpy(dtype=float)
+
+
+def match_inputs(df):
+    """
+    Build simulate_match_events inputs from a sim_ready-style DataFrame,
+    treating 'Name' as player A and 'Opponent' as player B of each row.
+
+    Each side's hold probability against this opponent is the average of its
+    own ServiceGamesWon and the opponent's ReturnGamesWon complement; the
+    hold is then converted to a serve point probability through the table.
+    """
+    sgw_a = _player_stat(df, "ServiceGamesWon")
+    rgw_a = _player_stat(df, "ReturnGamesWon")
+    sgw_b = _player_stat(df, "ServiceGamesWon", opponent=True)
+    rgw_b = _player_stat(df, "ReturnGamesWon", opponent=True)
+
+    hold_a = (sgw_a + (1 - rgw_b)) / 2
+    hold_b = (sgw_b + (1 - rgw_a)) / 2
+    best_of = df["BestOf"].fillna(3).to_numpy(dtype=int) if "BestOf" in df else np.full(len(df), 3)
+
+    return {
+        'pa': serve_point_probability(hold_a),
+        'pb': serve_point_probability(hold_b),
+        'aces_a': _player_stat(df, "AcesPerServiceGame"),
+        'aces_b': _player_stat(df, "AcesPerServiceGame", opponent=True),
+        'double_faults_a': _player_stat(df, "DoubleFaultsPerServiceGame"),
+        'double_faults_b': _player_stat(df, "DoubleFaultsPerServiceGame", opponent=True),
+        'best_of': best_of,
+    }
@@ -0,0 +1,158 @@
+# metrics.py
+
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+METRICS_FILE = "logs/metrics.json"
+PROFILE_DIR = "logs/profiles"
+
+# Set to "cprofile" or "pyinstrument" to dump a profile of each profiled() run
+PROFILE_ENV = "PIPELINE_PROFILE"
+
+# Process-wide stage timings and counters:
+# {'timers': {name -> {'calls', 'seconds', 'max'}}, 'counters': {name -> n}}
+_METRICS = {'timers': {}, 'counters': {}}
+_LOCK = threading.Lock()
+
+
+def _record(name, seconds):
+    with _LOCK:
+        entry = _METRICS['timers'].setdefault(name, {'calls': 0, 'seconds': 0.0, 'max': 0.0})
+        entry['calls'] += 1
+        entry['seconds'] += seconds
+        entry['max'] = max(entry['max'], seconds)
+
+
+class _Timer:
+    def __init__(self, name):
+        self.name = name
+        self._start = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        _record(self.name, time.perf_counter() - self._start)
+        return False
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _record(self.name, time.perf_counter() - start)
+        return wrapper
+
+
+def timer(name):
+    """
+    Time a pipeline stage, as a context manager or a decorator:
+
+        with timer("csv_write"):
+            ...
+
+        @timer("scoring")
+        def calculate_draftkings_points_array(...):
+
+    Each call adds to the stage's call count and total / max seconds.
+    """
+    return _Timer(name)
+
+
+def count(name, n=1):
+    """Add n to a counter (cache hits, names resolved, rows estimated...)."""
+    with _LOCK:
+        _METRICS['counters'][name] = _METRICS['counters'].get(name, 0) + n
+
+
+def snapshot():
+    """Copy of the current timers and counters."""
+    with _LOCK:
+        return {
+            'timers': {k: dict(v) for k, v in _METRICS['timers'].items()},
+            'counters': dict(_METRICS['counters']),
+        }
+
+
+def reset():
+    with _LOCK:
+        _METRICS['timers'].clear()
+        _METRICS['counters'].clear()
+
+
+def summary():
+    """One line per stage and counter, slowest stage first."""
+    data = snapshot()
+    lines = []
+    for name, t in sorted(data['timers'].items(), key=lambda kv: -kv[1]['seconds']):
+        lines.append(f"{name:<20} {t['calls']:>6} calls {t['seconds']:>10.4f}s "
+                     f"(max {t['max']:.4f}s)")
+    for name, n in sorted(data['counters'].items()):
+        lines.append(f"{name:<20} {n:>6}")
+    return "\n".join(lines)
+
+
+def write_json(path=METRICS_FILE):
+    """Write the snapshot (with a timestamp) to path, replacing it atomically."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    data = snapshot()
+    data['written_at'] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+    return path
+
+
+@contextmanager
+def profiled(name, tool=None, out_dir=PROFILE_DIR):
+    """
+    Opt-in profiler around a whole run. tool is "cprofile" or "pyinstrument"
+    (default: the PIPELINE_PROFILE environment variable); when neither is
+    set this only times the block. Profiles are written to
+    out_dir/<name>_<timestamp>.prof (cProfile, open with snakeviz or pstats)
+    or .html (pyinstrument), next to a METRICS_FILE snapshot.
+    """
+    tool = (tool or os.environ.get(PROFILE_ENV, "")).lower()
+    profiler = None
+    if tool == "cprofile":
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    elif tool == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            logging.warning("pyinstrument is not installed; profiling %s skipped.", name)
+        else:
+            profiler = Profiler()
+            profiler.start()
+    elif tool:
+        logging.warning("Unknown profiler %r; expected cprofile or pyinstrument.", tool)
+
+    try:
+        with timer(name):
+            yield
+    finally:
+        if profiler is not None:
+            os.makedirs(out_dir, exist_ok=True)
+            stem = os.path.join(out_dir, f"{name}_{time.strftime('%Y%m%d_%H%M%S')}")
+            if tool == "cprofile":
+                profiler.disable()
+                profiler.dump_stats(stem + ".prof")
+                logging.info("Wrote profile %s.prof", stem)
+            else:
+                profiler.stop()
+                with open(stem + ".html", "w") as f:
+                    f.write(profiler.output_html())
+                logging.info("Wrote profile %s.html", stem)
+            write_json()
+
@@ -0,0 +1,165 @@
+# opto.py
+
+import heapq
+import logging
+from math import gcd
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+from functions.sim_results import SimResults
+
+# DraftKings tennis classic
+SALARY_CAP = 50000
+ROSTER_SIZE = 6
+ROSTER_POSITION = "P"
+
+
+def load_pool(pool_file, roster_position=ROSTER_POSITION):
+    """
+    Load the DK pool CSV and keep the rows for roster_position.
+    Adds 'MatchID': players sharing a 'Game Info' string share a match.
+    """
+    pool = pd.read_csv(pool_file)
+    pool = pool[pool["Roster Position"] == roster_position].reset_index(drop=True)
+    pool["MatchID"] = pd.factorize(pool["Game Info"])[0]
+    return pool
+
+
+def salary_units(salaries):
+    """
+    Express salaries in their greatest common unit (DK salaries step by 100)
+    so the bound table stays small. Returns (unit, integer salaries).
+    """
+    salaries = np.asarray(salaries, dtype=np.int64)
+    unit = reduce(gcd, salaries.tolist(), 0) or 1
+    return unit, salaries // unit
+
+
+def bound_table(projections, salary_steps, match_ids, roster_size, cap_steps):
+    """
+    Backward knapsack table over matches.
+    best[i, k, s] = highest projection reachable from matches i.. by choosing
+    exactly k players (at most one per match) with salary steps <= s
+    (-inf if impossible). Also returns the ordered list of matches, each a
+    list of player indices.
+    """
+    matches = [np.flatnonzero(match_ids == m).tolist() for m in np.unique(match_ids)]
+    best = np.full((len(matches) + 1, roster_size + 1, cap_steps + 1), -np.inf)
+    best[len(matches), 0, :] = 0.0
+
+    for i in range(len(matches) - 1, -1, -1):
+        best[i] = best[i + 1]
+        for p in matches[i]:
+            w = salary_steps[p]
+            if w > cap_steps:
+                continue
+            candidate = best[i + 1, :-1, :cap_steps + 1 - w] + projections[p]
+            np.maximum(best[i, 1:, w:], candidate, out=best[i, 1:, w:])
+    return best, matches
+
+
+def optimize_lineups(projections, salaries, match_ids, n_lineups=150,
+                     salary_cap=SALARY_CAP, roster_size=ROSTER_SIZE):
+    """
+    Exact top-N lineups by total projection under the salary cap, with
+    exactly roster_size players and at most one player per match.
+
+    Best-first branch and bound over matches: every partial lineup is keyed by
+    its value plus the bound table's best completion, which is exact, so
+    complete lineups come off the heap in descending order.
+    Returns a list of (player index tuple, projected points).
+    """
+    projections = np.asarray(projections, dtype=float)
+    match_ids = np.asarray(match_ids)
+    usable = ~np.isnan(projections)
+    unit, salary_steps = salary_units(np.asarray(salaries)[usable])
+    cap_steps = int(salary_cap // unit)
+    index = np.flatnonzero(usable)
+    projections = projections[usable]
+
+    best, matches = bound_table(projections, salary_steps, match_ids[usable],
+                                roster_size, cap_steps)
+    n_matches = len(matches)
+    if not np.isfinite(best[0, roster_size, cap_steps]):
+        logging.warning("No lineup fits the salary cap and roster size.")
+        return []
+
+    # heap entries: (-bound, tie, match index, picks left, cap left, value, picks)
+    heap = [(-best[0, roster_size, cap_steps], 0, 0, roster_size, cap_steps, 0.0, ())]
+    tie = 1
+    lineups = []
+    while heap and len(lineups) < n_lineups:
+        neg_bound, _, i, left, cap_left, value, picks = heapq.heappop(heap)
+        if left == 0:
+            lineups.append((tuple(int(index[p]) for p in picks), float(-neg_bound)))
+            continue
+
+        # skip match i
+        if i + 1 < n_matches and np.isfinite(best[i + 1, left, cap_left]):
+            heapq.heappush(heap, (-(value + best[i + 1, left, cap_left]), tie,
+                                  i + 1, left, cap_left, value, picks))
+            tie += 1
+        # or take one of its players
+        for p in matches[i]:
+            w = salary_steps[p]
+            if w > cap_left:
+                continue
+            rest = best[i + 1, left - 1, cap_left - w]
+            if not np.isfinite(rest):
+                continue
+            new_value = value + projections[p]
+            heapq.heappush(heap, (-(new_value + rest), tie, i + 1, left - 1,
+                                  cap_left - w, new_value, picks + (p,)))
+            tie += 1
+
+    return lineups
+
+
+def projections_from_sim(sim_result, stat="mean"):
+    """
+    Per-player projection from a simulate_all_matches_batch result or a
+    SimResults reader: 'mean', 'median' or a percentile like 'p90'.
+    Returns a Series by player. A player appearing in several rows keeps the
+    first column.
+    """
+    if isinstance(sim_result, SimResults):
+        return sim_result.projections(stat)
+    scores = sim_result["scores"]
+    if stat == "mean":
+        values = scores.mean(axis=0)
+    elif stat == "median":
+        values = np.median(scores, axis=0)
+    elif stat.startswith("p"):
+        values = np.percentile(scores, float(stat[1:]), axis=0)
+    else:
+        raise ValueError(f"Unknown projection stat: {stat}")
+    projections = pd.Series(values, index=sim_result["players"])
+    return projections[~projections.index.duplicated()]
+
+
+def build_lineups(pool, projections, n_lineups=150, salary_cap=SALARY_CAP,
+                  roster_size=ROSTER_SIZE):
+    """
+    Top-N lineups for a pool from load_pool and a Series of projections keyed
+    by player name. Returns one row per lineup: P1..P6 in the pool's
+    'Name + ID' format, Salary and Projection.
+    """
+    player_projections = pool["Name"].map(projections).to_numpy(dtype=float)
+    missing = pool.loc[np.isnan(player_projections), "Name"].tolist()
+    if missing:
+        logging.warning("No projection for %s pool players: %s", len(missing), missing)
+
+    lineups = optimize_lineups(player_projections, pool["Salary"].to_numpy(),
+                               pool["MatchID"].to_numpy(), n_lineups, salary_cap, roster_size)
+
+    rows = []
+    for players, points in lineups:
+        players = sorted(players, key=lambda p: -pool.at[p, "Salary"])
+        row = {f"P{slot + 1}": pool.at[p, "Name + ID"] for slot, p in enumerate(players)}
+        row["Salary"] = int(pool.loc[list(players), "Salary"].sum())
+        row["Projection"] = round(float(points), 2)
+        rows.append(row)
+    logging.info("Built %s lineups.", len(rows))
+    return pd.DataFrame(rows)
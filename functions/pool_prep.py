@@ -1,9 +1,13 @@
 # data_preparation.py
 
 import pandas as pd
+import numpy as np
 import re
 from rapidfuzz import process, fuzz
 
+from functions.sim_prep.stats_db import load_stats_store
+from functions.sim_prep.name_resolution import NameResolver
+
 def parse_opponent(game_info, player_team):
     """
     Extract the opponent from strings like:
@@ -49,6 +53,39 @@ def parse_opponent(game_info, player_team):
     return None
 
 
+def parse_opponents(game_info, player_team):
+    """
+    Vectorized parse_opponent over whole columns.
+    Splits every 'Game Info' with string ops; only rows where neither side
+    equals 'player_team' go through parse_opponent's fuzzy fallback.
+    Returns a Series of opponents (None where parsing fails).
+    """
+    game_info = game_info.map(str)
+    player_team = player_team.map(str)
+
+    main_part = game_info.str.extract(r"^(.*?)\s*\d{2}/\d{2}/\d{4}", expand=False)
+    main_part = main_part.str.strip().fillna(game_info)
+
+    parts = main_part.str.split("@")
+    two_sides = (parts.str.len() == 2).to_numpy()
+    home = parts.str[0].str.strip().to_numpy(dtype=object)
+    away = parts.str[-1].str.strip().to_numpy(dtype=object)
+    team = player_team.to_numpy(dtype=object)
+
+    opponent = np.full(len(game_info), None, dtype=object)
+    is_home = two_sides & (team == home)
+    is_away = two_sides & ~is_home & (team == away)
+    opponent[is_home] = away[is_home]
+    opponent[is_away] = home[is_away]
+
+    # Fuzzy side-matching only for the rows a direct match did not resolve
+    unresolved = np.flatnonzero(two_sides & ~is_home & ~is_away)
+    for i in unresolved:
+        opponent[i] = parse_opponent(game_info.iat[i], player_team.iat[i])
+
+    return pd.Series(opponent, index=game_info.index, dtype=object)
+
+
 def fuzzy_match_names(raw_name, valid_names, threshold=90, potential_warn=75):
     """
     Attempt fuzzy matching between raw_name and a list of valid_names.
@@ -70,12 +107,10 @@ def fuzzy_match_names(raw_name, valid_names, threshold=90, potential_warn=75):
 def load_player_stats(atp_file, wta_file):
     """
     Combine stats from ATP & WTA CSVs (both must have a 'Player' column).
-    Return a DataFrame with all rows from both.
+    Return a DataFrame with all rows from both (one per player and surface).
+    Served from the cached stats store, see sim_prep.stats_db.
     """
-    atp_df = pd.read_csv(atp_file)
-    wta_df = pd.read_csv(wta_file)
-    combined = pd.concat([atp_df, wta_df], ignore_index=True)
-    return combined
+    return load_stats_store(atp_file, wta_file).frame
 
 
 def deduplicate_matches(df):
@@ -86,10 +121,16 @@ def deduplicate_matches(df):
     # Remove rows where Opponent is None/NaN
     df = df.dropna(subset=["Opponent"]).copy()
 
-    df["MatchKey"] = df.apply(
-        lambda row: tuple(sorted([row["Name"], row["Opponent"]])), axis=1
-    )
-    df = df.drop_duplicates(subset="MatchKey").reset_index(drop=True)
+    # Order-independent key from elementwise min/max of the two names
+    name = df["Name"].to_numpy(dtype=object)
+    opponent = df["Opponent"].to_numpy(dtype=object)
+    first = name <= opponent
+    low = np.where(first, name, opponent)
+    high = np.where(first, opponent, name)
+
+    keep = ~pd.DataFrame({"low": low, "high": high}).duplicated().to_numpy()
+    df = df[keep].reset_index(drop=True)
+    df["MatchKey"] = list(zip(low[keep], high[keep]))
     return df
 
 
@@ -112,33 +153,33 @@ def load_and_clean_data(
     raw_df = pd.read_csv(raw_csv_path)
 
     # 2) Parse Opponent
-    raw_df["Opponent"] = raw_df.apply(
-        lambda row: parse_opponent(
-            str(row["Game Info"]),
-            str(row["TeamAbbrev"])
-        ),
-        axis=1
-    )
+    raw_df["Opponent"] = parse_opponents(raw_df["Game Info"], raw_df["TeamAbbrev"])
 
     # 3) (Optional) fuzzy match with stats
     if do_fuzzy_match and atp_file and wta_file:
-        stats_df = load_player_stats(atp_file, wta_file)
-        valid_names = stats_df["Player"].unique()
-
-        raw_df["FuzzyPlayer"] = raw_df["Name"].apply(
-            lambda nm: fuzzy_match_names(nm, valid_names, threshold, potential_warn)
-        )
-        raw_df["FuzzyOpponent"] = raw_df["Opponent"].apply(
-            lambda opp: fuzzy_match_names(opp, valid_names, threshold, potential_warn)
-        )
-
-        # Example: pull Elo for player
-        stats_df_small_p = stats_df[["Player", "Elo"]].rename(columns={"Player": "FuzzyPlayer"})
-        raw_df = pd.merge(raw_df, stats_df_small_p, how="left", on="FuzzyPlayer")
-
-        # And for opponent
-        stats_df_small_o = stats_df[["Player", "Elo"]].rename(columns={"Player": "FuzzyOpponent", "Elo": "OpponentElo"})
-        raw_df = pd.merge(raw_df, stats_df_small_o, how="left", on="FuzzyOpponent")
+        stats = load_stats_store(atp_file, wta_file)
+        valid_names = stats.players()
+
+        # Resolve every Name and Opponent in one batch
+        resolver = NameResolver(valid_names)
+        resolved = resolver.resolve(pd.concat([raw_df["Name"], raw_df["Opponent"]]).unique())
+        best = {}
+        for raw_name, candidates in resolved.items():
+            best[raw_name] = None
+            if candidates:
+                name, score = candidates[0]
+                if score >= threshold:
+                    best[raw_name] = name
+                elif score >= potential_warn:
+                    print(f"[FYI] Potential fuzzy match for '{raw_name}': '{name}' (score: {score})")
+
+        raw_df["FuzzyPlayer"] = raw_df["Name"].map(best)
+        raw_df["FuzzyOpponent"] = raw_df["Opponent"].map(best)
+
+        # Pull Elo (the same on every surface row) for player and opponent
+        elo = stats.player_values("Elo")
+        raw_df["Elo"] = raw_df["FuzzyPlayer"].map(elo)
+        raw_df["OpponentElo"] = raw_df["FuzzyOpponent"].map(elo)
 
     return raw_df
 
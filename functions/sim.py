@@ -1,13 +1,16 @@
 # simulation.py
 
+import hashlib
 import pandas as pd
 import numpy as np
 import logging
-from csvs.tennis_sim.dk_scoring import calculate_draftkings_points
+from functions.dk_scoring import calculate_draftkings_points, calculate_draftkings_points_array
+from functions.match_engine import match_inputs, simulate_match_events
+from functions.lookup_tables import hold_inputs, load_tables
+from functions.metrics import profiled, timer
+from functions.sim_stats import SimStats
 
-logging.basicConfig(level=logging.INFO)
-
-def simulate_match_with_stats(row):
+def simulate_match_with_stats(row, rng=None):
     """
     Use the row's Elo to compute a probability that 'Name' wins.
     """
@@ -19,9 +22,9 @@ def simulate_match_with_stats(row):
     elo_diff = player_elo - opponent_elo
     player_win_prob = 1 / (1 + np.exp(-elo_diff / 400))
 
-    return simulate_match_generic(row, player_win_prob)
+    return simulate_match_generic(row, player_win_prob, rng)
 
-def simulate_match_with_odds(row):
+def simulate_match_with_odds(row, rng=None):
     """
     If you have an ImpliedWinPercentage or something similar, you can do that here.
     Or default to 50-50 if unknown.
@@ -29,12 +32,15 @@ def simulate_match_with_odds(row):
     implied_wp = row.get("ImpliedWinPercentage", 50)
     player_win_prob = implied_wp / 100.0
 
-    return simulate_match_generic(row, player_win_prob)
+    return simulate_match_generic(row, player_win_prob, rng)
 
-def simulate_match_generic(row, player_win_prob):
+def simulate_match_generic(row, player_win_prob, rng=None):
     """
     Generate random match events for 'Name' vs. 'Opponent' using player_win_prob.
+    Pass a numpy Generator as rng to control the draws (defaults to np.random).
     """
+    if rng is None:
+        rng = np.random
     player = row["Name"]
     opponent = row["Opponent"]
     salary = row["Salary"]
@@ -42,17 +48,17 @@ def simulate_match_generic(row, player_win_prob):
     opponent_salary = row.get("OpponentSalary", 4500)
 
     # Decide winner
-    winner = player if np.random.rand() < player_win_prob else opponent
+    winner = player if rng.random() < player_win_prob else opponent
 
     # Random events
-    aces_player = np.random.poisson(lam=0.65 * 12)
-    aces_opponent = np.random.poisson(lam=0.65 * 12)
-    double_faults_player = np.random.poisson(lam=0.05 * 12)
-    double_faults_opponent = np.random.poisson(lam=0.05 * 12)
-    breaks_player = np.random.poisson(lam=0.3 * 5)
-    breaks_opponent = np.random.poisson(lam=0.3 * 5)
-
-    games_won_player = np.random.poisson(lam=0.65 * 12)
+    aces_player = rng.poisson(lam=0.65 * 12)
+    aces_opponent = rng.poisson(lam=0.65 * 12)
+    double_faults_player = rng.poisson(lam=0.05 * 12)
+    double_faults_opponent = rng.poisson(lam=0.05 * 12)
+    breaks_player = rng.poisson(lam=0.3 * 5)
+    breaks_opponent = rng.poisson(lam=0.3 * 5)
+
+    games_won_player = rng.poisson(lam=0.65 * 12)
     # Assume a total of 12 games for demonstration
     games_won_opponent = 12 - games_won_player
 
@@ -100,16 +106,16 @@ def simulate_match_generic(row, player_win_prob):
         }
     ]
 
-def simulate_match(row):
+def simulate_match(row, rng=None):
     """
     Dispatcher that decides if we have stats-based (Elo in row),
     otherwise fallback to odds-based or 50-50.
     """
     # If 'Elo' in row is not null, we assume stats-based
     if pd.notnull(row.get("Elo", None)):
-        return simulate_match_with_stats(row)
+        return simulate_match_with_stats(row, rng)
     else:
-        return simulate_match_with_odds(row)
+        return simulate_match_with_odds(row, rng)
 
 def simulate_all_matches(df):
     """
@@ -125,3 +131,505 @@ def simulate_all_matches(df):
     # Flatten the list of lists
     flattened = [player for match in results for player in match]
     return pd.DataFrame(flattened)
+
+
+# ---------------------------------------------------------------------------
+# Batch Monte Carlo engine
+# ---------------------------------------------------------------------------
+
+def match_win_probabilities(df):
+    """
+    Vectorized version of the simulate_match dispatcher.
+    Returns one probability per row that 'Name' wins: Elo logistic where
+    the row has an Elo, otherwise ImpliedWinPercentage (or 50-50).
+    """
+    n = len(df)
+    elo = df["Elo"].to_numpy(dtype=float) if "Elo" in df else np.full(n, np.nan)
+    if "OpponentElo" in df:
+        opponent_elo = df["OpponentElo"].fillna(1500).to_numpy(dtype=float)
+    else:
+        opponent_elo = np.full(n, 1500.0)
+    if "ImpliedWinPercentage" in df:
+        implied_wp = df["ImpliedWinPercentage"].fillna(50).to_numpy(dtype=float)
+    else:
+        implied_wp = np.full(n, 50.0)
+
+    stats_prob = 1 / (1 + np.exp(-(elo - opponent_elo) / 400))
+    odds_prob = implied_wp / 100.0
+    return np.where(np.isnan(elo), odds_prob, stats_prob)
+
+
+def _batch_players(df):
+    """
+    Column layout shared by every batch result: match j owns columns
+    2*j ('Name') and 2*j + 1 ('Opponent').
+    """
+    n = len(df)
+    players = np.empty(2 * n, dtype=object)
+    players[0::2] = df["Name"].to_numpy()
+    players[1::2] = df["Opponent"].to_numpy()
+
+    salaries = np.empty(2 * n, dtype=float)
+    salaries[0::2] = df["Salary"].to_numpy(dtype=float) if "Salary" in df else np.nan
+    if "OpponentSalary" in df:
+        salaries[1::2] = df["OpponentSalary"].fillna(4500).to_numpy(dtype=float)
+    else:
+        salaries[1::2] = 4500
+    return players, salaries
+
+
+def _draw_batch_events(player_win_prob, n_sims, rng, uniforms=None):
+    """
+    Draw the simulate_match_generic events for every match at once.
+    Every array is shaped (n_sims, n_players) with players laid out as in
+    _batch_players. uniforms, (n_sims, n_matches), replaces the winner
+    draw (see win_uniforms).
+    """
+    n_matches = len(player_win_prob)
+    shape = (n_sims, n_matches)
+
+    if uniforms is None:
+        uniforms = rng.random(shape)
+    player_won = uniforms < player_win_prob
+    aces = rng.poisson(lam=0.65 * 12, size=(n_sims, 2 * n_matches))
+    double_faults = rng.poisson(lam=0.05 * 12, size=(n_sims, 2 * n_matches))
+    breaks = rng.poisson(lam=0.3 * 5, size=(n_sims, 2 * n_matches))
+
+    games_won_player = rng.poisson(lam=0.65 * 12, size=shape)
+    # Assume a total of 12 games for demonstration
+    games_won_opponent = 12 - games_won_player
+
+    match_won = np.empty((n_sims, 2 * n_matches), dtype=np.int16)
+    match_won[:, 0::2] = player_won
+    match_won[:, 1::2] = ~player_won
+
+    games_won = np.empty((n_sims, 2 * n_matches), dtype=np.int16)
+    games_won[:, 0::2] = games_won_player
+    games_won[:, 1::2] = games_won_opponent
+    games_lost = np.empty_like(games_won)
+    games_lost[:, 0::2] = games_won_opponent
+    games_lost[:, 1::2] = games_won_player
+
+    sets_won = 2 * match_won
+    sets_lost = 2 - sets_won
+
+    return {
+        'games_won': games_won,
+        'games_lost': games_lost,
+        'sets_won': sets_won,
+        'sets_lost': sets_lost,
+        'match_won': match_won,
+        'aces': aces.astype(np.int16),
+        'double_faults': double_faults.astype(np.int16),
+        'breaks': breaks.astype(np.int16),
+        'clean_sets': ((sets_won == 2) & (games_lost == 0)).astype(np.int16),
+        'straight_sets': sets_won == 2,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Variance reduction
+# ---------------------------------------------------------------------------
+
+SAMPLING_METHODS = ("random", "antithetic", "latin", "sobol")
+
+
+def win_uniforms(n_sims, n_matches, rng, sampling="random"):
+    """
+    (n_sims, n_matches) uniforms for the winner draw (win if u < p):
+
+      - "random":     plain pseudo-random draws
+      - "antithetic": the second half of the rows mirrors the first
+                      (u, 1 - u), so win counts per match are balanced
+      - "latin":      Latin hypercube: every match's column hits each of
+                      n_sims equal strata exactly once, in an independent
+                      random order per match
+      - "sobol":      scrambled Sobol points (needs scipy)
+
+    Every method keeps each u uniform, so estimates stay unbiased; only
+    their variance changes. Matches stay independent of each other.
+    """
+    shape = (n_sims, n_matches)
+    if sampling == "random":
+        return rng.random(shape)
+    if sampling == "antithetic":
+        half = rng.random(((n_sims + 1) // 2, n_matches))
+        return np.concatenate([half, 1 - half])[:n_sims]
+    if sampling == "latin":
+        strata = rng.permuted(np.tile(np.arange(n_sims), (n_matches, 1)), axis=1).T
+        return (strata + rng.random(shape)) / n_sims
+    if sampling == "sobol":
+        import warnings
+        try:
+            from scipy.stats import qmc
+        except ImportError:
+            raise ValueError("Sobol sampling needs scipy; use 'latin' instead.") from None
+        sampler = qmc.Sobol(d=n_matches, scramble=True, seed=rng)
+        with warnings.catch_warnings():
+            # Non-power-of-2 counts lose a little balance, not uniformity
+            warnings.simplefilter("ignore", UserWarning)
+            return sampler.random(n_sims)
+    raise ValueError(f"Unknown sampling method: {sampling}")
+
+
+def match_streams(df, crn_seed):
+    """
+    Common random numbers: one Generator per row, seeded by crn_seed (an
+    int or a tuple such as (seed, chunk)) and the row's players. The same
+    match draws the same numbers in every run with that seed, wherever it
+    sits in the slate, so scenario runs (changed odds, a late swap) differ
+    only by their inputs, not by sampling noise.
+    """
+    entropy = [int(s) for s in np.atleast_1d(crn_seed)]
+    streams = []
+    for name, opponent in zip(df["Name"].astype(str), df["Opponent"].astype(str)):
+        key = int.from_bytes(hashlib.sha1(f"{name}|{opponent}".encode()).digest()[:8], "little")
+        streams.append(np.random.default_rng(entropy + [key]))
+    return streams
+
+
+def _concat_events(per_match):
+    """Column-wise concatenation of single-match event dicts."""
+    return {name: np.concatenate([events[name] for events in per_match], axis=1)
+            for name in per_match[0]}
+
+
+def _draw_events(df, n_sims, rng, engine, sampling, crn_seed):
+    """
+    Events and best_of_3 flags of the vectorized mode, drawn from rng or,
+    with crn_seed, from each match's own stream (see match_streams).
+    """
+    if sampling != "random" and engine != "poisson":
+        raise ValueError("Sampling methods apply to the Poisson engine's winner draw.")
+    if engine == "poisson":
+        p = match_win_probabilities(df)
+        if crn_seed is None:
+            return _draw_batch_events(p, n_sims, rng, win_uniforms(n_sims, len(p), rng, sampling)), True
+        events = _concat_events([
+            _draw_batch_events(p[j:j + 1], n_sims, stream, win_uniforms(n_sims, 1, stream, sampling))
+            for j, stream in enumerate(match_streams(df, crn_seed))
+        ])
+        return events, True
+    if engine == "points":
+        inputs = match_inputs(df)
+        best_of_3 = np.repeat(inputs['best_of'] == 3, 2)
+        if crn_seed is None:
+            return simulate_match_events(n_sims=n_sims, rng=rng, **inputs), best_of_3
+        events = _concat_events([
+            simulate_match_events(n_sims=n_sims, rng=stream,
+                                  **{k: v[j:j + 1] for k, v in inputs.items()})
+            for j, stream in enumerate(match_streams(df, crn_seed))
+        ])
+        return events, best_of_3
+    raise ValueError(f"Unknown simulation engine: {engine}")
+
+
+def canonical_pairs(df):
+    """
+    Canonicalize rows to matches: both orientations of a match (A vs B and
+    B vs A, as in sim_ready.csv) share one pair ID.
+
+    Returns (first_rows, pair_of_row, swapped): the df row that represents
+    each pair, the pair ID of every row, and whether a row's 'Name' is the
+    pair's opponent side.
+    """
+    names = df["Name"].astype(str).to_numpy()
+    opponents = df["Opponent"].astype(str).to_numpy()
+    keys = pd.Series(list(zip(np.minimum(names, opponents), np.maximum(names, opponents))))
+    pair_of_row, _ = pd.factorize(keys)
+    first_rows = pd.Series(np.arange(len(df))).groupby(pair_of_row).first().to_numpy()
+    swapped = names != names[first_rows[pair_of_row]]
+    return first_rows, pair_of_row, swapped
+
+
+def _pair_columns(pair_of_row, swapped):
+    """
+    Batch-layout columns of each row's two players in the per-pair layout
+    (pair k owns columns 2k and 2k + 1).
+    """
+    columns = np.empty(2 * len(pair_of_row), dtype=np.intp)
+    columns[0::2] = 2 * pair_of_row + swapped
+    columns[1::2] = 2 * pair_of_row + 1 - swapped
+    return columns
+
+
+def _draw_joint_events(player_win_prob, n_sims, rng, uniforms=None):
+    """
+    One joint outcome per match: same rates as _draw_batch_events, but both
+    players' lines come from a single draw and are consistent with each
+    other. Games split the 12 games between the players (never negative),
+    and breaks are games won on the opponent's serve, so they are bounded by
+    the opponent's 6 service games and by the games the player won.
+    """
+    n_matches = len(player_win_prob)
+    shape = (n_sims, n_matches)
+
+    if uniforms is None:
+        uniforms = rng.random(shape)
+    player_won = uniforms < player_win_prob
+    aces = rng.poisson(lam=0.65 * 12, size=(n_sims, 2 * n_matches))
+    double_faults = rng.poisson(lam=0.05 * 12, size=(n_sims, 2 * n_matches))
+
+    games_won_player = np.minimum(rng.poisson(lam=0.65 * 12, size=shape), 12)
+    games_won_opponent = 12 - games_won_player
+
+    games_won = np.empty((n_sims, 2 * n_matches), dtype=np.int16)
+    games_won[:, 0::2] = games_won_player
+    games_won[:, 1::2] = games_won_opponent
+    games_lost = np.empty_like(games_won)
+    games_lost[:, 0::2] = games_won_opponent
+    games_lost[:, 1::2] = games_won_player
+
+    # 6 opponent service games, broken at a rate that keeps the old mean of 1.5
+    breaks = np.minimum(rng.binomial(6, 0.25, size=(n_sims, 2 * n_matches)), games_won)
+
+    match_won = np.empty((n_sims, 2 * n_matches), dtype=np.int16)
+    match_won[:, 0::2] = player_won
+    match_won[:, 1::2] = ~player_won
+    sets_won = 2 * match_won
+    sets_lost = 2 - sets_won
+
+    return {
+        'games_won': games_won,
+        'games_lost': games_lost,
+        'sets_won': sets_won,
+        'sets_lost': sets_lost,
+        'match_won': match_won,
+        'aces': aces.astype(np.int16),
+        'double_faults': double_faults.astype(np.int16),
+        'breaks': breaks.astype(np.int16),
+        'clean_sets': ((sets_won == 2) & (games_lost == 0)).astype(np.int16),
+        'straight_sets': sets_won == 2,
+    }
+
+
+def _simulate_batch_canonical(df, n_sims, rng, engine, sampling="random"):
+    """
+    Canonical mode: one joint draw per match (pair ID), shared by both rows
+    of the match. Returns events in the df row layout.
+    """
+    first_rows, pair_of_row, swapped = canonical_pairs(df)
+    n_pairs = len(first_rows)
+    if sampling != "random" and engine != "poisson":
+        raise ValueError("Sampling methods apply to the Poisson engine's winner draw.")
+
+    if engine == "poisson":
+        # Fold both rows' win probabilities into the pair's first-row side
+        p = match_win_probabilities(df)
+        p_first = np.where(swapped, 1 - p, p)
+        pair_prob = np.bincount(pair_of_row, p_first, n_pairs) / np.bincount(pair_of_row, minlength=n_pairs)
+        events = _draw_joint_events(pair_prob, n_sims, rng,
+                                    win_uniforms(n_sims, n_pairs, rng, sampling))
+        best_of_3 = True
+    elif engine == "points":
+        inputs = {k: v[first_rows] for k, v in match_inputs(df).items()}
+        events = simulate_match_events(n_sims=n_sims, rng=rng, **inputs)
+        best_of_3 = np.repeat(inputs['best_of'] == 3, 2)
+    elif engine == "table":
+        inputs = {k: v[first_rows] for k, v in match_inputs(df).items()}
+        scores = load_tables().sample_scores(n_sims=n_sims, rng=rng, **hold_inputs(inputs))
+        return scores if n_pairs == len(df) else scores[:, _pair_columns(pair_of_row, swapped)], None
+    else:
+        raise ValueError(f"Unknown simulation engine: {engine}")
+
+    scores = calculate_draftkings_points_array(events, best_of_3)
+    if n_pairs == len(df):
+        # Every row is its own pair: already in row layout
+        return scores, events
+    columns = _pair_columns(pair_of_row, swapped)
+    return scores[:, columns], {name: values[:, columns] for name, values in events.items()}
+
+
+def _simulate_batch_reference(df, n_sims, rng):
+    """
+    Reference mode: run the per-row simulate_match path n_sims times and
+    pack the scores into the batch layout. Slow, but useful to check the
+    vectorized engine against.
+    """
+    rows = [row for _, row in df.iterrows()]
+    scores = np.empty((n_sims, 2 * len(rows)), dtype=np.float32)
+    for s in range(n_sims):
+        for j, row in enumerate(rows):
+            player_out, opponent_out = simulate_match(row, rng)
+            scores[s, 2 * j] = player_out['DK_Score']
+            scores[s, 2 * j + 1] = opponent_out['DK_Score']
+    return scores
+
+
+@timer("simulation")
+def simulate_all_matches_batch(df, n_sims=10000, rng=None, mode="vectorized",
+                               return_events=False, engine="poisson", sampling="random",
+                               crn_seed=None):
+    """
+    Simulate every match in df n_sims times.
+
+    Returns a dict:
+      - 'players':  array of player names, 2 per match (Name, Opponent)
+      - 'salaries': array of salaries in the same order
+      - 'scores':   float32 matrix shaped (n_sims, n_players) of DK points
+      - 'events':   dict of int16 event arrays (only with return_events=True)
+
+    mode="vectorized" draws all events as (n_sims, n_matches) arrays;
+    mode="canonical" maps both rows of a match (A vs B, B vs A) to one pair
+    and draws a single joint outcome per match, so both rows agree and each
+    match is simulated once (see canonical_pairs / _draw_joint_events);
+    mode="reference" loops over simulate_match row by row, n_sims times.
+    engine="poisson" uses the simulate_match_generic event model;
+    engine="points" plays every match game by game from the rows'
+    ServiceGamesWon / ReturnGamesWon and ace / double-fault rates
+    (see functions/match_engine.py); engine="table" draws the same model's
+    scores from the precomputed distributions in functions/lookup_tables.py
+    (scores only, no events).
+    rng may be a numpy Generator or a seed.
+
+    Variance reduction: sampling ("antithetic", "latin" or "sobol", see
+    win_uniforms) changes how the Poisson engine draws winners; crn_seed
+    (vectorized mode) draws every match from its own seeded stream, for
+    common random numbers across scenario runs (see match_streams).
+    """
+    rng = np.random.default_rng(rng)
+    players, salaries = _batch_players(df)
+    result = {'players': players, 'salaries': salaries}
+
+    if crn_seed is not None and mode != "vectorized":
+        raise ValueError("Common random numbers need mode='vectorized'.")
+    if mode == "reference":
+        if return_events or engine != "poisson" or sampling != "random":
+            raise ValueError("Reference mode only returns plain Poisson-engine scores.")
+        result['scores'] = _simulate_batch_reference(df, n_sims, rng)
+        return result
+    if return_events and engine == "table":
+        raise ValueError("The table engine samples scores only; no events to return.")
+    if mode == "canonical":
+        result['scores'], events = _simulate_batch_canonical(df, n_sims, rng, engine, sampling)
+        if return_events:
+            result['events'] = events
+        return result
+    if mode != "vectorized":
+        raise ValueError(f"Unknown simulation mode: {mode}")
+
+    if engine == "table":
+        if sampling != "random" or crn_seed is not None:
+            raise ValueError("The table engine supports plain sampling only.")
+        result['scores'] = load_tables().sample_scores(n_sims=n_sims, rng=rng,
+                                                       **hold_inputs(match_inputs(df)))
+        return result
+    events, best_of_3 = _draw_events(df, n_sims, rng, engine, sampling, crn_seed)
+
+    result['scores'] = calculate_draftkings_points_array(events, best_of_3)
+    if return_events:
+        result['events'] = events
+    return result
+
+
+def simulate_until_converged(df, mean_tolerance=0.25, quantile=90, quantile_tolerance=1.0,
+                             batch_size=5000, min_batches=4, max_sims=200000, rng=None,
+                             mode="vectorized", engine="poisson", sampling="random",
+                             crn_seed=None):
+    """
+    Adaptive run: simulate in batches of batch_size until every player's
+    mean score has a standard error below mean_tolerance points and their
+    `quantile` percentile (the ceiling) one below quantile_tolerance, or
+    max_sims is reached.
+
+    Standard errors come from batch means: the spread of the per-batch
+    estimates over sqrt(batches). Batches are independent even when the
+    draws inside one are not (antithetic, latin, sobol), so this measures
+    the precision actually reached and variance reduction translates
+    directly into fewer batches.
+
+    Returns a simulate_all_matches_batch-style dict plus 'n_sims',
+    'converged', 'mean_se' and 'quantile_se' (per column; inf when fewer
+    than two batches ran, e.g. max_sims <= batch_size) and 'stats' (a
+    SimStats over every simulation).
+    """
+    rng = np.random.default_rng(rng)
+    min_batches = max(min_batches, 2)
+    if max_sims <= batch_size:
+        logging.warning("max_sims (%s) fits in one batch of %s: standard errors cannot be "
+                        "estimated, so the run cannot converge.", max_sims, batch_size)
+    chunks, batch_means, batch_quantiles = [], [], []
+    stats = None
+    n_sims = 0
+    converged = False
+    while n_sims < max_sims:
+        n = min(batch_size, max_sims - n_sims)
+        batch = simulate_all_matches_batch(
+            df, n, rng=rng, mode=mode, engine=engine, sampling=sampling,
+            crn_seed=None if crn_seed is None else (*np.atleast_1d(crn_seed), len(chunks)),
+            return_events=engine != "table"
+        )
+        scores = batch['scores']
+        if stats is None:
+            stats = SimStats(batch['players'])
+        stats.update(scores, batch['events']['match_won'] if 'events' in batch else None)
+        chunks.append(scores)
+        batch_means.append(scores.mean(axis=0, dtype=np.float64))
+        batch_quantiles.append(np.percentile(scores, quantile, axis=0))
+        n_sims += n
+
+        if len(chunks) >= min_batches:
+            k = len(chunks)
+            mean_se = np.std(batch_means, axis=0, ddof=1) / np.sqrt(k)
+            quantile_se = np.std(batch_quantiles, axis=0, ddof=1) / np.sqrt(k)
+            logging.debug("%s sims: max mean SE %.3f, max P%s SE %.3f",
+                          n_sims, mean_se.max(), quantile, quantile_se.max())
+            if mean_se.max() <= mean_tolerance and quantile_se.max() <= quantile_tolerance:
+                converged = True
+                break
+
+    if not converged:
+        logging.warning("No convergence within %s sims.", max_sims)
+        k = len(chunks)
+        if k < 2:
+            # A single batch has no spread to measure precision with
+            mean_se = np.full(len(stats.players), np.inf)
+            quantile_se = np.full(len(stats.players), np.inf)
+        else:
+            mean_se = np.std(batch_means, axis=0, ddof=1) / np.sqrt(k)
+            quantile_se = np.std(batch_quantiles, axis=0, ddof=1) / np.sqrt(k)
+    logging.info("Adaptive run stopped after %s sims (converged=%s).", n_sims, converged)
+
+    return {'players': stats.players, 'salaries': _batch_players(df)[1],
+            'scores': np.concatenate(chunks), 'n_sims': n_sims, 'converged': converged,
+            'mean_se': mean_se, 'quantile_se': quantile_se, 'stats': stats}
+
+
+def expected_points(df):
+    """
+    Analytic mode: expected DK points of every player under the points
+    engine, straight from the lookup tables (no Monte Carlo).
+    Returns a Series indexed by player name, like SimResults.projections.
+    """
+    players, _ = _batch_players(df)
+    expected = load_tables().expected_points(**hold_inputs(match_inputs(df)))
+    projections = pd.Series(expected.ravel(), index=players)
+    return projections[~projections.index.duplicated()]
+
+
+def simulate_to_disk(df, n_sims, path, chunk_size=10000, rng=None, engine="poisson",
+                     store_events=False, mode="vectorized", sampling="random", crn_seed=None):
+    """
+    Run simulate_all_matches_batch in chunks of chunk_size simulations and
+    stream each chunk into a results directory (see functions/sim_results.py),
+    so memory stays bounded by one chunk. Returns a lazy SimResults reader.
+    Match outcomes are handed to the writer's running stats (win rates)
+    even when events are not stored. sampling and crn_seed are passed on
+    (with crn_seed, each chunk gets its own common-random-number streams).
+    """
+    from functions.sim_results import SimResults, SimResultsWriter
+
+    rng = np.random.default_rng(rng)
+    players, salaries = _batch_players(df)
+    with profiled("simulate_to_disk"):
+        with SimResultsWriter(path, players, salaries, n_sims, store_events) as writer:
+            for start in range(0, n_sims, chunk_size):
+                n = min(chunk_size, n_sims - start)
+                chunk = simulate_all_matches_batch(
+                    df, n, rng=rng, engine=engine, mode=mode, sampling=sampling,
+                    crn_seed=None if crn_seed is None else (*np.atleast_1d(crn_seed), start),
+                    return_events=engine != "table"
+                )
+                writer.write(start, chunk['scores'], chunk.get('events'))
+                logging.info("Simulated %s/%s sims.", start + n, n_sims)
+    return SimResults(path)
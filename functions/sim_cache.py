@@ -0,0 +1,229 @@
+# sim_cache.py
+
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
+
+from functions.dk_scoring import calculate_draftkings_points_array
+from functions.match_engine import match_inputs, simulate_match_events
+from functions.sim import _batch_players, _draw_batch_events, match_win_probabilities
+
+SIM_CACHE_DIR = "data/cache/sims"
+DEFAULT_MAX_BYTES = 512 * 1024 ** 2
+DEFAULT_SEED = 0
+
+# Bump when the event model, scoring or entry layout changes, so old
+# entries stop matching
+CACHE_VERSION = 2
+DEFAULT_CHUNK_SIZE = 10000
+
+
+class SimCache:
+    """
+    On-disk store of per-match columns, one <key>.npy file per match
+    (float32, (n_sims, 3): both players' scores, then 1.0 where the first
+    player won). Reads refresh a file's mtime; once the store grows past
+    max_bytes the least recently used files are deleted.
+    """
+
+    def __init__(self, path=SIM_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, key):
+        return os.path.join(self.path, f"{key}.npy")
+
+    def get(self, key, mmap=False):
+        """Cached columns for key (memory-mapped with mmap=True), or None."""
+        path = self._file(key)
+        try:
+            scores = np.load(path, mmap_mode="r" if mmap else None)
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return scores
+
+    def put(self, key, scores):
+        tmp = self._file(key) + ".tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, scores)
+        os.replace(tmp, self._file(key))
+
+    def evict(self, keep=()):
+        """
+        Delete least recently used entries until the store fits max_bytes.
+        Keys in keep (the slate just assembled) are never evicted.
+        """
+        keep = {f"{k}.npy" for k in keep}
+        entries = []
+        for entry in os.scandir(self.path):
+            if entry.name.endswith(".npy"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.name))
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if name in keep:
+                continue
+            try:
+                os.remove(os.path.join(self.path, name))
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        if removed:
+            logging.info("Evicted %s cached matches from %s.", removed, self.path)
+        return removed
+
+    def clear(self):
+        for entry in os.scandir(self.path):
+            if entry.name.endswith(".npy"):
+                os.remove(entry.path)
+
+
+def _match_inputs(df, engine):
+    """
+    Per-match simulation inputs, resolved against the whole slate (opponent
+    stats may come from the opponent's own row): {name -> array per match}.
+    """
+    if engine == "poisson":
+        return {'player_win_prob': match_win_probabilities(df)}
+    if engine == "points":
+        return match_inputs(df)
+    raise ValueError(f"Unknown simulation engine: {engine}")
+
+
+def match_keys(df, n_sims, seed=DEFAULT_SEED, engine="poisson"):
+    """
+    One cache key per match: a hash of the players, the resolved inputs
+    (win probability, or serve / return / ace / double-fault rates and
+    format), the engine, n_sims and the seed.
+    """
+    inputs = _match_inputs(df, engine)
+    keys = []
+    for j, (name, opponent) in enumerate(zip(df["Name"], df["Opponent"])):
+        values = {k: v[j].item() for k, v in inputs.items()}
+        payload = [CACHE_VERSION, engine, int(n_sims), seed, str(name), str(opponent), values]
+        keys.append(hashlib.sha1(json.dumps(payload, sort_keys=True).encode()).hexdigest())
+    return keys
+
+
+def _simulate_match(inputs, j, n_sims, key, engine):
+    """
+    (n_sims, 3) cache entry of match j (scores, then the first player's
+    match_won), drawn from a stream seeded by its key.
+    """
+    rng = np.random.default_rng(int(key, 16))
+    if engine == "poisson":
+        events = _draw_batch_events(inputs['player_win_prob'][j:j + 1], n_sims, rng)
+        best_of_3 = True
+    else:
+        one = {k: v[j:j + 1] for k, v in inputs.items()}
+        events = simulate_match_events(n_sims=n_sims, rng=rng, **one)
+        best_of_3 = one['best_of'][0] == 3
+    scores = calculate_draftkings_points_array(events, best_of_3)
+    return np.column_stack([scores, events['match_won'][:, 0]]).astype(np.float32)
+
+
+def _match_entry(cache, slate, j):
+    """
+    (columns, simulated): the memory-mapped cache entry of match j of the
+    slate, simulated and stored first when it is missing, unreadable or of
+    another size. Its stream is seeded by the key, so a resimulated entry
+    equals the one it replaces.
+    """
+    key = slate['keys'][j]
+    columns = cache.get(key, mmap=True)
+    if columns is not None and columns.shape == (slate['n_sims'], 3):
+        return columns, False
+    del columns  # release the memory map before the file is replaced
+    columns = _simulate_match(slate['inputs'], j, slate['n_sims'], key, slate['engine'])
+    cache.put(key, columns)
+    return columns, True
+
+
+def _cache_matches(df, n_sims, seed, engine, cache):
+    """
+    Make sure every match of df is in the cache, simulating only new or
+    changed ("dirty") matches, one at a time. Returns the slate: a dict of
+    'keys', 'inputs', 'n_sims', 'engine' and 'dirty' (match indices).
+    """
+    slate = {'keys': match_keys(df, n_sims, seed, engine), 'inputs': _match_inputs(df, engine),
+             'n_sims': n_sims, 'engine': engine}
+    slate['dirty'] = [j for j in range(len(slate['keys'])) if _match_entry(cache, slate, j)[1]]
+
+    cache.evict(keep=slate['keys'])
+    logging.info("Simulated %s of %s matches; reused the rest from cache.",
+                 len(slate['dirty']), len(slate['keys']))
+    return slate
+
+
+def _read_chunk(cache, slate, start, stop):
+    """
+    Rows [start, stop) of the slate in the simulate_all_matches_batch
+    layout, read from the memory-mapped match entries: (scores, events)
+    with events holding 'match_won'. An entry that disappeared since
+    _cache_matches (e.g. evicted by another process) is resimulated.
+    """
+    keys = slate['keys']
+    scores = np.empty((stop - start, 2 * len(keys)), dtype=np.float32)
+    match_won = np.empty(scores.shape, dtype=np.int16)
+    for j in range(len(keys)):
+        columns, simulated = _match_entry(cache, slate, j)
+        if simulated:
+            logging.warning("Cached match %s was gone at read time; resimulated it.", keys[j])
+        columns = columns[start:stop]
+        scores[:, 2 * j:2 * j + 2] = columns[:, :2]
+        match_won[:, 2 * j] = columns[:, 2]
+        match_won[:, 2 * j + 1] = 1 - columns[:, 2]
+    return scores, {'match_won': match_won}
+
+
+def simulate_slate_cached(df, n_sims=10000, seed=DEFAULT_SEED, engine="poisson", cache=None):
+    """
+    simulate_all_matches_batch-style result where every match's columns come
+    from the cache when its inputs are unchanged; only new or changed
+    ("dirty") matches are simulated. Each match draws from its own random
+    stream, so a match's columns do not depend on the rest of the slate.
+
+    The result also holds 'events' (only 'match_won') and 'resimulated':
+    the indices of the dirty matches.
+    """
+    cache = cache or SimCache()
+    players, salaries = _batch_players(df)
+    slate = _cache_matches(df, n_sims, seed, engine, cache)
+    scores, events = _read_chunk(cache, slate, 0, n_sims)
+    return {'players': players, 'salaries': salaries, 'scores': scores, 'events': events,
+            'resimulated': np.array(slate['dirty'], dtype=int)}
+
+
+def simulate_to_disk_cached(df, n_sims, path, seed=DEFAULT_SEED, engine="poisson", cache=None,
+                            chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    simulate_slate_cached streamed into a results directory chunk_size rows
+    at a time, as sim.simulate_to_disk does, so memory stays bounded by one
+    chunk (plus one dirty match while it is simulated). match_won goes to
+    the writer's running stats. Returns a lazy SimResults reader.
+    """
+    from functions.sim_results import SimResults, SimResultsWriter
+
+    cache = cache or SimCache()
+    players, salaries = _batch_players(df)
+    slate = _cache_matches(df, n_sims, seed, engine, cache)
+    with SimResultsWriter(path, players, salaries, n_sims) as writer:
+        for start in range(0, n_sims, chunk_size):
+            stop = min(start + chunk_size, n_sims)
+            scores, events = _read_chunk(cache, slate, start, stop)
+            writer.write(start, scores, events)
+            logging.info("Wrote %s/%s cached sims.", stop, n_sims)
+    return SimResults(path)
+
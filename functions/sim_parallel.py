@@ -0,0 +1,101 @@
+# sim_parallel.py
+
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from functions.sim import _batch_players, simulate_all_matches_batch
+
+# Simulations per shard. Shards (not workers) own the random streams, so the
+# shard size fixes the output for a given seed no matter how many workers run.
+DEFAULT_SHARD_SIZE = 5000
+
+# Per-process state set once by _init_worker (the DataFrame is shipped to each
+# worker once instead of with every shard).
+_WORKER = {}
+
+
+def _init_worker(df, engine):
+    _WORKER["df"] = df
+    _WORKER["engine"] = engine
+
+
+def _run_shard(shm_name, shape, start, stop, seed_seq):
+    """
+    Simulate rows [start, stop) of the score matrix into the shared block.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        scores = np.ndarray(shape, dtype=np.float32, buffer=shm.buf)
+        result = simulate_all_matches_batch(
+            _WORKER["df"], stop - start, rng=np.random.default_rng(seed_seq),
+            engine=_WORKER["engine"]
+        )
+        scores[start:stop] = result["scores"]
+        del scores
+    finally:
+        shm.close()
+    return stop - start
+
+
+def shard_bounds(n_sims, shard_size=DEFAULT_SHARD_SIZE):
+    """
+    [(start, stop), ...] row ranges covering n_sims simulations.
+    """
+    return [(start, min(start + shard_size, n_sims)) for start in range(0, n_sims, shard_size)]
+
+
+def run_parallel_simulation(df, n_sims, seed=None, n_workers=None,
+                            shard_size=DEFAULT_SHARD_SIZE, engine="poisson"):
+    """
+    Run simulate_all_matches_batch over a process pool.
+
+    The n_sims simulations are split into fixed-size shards, each with its own
+    child of numpy.random.SeedSequence(seed). Workers write their shard
+    straight into a shared-memory score matrix, so nothing but the shard
+    bounds travels back through pickling. For a given seed and shard_size
+    the scores are bit-identical for any n_workers.
+
+    Returns the same dict as simulate_all_matches_batch plus 'seed' (the
+    SeedSequence entropy, to reproduce runs started with seed=None).
+    """
+    seed_seq = np.random.SeedSequence(seed)
+    bounds = shard_bounds(n_sims, shard_size)
+    children = seed_seq.spawn(len(bounds))
+    players, salaries = _batch_players(df)
+    shape = (n_sims, len(players))
+
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    n_workers = max(1, min(n_workers, len(bounds)))
+
+    shm = shared_memory.SharedMemory(create=True, size=max(1, n_sims * len(players) * 4))
+    try:
+        if n_workers == 1:
+            _init_worker(df, engine)
+            for (start, stop), child in zip(bounds, children):
+                _run_shard(shm.name, shape, start, stop, child)
+        else:
+            with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                                     initargs=(df, engine)) as pool:
+                futures = [
+                    pool.submit(_run_shard, shm.name, shape, start, stop, child)
+                    for (start, stop), child in zip(bounds, children)
+                ]
+                for future in futures:
+                    future.result()
+        scores = np.ndarray(shape, dtype=np.float32, buffer=shm.buf).copy()
+    finally:
+        shm.close()
+        shm.unlink()
+
+    logging.info("Simulated %s sims in %s shards on %s workers.", n_sims, len(bounds), n_workers)
+    return {
+        'players': players,
+        'salaries': salaries,
+        'scores': scores,
+        'seed': seed_seq.entropy,
+    }
@@ -1,5 +1,13 @@
 # functions/sim_prep/__init__.py
 
-from .run_sim_prep import run_sim_prep
-
 __all__ = ["run_sim_prep"]
+
+
+def __getattr__(name):
+    # Imported on first use, so importing the package (e.g. for its config)
+    # does not pull in pandas and rapidfuzz
+    if name == "run_sim_prep":
+        from .run_sim_prep import run_sim_prep
+        globals()[name] = run_sim_prep
+        return run_sim_prep
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
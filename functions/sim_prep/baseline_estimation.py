@@ -1,7 +1,27 @@
 # functions/sim_prep/baseline_estimation.py
 
 import logging
-from .config import DEBUG
+import numpy as np
+import pandas as pd
+from functions.match_engine import match_win_probability, serve_point_probability
+
+# Estimated stat -> stats file column
+STAT_COLUMNS = {
+    "Elo": "Elo",
+    "ServiceGamesWon": "ServiceGamesWonPercentage",
+    "ReturnGamesWon": "ReturnGamesWonPercentage",
+    "AcesPerServiceGame": "AcesPerServiceGame",
+    "DoubleFaultsPerServiceGame": "DoubleFaultsPerServiceGame",
+}
+
+# Search range of the serve / return shift against the field. Each pass
+# tabulates the win probability at SHIFT_POINTS shifts across the current
+# bracket in one match_win_probability call and narrows it to one cell;
+# two passes leave a ~5e-4 cell, interpolated well below the 3-decimal output
+SHIFT_RANGE = 0.6
+SHIFT_POINTS = 49
+SHIFT_PASSES = 2
+
 
 def baseline_stats():
     """
@@ -11,25 +31,140 @@ def baseline_stats():
     return {
         "Elo": 1500,
         "ServiceGamesWon": 0.60,
-        "ReturnGamesWon": 0.35
+        "ReturnGamesWon": 0.35,
+        "AcesPerServiceGame": 0.35,
+        "DoubleFaultsPerServiceGame": 0.28
     }
 
-def tune_stats_for_implied_wp(base_stats, implied_wp):
-    """
-    Example approach:
-    factor = (implied_wp / 100.0) + 0.5
-    so 50 => 1.0, 30 => 0.8, 80 => 1.3
-    """
-    factor = (implied_wp / 100.0) + 0.5
-    stats = dict(base_stats)
-    stats["Elo"] = int(stats["Elo"] * factor)
-    stats["ServiceGamesWon"] *= factor
-    stats["ReturnGamesWon"] *= factor
-
-    if DEBUG:
-        logging.debug(
-            f"Tuning stats: WP={implied_wp}, factor={round(factor,2)}, "
-            f"Elo={stats['Elo']}, SGW={round(stats['ServiceGamesWon'],2)}, "
-            f"RGW={round(stats['ReturnGamesWon'],2)}"
-        )
-    return stats
+
+def surface_averages(frame):
+    """
+    Field average of every estimated stat per surface, weighted by matches
+    played, from the combined ATP + WTA stats frame (StatsStore.frame).
+    Index: surfaces plus None (all surfaces), for unknown surfaces.
+    Stats missing from the frame fall back to baseline_stats.
+    """
+    base = baseline_stats()
+    columns = [c for c in STAT_COLUMNS.values() if c in frame.columns]
+    if frame.empty or not columns:
+        return pd.DataFrame([base], index=pd.Index([None], name="Surface"))
+
+    values = frame[columns].apply(pd.to_numeric, errors="coerce")
+    weights = frame["Matches"].fillna(1) if "Matches" in frame.columns else pd.Series(1, index=frame.index)
+    weighted = values.mul(weights, axis=0)
+    present = values.notna().mul(weights, axis=0)
+    surfaces = frame["Surface"] if "Surface" in frame.columns else pd.Series("All", index=frame.index)
+
+    by_surface = weighted.groupby(surfaces).sum() / present.groupby(surfaces).sum()
+    overall = weighted.sum() / present.sum()
+    averages = pd.concat([by_surface, overall.to_frame().T.set_axis([None])])
+    averages = averages.rename(columns={v: k for k, v in STAT_COLUMNS.items()})
+    for stat, default in base.items():
+        if stat not in averages:
+            averages[stat] = default
+        averages[stat] = averages[stat].fillna(default)
+    averages.index.name = "Surface"
+    return averages[list(STAT_COLUMNS)]
+
+
+def implied_elo(implied_wp, opponent_elo):
+    """
+    Elo that gives implied_wp (0-100) against opponent_elo under the Elo
+    logistic of simulate_match_with_stats, 1 / (1 + exp(-diff / 400)):
+    opponent_elo + 400 * logit(wp).
+    """
+    p = np.clip(np.asarray(implied_wp, dtype=float) / 100.0, 0.01, 0.99)
+    return np.asarray(opponent_elo, dtype=float) + 400.0 * np.log(p / (1 - p))
+
+
+def implied_serve_return(implied_wp, opponent_sgw, opponent_rgw, field_sgw, field_rgw,
+                         best_of=3):
+    """
+    ServiceGamesWon / ReturnGamesWon for players known only by their
+    implied win percentage (0-100), all rows at once.
+
+    Each player is the field average shifted by one amount s on both serve
+    and return; s is found so that the point-based match model
+    (match_engine.match_inputs / match_win_probability) against the
+    opponent's stats gives implied_wp. The win probability increases with
+    s, so a grid of shifts per row brackets the root: each pass evaluates
+    the whole (rows, SHIFT_POINTS) grid at once and zooms into the cell that
+    crosses implied_wp, and the last cell is interpolated linearly.
+    """
+    wp, opponent_sgw, opponent_rgw, field_sgw, field_rgw = (
+        a[..., None] for a in np.broadcast_arrays(
+            np.clip(np.asarray(implied_wp, dtype=float) / 100.0, 0.01, 0.99),
+            np.asarray(opponent_sgw, dtype=float), np.asarray(opponent_rgw, dtype=float),
+            np.asarray(field_sgw, dtype=float), np.asarray(field_rgw, dtype=float))
+    )
+
+    def rates(shift):
+        return (np.clip(field_sgw + shift, 0.05, 0.99), np.clip(field_rgw + shift, 0.01, 0.95))
+
+    def win_probability(shift):
+        sgw, rgw = rates(shift)
+        pa = serve_point_probability((sgw + 1 - opponent_rgw) / 2)
+        pb = serve_point_probability((opponent_sgw + 1 - rgw) / 2)
+        return match_win_probability(pa, pb, best_of)
+
+    low = np.full(wp.shape, -SHIFT_RANGE)
+    width = 2 * SHIFT_RANGE
+    for _ in range(SHIFT_PASSES):
+        width = width / (SHIFT_POINTS - 1)
+        shifts = low + width * np.arange(SHIFT_POINTS)
+        won = win_probability(shifts)
+        # Cell [k - 1, k] ending at the first shift that is too strong
+        # (the first or last cell when implied_wp is out of reach)
+        too_strong = won > wp
+        k = np.where(too_strong.any(axis=-1, keepdims=True),
+                     too_strong.argmax(axis=-1)[..., None], SHIFT_POINTS - 1)
+        k = np.maximum(k, 1)
+        low = np.take_along_axis(shifts, k - 1, axis=-1)
+        won_low = np.take_along_axis(won, k - 1, axis=-1)
+        won_high = np.take_along_axis(won, k, axis=-1)
+
+    rise = won_high - won_low
+    fraction = np.clip(np.divide(wp - won_low, rise, out=np.zeros_like(rise), where=rise > 0), 0, 1)
+    sgw, rgw = rates(low + fraction * width)
+    return sgw[..., 0], rgw[..., 0]
+
+
+def estimate_stats(implied_wp, surfaces, averages, opponent=None):
+    """
+    Estimated stats for a batch of players without database stats.
+
+    implied_wp and surfaces are per row; averages comes from
+    surface_averages; opponent optionally holds per-row arrays 'Elo',
+    'ServiceGamesWon' and 'ReturnGamesWon' of the opponent, NaN where the
+    opponent is unknown too (the surface's field average is used instead).
+
+    Elo and serve / return rates are solved against the opponent (see
+    implied_elo, implied_serve_return); ace and double-fault rates are the
+    surface's field averages. Returns a DataFrame with one column per stat.
+    """
+    implied_wp = np.asarray(implied_wp, dtype=float)
+    surfaces = pd.Index(surfaces)
+    known = surfaces.isin(averages.index.dropna())
+    field = averages.reindex(surfaces.where(known, None))
+    field = field.fillna(averages.loc[averages.index.isna()].iloc[0])
+    field.index = range(len(field))
+
+    opponent = opponent or {}
+
+    def opponent_stat(stat):
+        values = np.asarray(opponent.get(stat, np.full(len(field), np.nan)), dtype=float)
+        return np.where(np.isnan(values), field[stat].to_numpy(), values)
+
+    sgw, rgw = implied_serve_return(
+        implied_wp, opponent_stat("ServiceGamesWon"), opponent_stat("ReturnGamesWon"),
+        field["ServiceGamesWon"].to_numpy(), field["ReturnGamesWon"].to_numpy()
+    )
+    estimated = pd.DataFrame({
+        "Elo": implied_elo(implied_wp, opponent_stat("Elo")),
+        "ServiceGamesWon": sgw,
+        "ReturnGamesWon": rgw,
+        "AcesPerServiceGame": field["AcesPerServiceGame"].to_numpy(),
+        "DoubleFaultsPerServiceGame": field["DoubleFaultsPerServiceGame"].to_numpy(),
+    })
+    logging.debug("Estimated stats for %s players in one batch.", len(estimated))
+    return estimated
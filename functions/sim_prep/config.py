@@ -1,23 +1,84 @@
 # functions/sim_prep/config.py
+import os
+import json
 import logging
 
-# Toggle debug logs
-DEBUG = True
+# Every setting below can be overridden, in increasing priority, by a
+# config file (JSON or TOML, path in SIM_PREP_CONFIG) holding the setting
+# names as keys, then by SIM_PREP_<NAME> environment variables, e.g.
+#   SIM_PREP_OUTPUT_FILE=/srv/slate/sim_ready.csv SIM_PREP_DEBUG=1
+ENV_PREFIX = "SIM_PREP_"
+CONFIG_ENV = "SIM_PREP_CONFIG"
 
-# Hard-coded file paths
-NAMES_FILE = "csvs/names.csv"
-ATP_FILE = "csvs/atp.csv"
-WTA_FILE = "csvs/wta.csv"
-CONTEXT_FILE = "data/match_context.csv"
-OUTPUT_FILE = "data/sim_ready.csv"
-PENDING_FILE = "data/pending_approvals.csv"
+
+def _load_file(path):
+    if not path:
+        return {}
+    with open(path, "rb") as f:
+        if path.endswith(".toml"):
+            import tomllib
+            return tomllib.load(f)
+        return json.load(f)
+
+
+_FILE_SETTINGS = _load_file(os.environ.get(CONFIG_ENV))
+
+
+def _setting(name, default):
+    """Value of a setting from the environment, the config file or default."""
+    raw = os.environ.get(ENV_PREFIX + name)
+    if raw is None:
+        return _FILE_SETTINGS.get(name, default)
+    if isinstance(default, bool):
+        return raw.lower() in ("1", "true", "yes")
+    if isinstance(default, (int, float)):
+        return type(default)(raw)
+    return raw
+
+
+# Toggle debug logs (off by default)
+DEBUG = _setting("DEBUG", False)
+
+# File paths
+NAMES_FILE = _setting("NAMES_FILE", "csvs/names.csv")
+NAMES_DB = _setting("NAMES_DB", "data/names.db")
+ATP_FILE = _setting("ATP_FILE", "csvs/atp.csv")
+WTA_FILE = _setting("WTA_FILE", "csvs/wta.csv")
+POOL_FILE = _setting("POOL_FILE", "csvs/pool.csv")
+CONTEXT_FILE = _setting("CONTEXT_FILE", "data/match_context.csv")
+OUTPUT_FILE = _setting("OUTPUT_FILE", "data/sim_ready.csv")
+PENDING_FILE = _setting("PENDING_FILE", "data/pending_approvals.csv")
+CACHE_DIR = _setting("CACHE_DIR", "data/cache")
+PREP_STATE_FILE = _setting("PREP_STATE_FILE", os.path.join(CACHE_DIR, "sim_prep_state.json"))
+SIM_RESULTS_DIR = _setting("SIM_RESULTS_DIR", "data/sim_results/latest")
+EXPORT_DIR = _setting("EXPORT_DIR", "data/exports")
 
 # Fuzzy thresholds
-FUZZY_THRESHOLD = 90
-MIN_SCORE = 70
-
-# Logging setup
-logging.basicConfig(
-    level=logging.DEBUG if DEBUG else logging.INFO,
-    format="%(levelname)s: %(message)s"
-)
+FUZZY_THRESHOLD = _setting("FUZZY_THRESHOLD", 90)
+MIN_SCORE = _setting("MIN_SCORE", 70)
+
+# Batch runs
+N_SIMS = _setting("N_SIMS", 10000)
+N_LINEUPS = _setting("N_LINEUPS", 150)
+
+# Live odds ingestion
+ODDS_POLL_SECONDS = _setting("ODDS_POLL_SECONDS", 15)
+ODDS_DEBOUNCE_SECONDS = _setting("ODDS_DEBOUNCE_SECONDS", 30)
+ODDS_MAX_CONNECTIONS = _setting("ODDS_MAX_CONNECTIONS", 20)
+
+
+def settings():
+    """{name -> value} of every setting in effect."""
+    return {name: value for name, value in globals().items()
+            if name.isupper() and not name.startswith("_")
+            and name not in ("ENV_PREFIX", "CONFIG_ENV")}
+
+
+def configure_logging(level=None):
+    """
+    Logging setup for entry points (apps, CLI, scripts); importing the
+    library no longer configures logging by itself.
+    """
+    if level is None:
+        level = logging.DEBUG if DEBUG else logging.INFO
+    logging.basicConfig(level=level, format="%(levelname)s: %(message)s")
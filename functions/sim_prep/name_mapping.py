@@ -1,56 +1,41 @@
 # functions/sim_prep/name_mapping.py
 
-import os
 import logging
-import pandas as pd
+from . import name_store
 from .config import NAMES_FILE
 
 def load_name_mapping():
     """
-    Loads 'names.csv' [raw_name, approved_name].
-    Returns a dict {raw_name -> approved_name}.
+    Loads the approved mappings {raw_name -> approved_name} from the names
+    database (seeded from 'names.csv' on first use).
     """
-    mapping = {}
-    if not os.path.exists(NAMES_FILE):
-        logging.debug(f"{NAMES_FILE} not found; returning empty mapping.")
-        return mapping
-
-    if os.path.getsize(NAMES_FILE) == 0:
-        logging.debug(f"{NAMES_FILE} is empty; returning empty mapping.")
-        return mapping
-
-    try:
-        df = pd.read_csv(NAMES_FILE)
-        if "raw_name" not in df.columns or "approved_name" not in df.columns:
-            logging.warning(f"{NAMES_FILE} missing expected columns. Using empty mapping.")
-            return mapping
-
-        for _, row in df.iterrows():
-            mapping[row["raw_name"]] = row["approved_name"]
-    except pd.errors.EmptyDataError:
-        logging.warning(f"No columns to parse in {NAMES_FILE}. Using empty mapping.")
-    except Exception as e:
-        logging.error(f"Error reading {NAMES_FILE}: {e}")
-
-    logging.debug(f"Loaded name mapping: {mapping}")
+    mapping = name_store.load_mapping()
+    logging.debug("Loaded name mapping: %s entries", len(mapping))
     return mapping
 
 
 def append_name_mapping(raw_name, approved_name):
     """
-    Writes row [raw_name, approved_name] to 'names.csv'.
-    Creates file if doesn't exist or empty.
+    Stores [raw_name, approved_name]; an existing raw_name keeps its
+    mapping (use name_store.approve_mapping to change one).
     """
-    if not os.path.exists(NAMES_FILE) or os.path.getsize(NAMES_FILE) == 0:
-        logging.debug(f"Creating new {NAMES_FILE} with headers.")
-        df_new = pd.DataFrame([[raw_name, approved_name]],
-                              columns=["raw_name","approved_name"])
-        df_new.to_csv(NAMES_FILE, index=False)
-    else:
-        df_map = pd.read_csv(NAMES_FILE)
-        new_row = pd.DataFrame([[raw_name, approved_name]],
-                               columns=["raw_name","approved_name"])
-        df_map = pd.concat([df_map, new_row], ignore_index=True)
-        df_map.drop_duplicates(["raw_name"], inplace=True)
-        df_map.to_csv(NAMES_FILE, index=False)
-    logging.debug(f"Appended {raw_name}->{approved_name} in {NAMES_FILE}.")
+    append_name_mappings([(raw_name, approved_name)])
+    logging.debug("Stored %s->%s.", raw_name, approved_name)
+
+
+def append_name_mappings(pairs):
+    """
+    Stores many (raw_name, approved_name) pairs in one transaction;
+    raw names that are already mapped are left as they are.
+    """
+    name_store.upsert_mappings(pairs)
+
+
+def import_name_mapping_csv(csv_file=NAMES_FILE):
+    """Merges a raw_name,approved_name CSV (default 'names.csv') into the database."""
+    name_store.import_mapping_csv(csv_file)
+
+
+def export_name_mapping_csv(csv_file=NAMES_FILE):
+    """Writes all mappings back out to 'names.csv' (or csv_file)."""
+    return name_store.export_mapping_csv(csv_file)
@@ -0,0 +1,122 @@
+# functions/sim_prep/name_resolution.py
+
+import os
+import json
+import hashlib
+import logging
+import unicodedata
+import numpy as np
+from rapidfuzz import process, fuzz
+from functions.metrics import count, timer
+from .config import CACHE_DIR
+
+RESOLUTION_CACHE = os.path.join(CACHE_DIR, "name_resolution.json")
+
+
+def normalize_name(name):
+    """
+    Canonical form for matching: no accents, lower case, hyphens/dots/
+    apostrophes as spaces, single spaces. 'Irina-Camelia Begu' and
+    'irina camelia begu' normalize the same.
+    """
+    if not isinstance(name, str):
+        return ""
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(c for c in name if not unicodedata.combining(c)).lower()
+    for ch in "-.'":
+        name = name.replace(ch, " ")
+    return " ".join(name.split())
+
+
+class NameResolver:
+    """
+    Resolves raw player names against a fixed universe of stats names.
+
+    The universe is normalized once into an exact-match index; everything else
+    is scored in a single rapidfuzz cdist call over all cores. Results are
+    memoized in memory and, if cache_file is set, on disk for as long as the
+    universe is unchanged.
+    """
+
+    def __init__(self, universe, cache_file=RESOLUTION_CACHE, limit=3):
+        self.universe = list(dict.fromkeys(universe))
+        self.normalized = [normalize_name(n) for n in self.universe]
+        self.limit = limit
+        self.cache_file = cache_file
+
+        self._exact = {}
+        for name, norm in zip(self.universe, self.normalized):
+            self._exact.setdefault(norm, name)
+
+        self.fingerprint = hashlib.sha1("\n".join(self.universe).encode()).hexdigest()
+        self._memo = self._load_memo()
+
+    def _load_memo(self):
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return {}
+        try:
+            with open(self.cache_file) as f:
+                cached = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning("Ignoring unreadable name cache %s: %s", self.cache_file, e)
+            return {}
+        if cached.get("fingerprint") != self.fingerprint or cached.get("limit") != self.limit:
+            return {}
+        return {raw: [tuple(c) for c in cands] for raw, cands in cached["results"].items()}
+
+    def _save_memo(self):
+        if not self.cache_file:
+            return
+        os.makedirs(os.path.dirname(self.cache_file) or ".", exist_ok=True)
+        tmp = self.cache_file + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"fingerprint": self.fingerprint, "limit": self.limit,
+                       "results": self._memo}, f)
+        os.replace(tmp, self.cache_file)
+
+    @timer("fuzzy_resolution")
+    def resolve(self, raw_names):
+        """
+        {raw_name -> [(candidate, score), ...]} for every name, best first,
+        at most `limit` candidates (score 0-100, fuzz.ratio on normalized
+        names). Non-string names map to [].
+        """
+        unseen = [n for n in dict.fromkeys(raw_names)
+                  if isinstance(n, str) and n not in self._memo]
+
+        fuzzy = []
+        for raw in unseen:
+            hit = self._exact.get(normalize_name(raw))
+            if hit is not None:
+                self._memo[raw] = [(hit, 100.0)]
+            else:
+                fuzzy.append(raw)
+
+        if fuzzy and self.universe:
+            scores = process.cdist(
+                [normalize_name(n) for n in fuzzy], self.normalized,
+                scorer=fuzz.ratio, workers=-1, dtype=np.float32
+            )
+            k = min(self.limit, len(self.universe))
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            for raw, row, idx in zip(fuzzy, scores, top):
+                idx = idx[np.argsort(-row[idx], kind="stable")]
+                self._memo[raw] = [(self.universe[i], round(float(row[i]), 2)) for i in idx]
+
+        count("names_exact", len(unseen) - len(fuzzy))
+        count("names_fuzzy", len(fuzzy))
+        if unseen:
+            logging.debug("Resolved %s new names (%s fuzzy).", len(unseen), len(fuzzy))
+            self._save_memo()
+
+        return {n: self._memo.get(n, []) if isinstance(n, str) else [] for n in raw_names}
+
+    def best(self, raw_names, threshold):
+        """
+        {raw_name -> best candidate or None} keeping only scores >= threshold.
+        """
+        resolved = self.resolve(raw_names)
+        return {
+            raw: cands[0][0] if cands and cands[0][1] >= threshold else None
+            for raw, cands in resolved.items()
+        }
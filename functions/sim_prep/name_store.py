@@ -0,0 +1,283 @@
+# functions/sim_prep/name_store.py
+
+import os
+import secrets
+import sqlite3
+import logging
+import threading
+import pandas as pd
+from .config import NAMES_DB, NAMES_FILE, PENDING_FILE
+
+PENDING_COLUMNS = ["raw_name", "cand1", "score1", "cand2", "score2", "cand3", "score3"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS name_mapping (
+    raw_name TEXT PRIMARY KEY,
+    approved_name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pending_approvals (
+    raw_name TEXT PRIMARY KEY,
+    cand1 TEXT, score1 REAL,
+    cand2 TEXT, score2 REAL,
+    cand3 TEXT, score3 REAL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+# Read cache: {absolute db path -> ((db id, revision), mapping dict)}
+_MAPPING_CACHE = {}
+_LOCK = threading.Lock()
+
+
+def connect(db_file=None):
+    """
+    Open the names database (WAL mode), creating it on first use.
+    A new database is seeded from csvs/names.csv and
+    data/pending_approvals.csv when those exist, and gets a random id so
+    read caches can tell it from an earlier file at the same path.
+    """
+    db_file = db_file or NAMES_DB
+    os.makedirs(os.path.dirname(db_file) or ".", exist_ok=True)
+    conn = sqlite3.connect(db_file, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(_SCHEMA)
+
+    if conn.execute("SELECT value FROM meta WHERE key = 'imported'").fetchone() is None:
+        with _write(conn):
+            # re-check under the write lock: another process may have imported
+            if conn.execute("SELECT value FROM meta WHERE key = 'imported'").fetchone() is None:
+                _import_mapping_rows(conn, _read_mapping_csv(NAMES_FILE))
+                _import_pending_rows(conn, _read_pending_csv(PENDING_FILE))
+                conn.execute("INSERT INTO meta VALUES ('imported', 1)")
+    if conn.execute("SELECT value FROM meta WHERE key = 'db_id'").fetchone() is None:
+        conn.execute("INSERT OR IGNORE INTO meta VALUES ('db_id', ?)", (secrets.randbits(62),))
+    return conn
+
+
+class _write:
+    """
+    Write transaction that takes the database write lock up front and bumps
+    the revision used by the read cache.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.conn.execute(
+                "INSERT INTO meta VALUES ('revision', 1) "
+                "ON CONFLICT(key) DO UPDATE SET value = value + 1"
+            )
+            self.conn.execute("COMMIT")
+        else:
+            self.conn.execute("ROLLBACK")
+        return False
+
+
+def _revision(conn):
+    meta = dict(conn.execute("SELECT key, value FROM meta WHERE key IN ('db_id', 'revision')"))
+    return meta.get("db_id"), meta.get("revision", 0)
+
+
+def revision(db_file=None):
+    """
+    (database id, write counter): changes with every write and whenever the
+    database file is replaced, so readers can cache until it moves.
+    """
+    conn = connect(db_file)
+    try:
+        return _revision(conn)
+    finally:
+        conn.close()
+
+
+def _read_mapping_csv(csv_file):
+    if not os.path.exists(csv_file) or os.path.getsize(csv_file) == 0:
+        return []
+    try:
+        df = pd.read_csv(csv_file)
+    except pd.errors.EmptyDataError:
+        return []
+    if "raw_name" not in df.columns or "approved_name" not in df.columns:
+        logging.warning("%s missing expected columns. Skipping import.", csv_file)
+        return []
+    df = df.dropna(subset=["raw_name", "approved_name"])
+    return list(zip(df["raw_name"], df["approved_name"]))
+
+
+def _read_pending_csv(csv_file):
+    if not os.path.exists(csv_file) or os.path.getsize(csv_file) == 0:
+        return []
+    try:
+        df = pd.read_csv(csv_file)
+    except pd.errors.EmptyDataError:
+        return []
+    df = df.reindex(columns=PENDING_COLUMNS)
+    df = df.astype(object).where(df.notna(), None)
+    return [tuple(row) for row in df.itertuples(index=False)]
+
+
+def _import_mapping_rows(conn, pairs, overwrite=True):
+    if overwrite:
+        sql = ("INSERT INTO name_mapping VALUES (?, ?) "
+               "ON CONFLICT(raw_name) DO UPDATE SET approved_name = excluded.approved_name")
+    else:
+        sql = "INSERT INTO name_mapping VALUES (?, ?) ON CONFLICT(raw_name) DO NOTHING"
+    conn.executemany(sql, pairs)
+
+
+def _import_pending_rows(conn, rows):
+    conn.executemany(
+        "INSERT OR REPLACE INTO pending_approvals VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+    )
+
+
+# ---------------------------------------------------------------------------
+# Name mapping
+# ---------------------------------------------------------------------------
+
+def load_mapping(db_file=None):
+    """
+    {raw_name -> approved_name}. Served from memory until the database
+    revision changes (any write from any process bumps it).
+    """
+    db_file = db_file or NAMES_DB
+    conn = connect(db_file)
+    key = os.path.abspath(db_file)
+    try:
+        revision = _revision(conn)
+        with _LOCK:
+            cached = _MAPPING_CACHE.get(key)
+            if cached is not None and cached[0] == revision:
+                return dict(cached[1])
+        mapping = dict(conn.execute("SELECT raw_name, approved_name FROM name_mapping"))
+    finally:
+        conn.close()
+    with _LOCK:
+        _MAPPING_CACHE[key] = (revision, mapping)
+    return dict(mapping)
+
+
+def upsert_mappings(pairs, db_file=None, overwrite=False):
+    """
+    Insert [(raw_name, approved_name), ...] in one transaction. Existing raw
+    names keep their mapping (first one wins, as the names.csv appends did)
+    unless overwrite is set.
+    """
+    pairs = list(pairs)
+    if not pairs:
+        return
+    conn = connect(db_file)
+    try:
+        with _write(conn):
+            _import_mapping_rows(conn, pairs, overwrite)
+    finally:
+        conn.close()
+    logging.debug("Upserted %s name mappings.", len(pairs))
+
+
+def import_mapping_csv(csv_file=None, db_file=None):
+    """Merge a raw_name,approved_name CSV into the database; the CSV wins."""
+    upsert_mappings(_read_mapping_csv(csv_file or NAMES_FILE), db_file, overwrite=True)
+
+
+def export_mapping_csv(csv_file=None, db_file=None):
+    """Write the mapping table out as a raw_name,approved_name CSV."""
+    csv_file = csv_file or NAMES_FILE
+    mapping = load_mapping(db_file)
+    df = pd.DataFrame(list(mapping.items()), columns=["raw_name", "approved_name"])
+    tmp = csv_file + ".tmp"
+    df.to_csv(tmp, index=False)
+    os.replace(tmp, csv_file)
+    return csv_file
+
+
+# ---------------------------------------------------------------------------
+# Pending approvals
+# ---------------------------------------------------------------------------
+
+def pending_row(raw_name, candidates):
+    """
+    (raw_name, cand1, score1, cand2, score2, cand3, score3) from up to three
+    (name, score) candidates.
+    """
+    row = [raw_name]
+    for i in range(3):
+        if i < len(candidates):
+            row.extend([candidates[i][0], float(candidates[i][1])])
+        else:
+            row.extend([None, None])
+    return tuple(row)
+
+
+def upsert_pending(rows, db_file=None):
+    """Insert or replace pending_row tuples in one transaction."""
+    rows = list(rows)
+    if not rows:
+        return
+    conn = connect(db_file)
+    try:
+        with _write(conn):
+            _import_pending_rows(conn, rows)
+    finally:
+        conn.close()
+    logging.debug("Upserted %s pending approvals.", len(rows))
+
+
+def load_pending(db_file=None):
+    """All pending approvals as a DataFrame with PENDING_COLUMNS."""
+    conn = connect(db_file)
+    try:
+        rows = conn.execute(
+            f"SELECT {', '.join(PENDING_COLUMNS)} FROM pending_approvals ORDER BY rowid"
+        ).fetchall()
+    finally:
+        conn.close()
+    return pd.DataFrame(rows, columns=PENDING_COLUMNS)
+
+
+def delete_pending(raw_names, db_file=None):
+    """Remove the given raw names from the pending table."""
+    raw_names = [(n,) for n in raw_names]
+    if not raw_names:
+        return
+    conn = connect(db_file)
+    try:
+        with _write(conn):
+            conn.executemany("DELETE FROM pending_approvals WHERE raw_name = ?", raw_names)
+    finally:
+        conn.close()
+
+
+def approve_mapping(raw_name, approved_name=None, db_file=None):
+    """
+    Resolve a pending name in one transaction: store the mapping (unless
+    approved_name is None, i.e. ignored), replacing any earlier one, and
+    drop it from pending.
+    """
+    conn = connect(db_file)
+    try:
+        with _write(conn):
+            if approved_name is not None:
+                _import_mapping_rows(conn, [(raw_name, approved_name)])
+            conn.execute("DELETE FROM pending_approvals WHERE raw_name = ?", (raw_name,))
+    finally:
+        conn.close()
+
+
+def export_pending_csv(csv_file=None, db_file=None):
+    """Write the pending table out in the data/pending_approvals.csv layout."""
+    csv_file = csv_file or PENDING_FILE
+    tmp = csv_file + ".tmp"
+    load_pending(db_file).to_csv(tmp, index=False)
+    os.replace(tmp, csv_file)
+    return csv_file
@@ -0,0 +1,309 @@
+# functions/sim_prep/odds_ingest.py
+
+import os
+import abc
+import json
+import time
+import asyncio
+import logging
+import urllib.request
+import pandas as pd
+from .config import CONTEXT_FILE, ODDS_POLL_SECONDS, ODDS_DEBOUNCE_SECONDS, ODDS_MAX_CONNECTIONS
+from .name_resolution import normalize_name
+
+
+# ---------------------------------------------------------------------------
+# Odds math
+# ---------------------------------------------------------------------------
+
+def moneyline_probability(odds):
+    """
+    Raw (vigged) win probability of an American moneyline:
+    +150 => 100 / 250, -200 => 200 / 300.
+    """
+    odds = float(odds)
+    if odds >= 100:
+        return 100.0 / (odds + 100.0)
+    if odds <= -100:
+        return -odds / (-odds + 100.0)
+    raise ValueError(f"Invalid moneyline: {odds}")
+
+
+def devig(odds_a, odds_b):
+    """
+    Implied win percentages (0-100, summing to 100) of both sides of a
+    two-way moneyline, removing the bookmaker margin proportionally.
+    """
+    pa = moneyline_probability(odds_a)
+    pb = moneyline_probability(odds_b)
+    total = pa + pb
+    return 100.0 * pa / total, 100.0 * pb / total
+
+
+def quote_key(name, opponent):
+    """Match key that ignores side order and name formatting."""
+    return frozenset((normalize_name(name), normalize_name(opponent)))
+
+
+# ---------------------------------------------------------------------------
+# HTTP
+# ---------------------------------------------------------------------------
+
+class HttpSession:
+    """
+    Shared HTTP client of the service: standard library requests run on
+    worker threads (asyncio.to_thread), at most max_connections at a time.
+    """
+
+    def __init__(self, max_connections=ODDS_MAX_CONNECTIONS):
+        self._slots = asyncio.Semaphore(max_connections)
+
+    async def get_json(self, url, timeout=10):
+        """Decoded JSON body of a GET; HTTP errors raise urllib.error.HTTPError."""
+        async with self._slots:
+            return await asyncio.to_thread(_get_json, url, timeout)
+
+
+def _get_json(url, timeout):
+    request = urllib.request.Request(url, headers={"Accept": "application/json"})
+    with urllib.request.urlopen(request, timeout=timeout) as resp:
+        return json.loads(resp.read().decode("utf-8"))
+
+
+# ---------------------------------------------------------------------------
+# Providers
+# ---------------------------------------------------------------------------
+
+class OddsProvider(abc.ABC):
+    """
+    Base class for odds sources.
+
+    A provider yields batches of quotes, each a dict with 'Name', 'Opponent',
+    'NameOdds', 'OpponentOdds' (American moneylines) and optionally
+    'Surface'. Every source implements fetch() (one batch, also used by
+    run_once); push sources (websocket, SSE) override stream() as well.
+    """
+
+    name = "provider"
+
+    def __init__(self, interval=ODDS_POLL_SECONDS):
+        self.interval = interval
+
+    @abc.abstractmethod
+    async def fetch(self, session):
+        """One batch of quotes; session is the service's HttpSession."""
+
+    async def stream(self, session):
+        """Yield quote batches forever; polls fetch() every interval."""
+        while True:
+            try:
+                yield await self.fetch(session)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.warning("Odds provider %s failed: %s", self.name, e)
+            await asyncio.sleep(self.interval)
+
+
+class HttpJsonProvider(OddsProvider):
+    """
+    Polls a URL returning a JSON list of quotes. parse (optional) turns the
+    decoded payload into quote dicts for sources with another layout; by
+    default the keys player/opponent/player_odds/opponent_odds/surface are
+    also accepted.
+    """
+
+    def __init__(self, url, interval=ODDS_POLL_SECONDS, parse=None, name=None, timeout=10):
+        super().__init__(interval)
+        self.url = url
+        self.parse = parse or parse_quotes
+        self.name = name or url
+        self.timeout = timeout
+
+    async def fetch(self, session):
+        return self.parse(await session.get_json(self.url, self.timeout))
+
+
+_QUOTE_ALIASES = {
+    "Name": ("Name", "player", "name", "home"),
+    "Opponent": ("Opponent", "opponent", "away"),
+    "NameOdds": ("NameOdds", "player_odds", "home_odds"),
+    "OpponentOdds": ("OpponentOdds", "opponent_odds", "away_odds"),
+    "Surface": ("Surface", "surface"),
+}
+
+
+def parse_quotes(payload):
+    """
+    Quote dicts from a JSON list (or {'quotes': [...]}); entries missing a
+    name or a moneyline are dropped.
+    """
+    if isinstance(payload, dict):
+        payload = payload.get("quotes", [])
+    quotes = []
+    for item in payload:
+        quote = {}
+        for key, aliases in _QUOTE_ALIASES.items():
+            quote[key] = next((item[a] for a in aliases if item.get(a) is not None), None)
+        if None in (quote["Name"], quote["Opponent"], quote["NameOdds"], quote["OpponentOdds"]):
+            logging.debug("Skipping incomplete quote: %s", item)
+            continue
+        quotes.append(quote)
+    return quotes
+
+
+# ---------------------------------------------------------------------------
+# Context update
+# ---------------------------------------------------------------------------
+
+def update_context(quotes, context_file=CONTEXT_FILE):
+    """
+    Write de-vigged ImpliedWinPercentage for every quoted match into the
+    match context (both rows of the match). Quotes for matches not in the
+    context are added when they carry a Surface. The file is replaced
+    atomically and only if something changed.
+
+    Returns the number of context rows changed or added.
+    """
+    if os.path.exists(context_file):
+        df = pd.read_csv(context_file)
+    else:
+        df = pd.DataFrame(columns=["Name", "Opponent", "Surface", "ImpliedWinPercentage"])
+    df["ImpliedWinPercentage"] = df["ImpliedWinPercentage"].astype(float)
+
+    rows = {}
+    for i, (name, opponent) in enumerate(zip(df["Name"], df["Opponent"])):
+        rows[(normalize_name(name), normalize_name(opponent))] = i
+
+    changed = 0
+    new_rows = []
+    added = set()
+    for quote in quotes:
+        try:
+            wp_name, wp_opponent = devig(quote["NameOdds"], quote["OpponentOdds"])
+        except (TypeError, ValueError) as e:
+            logging.warning("Bad odds for %s vs %s: %s", quote['Name'], quote['Opponent'], e)
+            continue
+        name, opponent = normalize_name(quote["Name"]), normalize_name(quote["Opponent"])
+        sides = [((name, opponent), wp_name), ((opponent, name), wp_opponent)]
+
+        if all(side in rows for side, _ in sides):
+            for side, wp in sides:
+                i = rows[side]
+                wp = round(wp, 2)
+                if df.at[i, "ImpliedWinPercentage"] != wp:
+                    df.at[i, "ImpliedWinPercentage"] = wp
+                    changed += 1
+        elif quote.get("Surface") and quote_key(name, opponent) not in added:
+            new_rows.append({"Name": quote["Name"], "Opponent": quote["Opponent"],
+                             "Surface": quote["Surface"], "ImpliedWinPercentage": round(wp_name, 2)})
+            new_rows.append({"Name": quote["Opponent"], "Opponent": quote["Name"],
+                             "Surface": quote["Surface"], "ImpliedWinPercentage": round(wp_opponent, 2)})
+            added.add(quote_key(name, opponent))
+            changed += 2
+        else:
+            logging.debug("No context rows for %s vs %s; skipped.",
+                          quote['Name'], quote['Opponent'])
+
+    if changed:
+        if new_rows:
+            df = pd.concat([df, pd.DataFrame(new_rows)], ignore_index=True)
+        tmp = context_file + ".tmp"
+        df.to_csv(tmp, index=False)
+        os.replace(tmp, context_file)
+        logging.info("Updated %s rows of %s from live odds.", changed, context_file)
+    return changed
+
+
+# ---------------------------------------------------------------------------
+# Service
+# ---------------------------------------------------------------------------
+
+class OddsIngestionService:
+    """
+    Runs every provider concurrently over one shared HttpSession (bounded
+    by max_connections) and folds their quotes into the match context.
+
+    Quotes are buffered per match (latest wins) and written at most once per
+    debounce interval; after each write on_update(n_changed) is called, e.g.
+    to re-run incremental sim prep, so a burst of odds moves triggers a
+    single re-prep.
+    """
+
+    def __init__(self, providers, context_file=CONTEXT_FILE, debounce=ODDS_DEBOUNCE_SECONDS,
+                 on_update=None, max_connections=ODDS_MAX_CONNECTIONS):
+        self.providers = list(providers)
+        self.context_file = context_file
+        self.debounce = debounce
+        self.on_update = on_update
+        self.max_connections = max_connections
+        self._pending = {}
+        self._arrived = None
+        self._last_flush = float("-inf")
+
+    def submit(self, quotes):
+        """Buffer a batch of quotes for the next flush."""
+        for quote in quotes:
+            self._pending[quote_key(quote["Name"], quote["Opponent"])] = quote
+        if quotes and self._arrived is not None:
+            self._arrived.set()
+
+    async def flush(self):
+        """Write buffered quotes now; returns the number of rows changed."""
+        quotes, self._pending = list(self._pending.values()), {}
+        self._last_flush = time.monotonic()
+        if not quotes:
+            return 0
+        changed = await asyncio.to_thread(update_context, quotes, self.context_file)
+        if changed and self.on_update is not None:
+            result = self.on_update(changed)
+            if asyncio.iscoroutine(result):
+                await result
+        return changed
+
+    async def _consume(self, provider, session):
+        async for quotes in provider.stream(session):
+            logging.debug("%s: %s quotes", provider.name, len(quotes))
+            self.submit(quotes)
+
+    async def _flusher(self):
+        while True:
+            await self._arrived.wait()
+            # Throttle: wait out the rest of the interval, collecting more quotes
+            delay = self._last_flush + self.debounce - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._arrived.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logging.error("Odds context update failed: %s", e)
+
+    async def run(self, session=None):
+        """Poll / subscribe until cancelled. A session may be passed in (tests)."""
+        self._arrived = asyncio.Event()
+        if self._pending:
+            self._arrived.set()
+        session = session or HttpSession(self.max_connections)
+        tasks = [asyncio.create_task(self._consume(p, session)) for p in self.providers]
+        tasks.append(asyncio.create_task(self._flusher()))
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self.flush()
+
+    async def run_once(self, session=None):
+        """Fetch every provider once, concurrently, and write one update."""
+        session = session or HttpSession(self.max_connections)
+        batches = await asyncio.gather(*(p.fetch(session) for p in self.providers),
+                                       return_exceptions=True)
+        for provider, batch in zip(self.providers, batches):
+            if isinstance(batch, Exception):
+                logging.warning("Odds provider %s failed: %s", provider.name, batch)
+            else:
+                self.submit(batch)
+        return await self.flush()
+
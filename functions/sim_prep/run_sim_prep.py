@@ -1,17 +1,168 @@
 # functions/sim_prep/run_sim_prep.py
 
 import os
+import json
+import hashlib
 import logging
+import numpy as np
 import pandas as pd
-from rapidfuzz import process, fuzz
+from functions.metrics import count, profiled, timer
+from .config import (CONTEXT_FILE, OUTPUT_FILE, PREP_STATE_FILE, MIN_SCORE, FUZZY_THRESHOLD)
+from .name_mapping import load_name_mapping, append_name_mappings
+from .pending_approvals import save_pending_approvals
+from .stats_db import load_stats_store, stats_version
+from .name_resolution import NameResolver
+from .baseline_estimation import STAT_COLUMNS, estimate_stats
 
-from .config import (CONTEXT_FILE, OUTPUT_FILE, MIN_SCORE, FUZZY_THRESHOLD)
-from .name_mapping import load_name_mapping, append_name_mapping
-from .pending_approvals import save_pending_approval
-from .stats_db import load_player_stats
-from .baseline_estimation import baseline_stats, tune_stats_for_implied_wp
 
-def run_sim_prep():
+def _output_row(row, stats, stats_source):
+    """Sim-ready row; stats is None for rows still to be estimated."""
+    out = {
+        "Name": row["Name"],
+        "Opponent": row["Opponent"],
+        "Surface": row["Surface"],
+        "ImpliedWinPercentage": float(row["ImpliedWinPercentage"]),
+    }
+    for stat in STAT_COLUMNS:
+        if stats is None:
+            out[stat] = None
+        elif stat == "Elo":
+            out[stat] = int(stats[stat])
+        else:
+            out[stat] = round(float(stats[stat]), 3)
+    out["StatsSource"] = stats_source  # Add stats source
+    return out
+
+
+def _prep_row(row, name_map, stats_db, resolved, new_mappings, new_pending):
+    """
+    Sim-ready output row for one context row. Auto-approved names and
+    borderline matches are collected into new_mappings / new_pending.
+    Rows without database stats come back with empty stats and are filled
+    in by _estimate_rows.
+    """
+    raw_name = row["Name"]
+    opp_name = row["Opponent"]
+    surface = row["Surface"]
+    implied_wp = float(row["ImpliedWinPercentage"])
+
+    logging.debug("Preparing %s vs %s, surface=%s, wp=%s", raw_name, opp_name, surface, implied_wp)
+
+    # (A) If raw_name is in name_map => no fuzzy needed
+    if raw_name in name_map:
+        approved_name = name_map[raw_name]
+        logging.debug("Mapping found: %s -> %s", raw_name, approved_name)
+    else:
+        # (B) Fuzzy match
+        if len(stats_db) == 0:
+            approved_name = None
+            logging.debug("Empty stats DB => no fuzzy match possible.")
+        else:
+            candidates = resolved.get(raw_name, [])
+            if not candidates:
+                approved_name = None
+            else:
+                top_name, top_score = candidates[0]
+                logging.debug("Fuzzy best: %s (score=%s)", top_name, top_score)
+
+                if top_score >= FUZZY_THRESHOLD:
+                    # auto-approve
+                    approved_name = top_name
+                    new_mappings.append((raw_name, approved_name))
+                elif top_score >= MIN_SCORE:
+                    # borderline => pending
+                    new_pending[raw_name] = candidates
+                    approved_name = None
+                else:
+                    approved_name = None
+
+    # (C) Determine stats and stats source
+    ps = stats_db.lookup(approved_name, surface) if approved_name else None
+    if ps is None:
+        # No approved name or no row in DB => estimated with the batch
+        return _output_row(row, None, "Estimated")
+
+    stats = {stat: ps.get(column, default)
+             for (stat, column), default in zip(STAT_COLUMNS.items(), _DB_DEFAULTS)}
+    logging.debug("Using DB stats for %s: Elo=%s, SGW=%s, RGW=%s", approved_name,
+                  stats["Elo"], stats["ServiceGamesWon"], stats["ReturnGamesWon"])
+    return _output_row(row, stats, "Database")
+
+
+# Used when a database row lacks a column
+_DB_DEFAULTS = (1500, 0.60, 0.35, 0.35, 0.28)
+
+
+@timer("estimation")
+def _estimate_rows(rows, indices, averages):
+    """
+    Fill in the stats of rows[indices] (rows without database stats) in one
+    vectorized estimate_stats call: each is solved from its implied win
+    percentage against its opponent's database stats when the opponent's
+    row has them, else against the surface's field averages.
+    """
+    position = {(r["Name"], r["Opponent"]): i for i, r in enumerate(rows)}
+    opponent = {stat: np.full(len(indices), np.nan)
+                for stat in ("Elo", "ServiceGamesWon", "ReturnGamesWon")}
+    for k, i in enumerate(indices):
+        j = position.get((rows[i]["Opponent"], rows[i]["Name"]))
+        if j is not None and rows[j]["StatsSource"] == "Database":
+            for stat, values in opponent.items():
+                values[k] = rows[j][stat]
+
+    estimated = estimate_stats([rows[i]["ImpliedWinPercentage"] for i in indices],
+                               [rows[i]["Surface"] for i in indices], averages, opponent)
+    for i, stats in zip(indices, estimated.to_dict("records")):
+        rows[i] = _output_row(rows[i], stats, "Estimated")
+    count("rows_estimated", len(indices))
+
+
+def _row_fingerprint(row, approved_name, opponent_name, stats_ver):
+    """
+    Hash of everything a context row's output depends on: the row itself,
+    its approved name (if any), the opponent's (estimates are solved
+    against the opponent's stats) and the stats files version.
+    """
+    key = [row["Name"], row["Opponent"], row["Surface"],
+           float(row["ImpliedWinPercentage"]), approved_name, opponent_name, stats_ver]
+    return hashlib.sha1(json.dumps(key, default=str).encode()).hexdigest()
+
+
+def _load_prep_state():
+    if not os.path.exists(PREP_STATE_FILE) or not os.path.exists(OUTPUT_FILE):
+        return {}
+    try:
+        with open(PREP_STATE_FILE) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    # Only trust the state if it describes the current output file
+    if state.get("output_mtime_ns") != os.stat(OUTPUT_FILE).st_mtime_ns:
+        return {}
+    return state
+
+
+def _save_prep_state(rows, fingerprints):
+    os.makedirs(os.path.dirname(PREP_STATE_FILE) or ".", exist_ok=True)
+    state = {
+        "output_mtime_ns": os.stat(OUTPUT_FILE).st_mtime_ns,
+        "rows": {f"{r['Name']}|{r['Opponent']}": {"fingerprint": fp, "output": r}
+                 for r, fp in zip(rows, fingerprints)},
+    }
+    tmp = PREP_STATE_FILE + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, PREP_STATE_FILE)
+
+
+@timer("csv_write")
+def _write_output(df_final):
+    tmp = OUTPUT_FILE + ".tmp"
+    df_final.to_csv(tmp, index=False)
+    os.replace(tmp, OUTPUT_FILE)
+
+
+def run_sim_prep(incremental=False):
     """
     1) Load match_context.csv => [Name, Opponent, Surface, ImpliedWinPercentage]
     2) Use name_mapping + fuzzy logic => find stats or estimate
@@ -19,115 +170,98 @@ def run_sim_prep():
     4) Write final data/sim_ready.csv with "StatsSource" column
     5) Validate match count: Ensure all matches from context are included.
     Returns final DataFrame.
+
+    With incremental=True, each context row is fingerprinted together with
+    its name mapping and the stats files version; only rows whose
+    fingerprint changed since the last run are recomputed, the stats DB is
+    only loaded if some row needs it, and the output is left untouched when
+    nothing changed.
+
+    Stage timings and counters are recorded in functions.metrics; set
+    PIPELINE_PROFILE=cprofile (or pyinstrument) to also dump a profile of
+    the run under logs/profiles.
     """
+    with profiled("sim_prep"):
+        return _run_sim_prep(incremental)
+
+
+def _run_sim_prep(incremental):
     if not os.path.exists(CONTEXT_FILE):
         err = f"{CONTEXT_FILE} missing. Cannot do sim prep."
         logging.error(err)
         raise FileNotFoundError(err)
 
     df_context = pd.read_csv(CONTEXT_FILE)
-    logging.debug(f"Loaded context from {CONTEXT_FILE}, shape={df_context.shape}")
+    logging.debug("Loaded context from %s, shape=%s", CONTEXT_FILE, df_context.shape)
+    context_rows = df_context.to_dict("records")
 
     # Load name mapping
     name_map = load_name_mapping()
-    # Load stats DB
-    stats_db = load_player_stats()
-    if "Player" not in stats_db.columns:
-        logging.warning("Stats DB lacks 'Player' => always estimate.")
-        stats_db = pd.DataFrame(columns=["Player", "Elo", "ServiceGamesWonPercentage", "ReturnGamesWonPercentage"])
-
-    final_rows = []
-
-    for _, row in df_context.iterrows():
-        raw_name = row["Name"]
-        opp_name = row["Opponent"]
-        surface = row["Surface"]
-        implied_wp = float(row["ImpliedWinPercentage"])
-
-        logging.debug(f"Preparing {raw_name} vs {opp_name}, surface={surface}, wp={implied_wp}")
-
-        # (A) If raw_name is in name_map => no fuzzy needed
-        if raw_name in name_map:
-            approved_name = name_map[raw_name]
-            logging.debug(f"Mapping found: {raw_name} -> {approved_name}")
-        else:
-            # (B) Fuzzy match
-            player_list = stats_db["Player"].unique()
-            if len(player_list) == 0:
-                approved_name = None
-                logging.debug("Empty stats DB => no fuzzy match possible.")
-            else:
-                candidates = process.extract(raw_name, player_list, scorer=fuzz.ratio, limit=3)
-                if not candidates:
-                    approved_name = None
-                else:
-                    top_name, top_score, _ = candidates[0]
-                    logging.debug(f"Fuzzy best: {top_name} (score={top_score})")
-
-                    if top_score >= FUZZY_THRESHOLD:
-                        # auto-approve
-                        approved_name = top_name
-                        append_name_mapping(raw_name, approved_name)
-                    elif top_score >= MIN_SCORE:
-                        # borderline => pending
-                        cands_clean = [(c[0], c[1]) for c in candidates]
-                        save_pending_approval(raw_name, cands_clean)
-                        approved_name = None
-                    else:
-                        approved_name = None
-
-        # (C) Determine stats and stats source
-        stats_source = "Estimated"  # Default to estimated stats
-
-        if approved_name:
-            sub = stats_db[stats_db["Player"] == approved_name]
-            if not sub.empty:
-                ps = sub.iloc[0]
-                out_elo = ps.get("Elo", 1500)
-                out_sgw = ps.get("ServiceGamesWonPercentage", 0.60)
-                out_rgw = ps.get("ReturnGamesWonPercentage", 0.35)
-                stats_source = "Database"  # Use database stats
-                logging.debug(f"Using DB stats for {approved_name}: Elo={out_elo}, SGW={out_sgw}, RGW={out_rgw}")
-            else:
-                # No row in DB => estimate stats
-                base = baseline_stats()
-                tuned = tune_stats_for_implied_wp(base, implied_wp)
-                out_elo = tuned["Elo"]
-                out_sgw = tuned["ServiceGamesWon"]
-                out_rgw = tuned["ReturnGamesWon"]
+    stats_ver = stats_version()
+
+    previous = _load_prep_state().get("rows", {}) if incremental else {}
+    keys = [f"{row['Name']}|{row['Opponent']}" for row in context_rows]
+    final_rows = [None] * len(context_rows)
+    stale = []
+    for i, (key, row) in enumerate(zip(keys, context_rows)):
+        cached = previous.get(key)
+        fingerprint = _row_fingerprint(row, name_map.get(row["Name"]),
+                                       name_map.get(row["Opponent"]), stats_ver)
+        if cached is not None and cached["fingerprint"] == fingerprint:
+            final_rows[i] = cached["output"]
         else:
-            # No approved name => baseline + estimate
-            base = baseline_stats()
-            tuned = tune_stats_for_implied_wp(base, implied_wp)
-            out_elo = tuned["Elo"]
-            out_sgw = tuned["ServiceGamesWon"]
-            out_rgw = tuned["ReturnGamesWon"]
-
-        final_rows.append({
-            "Name": raw_name,
-            "Opponent": opp_name,
-            "Surface": surface,
-            "ImpliedWinPercentage": implied_wp,
-            "Elo": int(out_elo),
-            "ServiceGamesWon": round(out_sgw, 3),
-            "ReturnGamesWon": round(out_rgw, 3),
-            "StatsSource": stats_source  # Add stats source
-        })
+            stale.append(i)
+
+    if stale:
+        # Load stats DB, indexed by (player, surface)
+        stats_db = load_stats_store()
+        if len(stats_db) == 0:
+            logging.warning("Stats DB is empty => always estimate.")
+        player_list = stats_db.players()
+
+        # Resolve every unmapped name in one batch
+        unmapped = [context_rows[i]["Name"] for i in stale if context_rows[i]["Name"] not in name_map]
+        resolved = NameResolver(player_list).resolve(unmapped) if player_list and unmapped else {}
+
+        # Written in one transaction each after the loop
+        new_mappings = []
+        new_pending = {}
+        count("rows_recomputed", len(stale))
+        for i in stale:
+            final_rows[i] = _prep_row(context_rows[i], name_map, stats_db, resolved,
+                                      new_mappings, new_pending)
+
+        # Players without stats: one batched estimate against the field
+        unmatched = [i for i in stale if final_rows[i]["StatsSource"] == "Estimated"]
+        if unmatched:
+            _estimate_rows(final_rows, unmatched, stats_db.surface_averages())
+
+        append_name_mappings(new_mappings)
+        save_pending_approvals(new_pending)
+        name_map.update(new_mappings)
 
     df_final = pd.DataFrame(final_rows)
-    df_final.to_csv(OUTPUT_FILE, index=False)
-    logging.info(f"Sim prep complete. Wrote {len(df_final)} rows to {OUTPUT_FILE}.")
+    if not incremental or stale or list(previous) != keys:
+        _write_output(df_final)
+        logging.info("Sim prep complete. Wrote %s rows to %s (%s recomputed).",
+                     len(df_final), OUTPUT_FILE, len(stale))
+        fingerprints = [_row_fingerprint(r, name_map.get(r["Name"]), name_map.get(r["Opponent"]),
+                                         stats_ver) for r in context_rows]
+        _save_prep_state(final_rows, fingerprints)
+    else:
+        logging.info("Sim prep up to date. %s unchanged.", OUTPUT_FILE)
 
     # Validation step: Ensure match counts align
     context_matches = len(df_context) // 2  # Each match is listed twice
     prepped_matches = len(df_final) // 2
 
     if context_matches != prepped_matches:
-        logging.error(f"Mismatch in match count! Context: {context_matches}, Prepared: {prepped_matches}")
+        logging.error("Mismatch in match count! Context: %s, Prepared: %s",
+                      context_matches, prepped_matches)
         raise ValueError(
             f"Match count mismatch! Context has {context_matches} matches, but only {prepped_matches} were prepped."
         )
     else:
-        logging.info(f"Match count validation passed. Matches: {context_matches}")
+        logging.info("Match count validation passed. Matches: %s", context_matches)
 
     return df_final
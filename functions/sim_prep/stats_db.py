@@ -1,18 +1,210 @@
 # functions/sim_prep/stats_db.py
 
 import os
+import json
+import hashlib
 import logging
+import numpy as np
 import pandas as pd
-from .config import ATP_FILE, WTA_FILE
+from functions.metrics import count, timer
+from .baseline_estimation import surface_averages
+from .config import ATP_FILE, WTA_FILE, CACHE_DIR
 
-def load_player_stats():
-    """Combine atp.csv + wta.csv into one DataFrame with standard columns."""
-    if not os.path.exists(ATP_FILE) or not os.path.exists(WTA_FILE):
+STATS_COLUMNS = ["Player", "Elo", "ServiceGamesWonPercentage", "ReturnGamesWonPercentage"]
+TEXT_COLUMNS = ["Player", "PlayerIOC", "Surface"]
+
+# Stores already loaded in this process, keyed by source files
+_STORES = {}
+
+
+class StatsStore:
+    """
+    ATP + WTA stats indexed by (player, surface) for O(1) lookups.
+    Each player has one row per surface in the source files.
+    """
+
+    def __init__(self, frame):
+        self.frame = frame.reset_index(drop=True)
+        self._index = {}
+        self._default = {}
+        self._averages = None
+        if frame.empty or "Player" not in frame.columns:
+            return
+
+        surfaces = frame["Surface"] if "Surface" in frame.columns else pd.Series(None, index=frame.index)
+        matches = frame["Matches"].to_numpy() if "Matches" in frame.columns else np.zeros(len(frame))
+        for i, (player, surface) in enumerate(zip(frame["Player"], surfaces)):
+            self._index[(player, surface)] = i
+            # Fallback row when a surface is missing: the one with most matches
+            best = self._default.get(player)
+            if best is None or matches[i] > matches[best]:
+                self._default[player] = i
+
+    def __contains__(self, player):
+        return player in self._default
+
+    def __len__(self):
+        return len(self.frame)
+
+    def players(self):
+        """Unique player names, in source order."""
+        return list(self._default)
+
+    def row_index(self, player, surface=None):
+        """
+        Row number for (player, surface); falls back to the player's most
+        played surface. None if the player is unknown.
+        """
+        i = self._index.get((player, surface))
+        if i is None:
+            i = self._default.get(player)
+        return i
+
+    def lookup(self, player, surface=None):
+        """
+        Stats row (as a Series) for player on surface, see row_index.
+        """
+        i = self.row_index(player, surface)
+        return None if i is None else self.frame.iloc[i]
+
+    def player_values(self, column):
+        """
+        {player -> value} of a surface-independent column such as Elo.
+        """
+        values = self.frame[column].to_numpy()
+        return {player: values[i] for player, i in self._default.items()}
+
+    def surface_averages(self):
+        """
+        Field averages of the frame (baseline_estimation.surface_averages),
+        computed once per store; a new store is built when a source changes.
+        """
+        if self._averages is None:
+            self._averages = surface_averages(self.frame)
+        return self._averages
+
+
+def _source_signature(paths):
+    return [[os.path.abspath(p), os.stat(p).st_mtime_ns, os.path.getsize(p)] for p in paths]
+
+
+def _source_hash(paths):
+    digest = hashlib.sha1()
+    for p in paths:
+        with open(p, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def _cache_paths(cache_dir, paths):
+    key = hashlib.sha1("|".join(os.path.abspath(p) for p in paths).encode()).hexdigest()[:12]
+    base = os.path.join(cache_dir, f"stats_{key}")
+    return base + ".json", base + "_num.npy", base + "_text.npy"
+
+
+def _write_cache(frame, signature, source_hash, cache_dir, paths):
+    meta_file, num_file, text_file = _cache_paths(cache_dir, paths)
+    os.makedirs(cache_dir, exist_ok=True)
+    text_cols = [c for c in TEXT_COLUMNS if c in frame.columns]
+    num_cols = [c for c in frame.columns if c not in text_cols]
+
+    np.save(num_file, frame[num_cols].to_numpy(dtype=np.float64))
+    np.save(text_file, frame[text_cols].fillna("").to_numpy(dtype=str))
+    meta = {
+        "signature": signature,
+        "hash": source_hash,
+        "columns": list(frame.columns),
+        "text_columns": text_cols,
+        "numeric_columns": num_cols,
+        "dtypes": {c: str(frame[c].dtype) for c in num_cols},
+    }
+    # meta last, so a half-written cache is never picked up
+    tmp = meta_file + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp, meta_file)
+
+
+def _read_cache(cache_dir, paths, signature):
+    """
+    Cached frame if the sources are unchanged, else None. A changed mtime with
+    identical content still hits the cache (and refreshes the signature).
+    """
+    meta_file, num_file, text_file = _cache_paths(cache_dir, paths)
+    if not os.path.exists(meta_file):
+        return None
+    try:
+        with open(meta_file) as f:
+            meta = json.load(f)
+        if meta["signature"] != signature:
+            if meta["hash"] != _source_hash(paths):
+                return None
+            meta["signature"] = signature
+            with open(meta_file, "w") as f:
+                json.dump(meta, f)
+
+        numbers = np.load(num_file, mmap_mode="r")
+        text = np.load(text_file)
+        frame = pd.DataFrame(numbers, columns=meta["numeric_columns"])
+        for c, dtype in meta["dtypes"].items():
+            if dtype.startswith("int"):
+                frame[c] = frame[c].astype(dtype)
+        for j, c in enumerate(meta["text_columns"]):
+            frame[c] = text[:, j]
+        return frame[meta["columns"]]
+    except (OSError, ValueError, KeyError) as e:
+        logging.warning("Ignoring unreadable stats cache %s: %s", meta_file, e)
+        return None
+
+
+@timer("stats_load")
+def load_stats_store(atp_file=ATP_FILE, wta_file=WTA_FILE, cache_dir=CACHE_DIR):
+    """
+    StatsStore over atp_file + wta_file.
+    Reuses the store already built in this process, then the binary cache in
+    cache_dir; both are invalidated when a source file changes.
+    """
+    paths = [atp_file, wta_file]
+    if not all(os.path.exists(p) for p in paths):
         logging.warning("ATP/WTA file missing => returning empty stats DB.")
-        return pd.DataFrame(columns=["Player","Elo","ServiceGamesWonPercentage","ReturnGamesWonPercentage"])
+        return StatsStore(pd.DataFrame(columns=STATS_COLUMNS))
+
+    signature = _source_signature(paths)
+    key = tuple(os.path.abspath(p) for p in paths)
+    cached = _STORES.get(key)
+    if cached is not None and cached[0] == signature:
+        count("stats_memory_hits")
+        return cached[1]
+
+    frame = _read_cache(cache_dir, paths, signature)
+    if frame is None:
+        count("stats_cache_misses")
+        frame = pd.concat([pd.read_csv(p) for p in paths], ignore_index=True)
+        try:
+            _write_cache(frame, signature, _source_hash(paths), cache_dir, paths)
+        except OSError as e:
+            logging.warning("Could not write stats cache: %s", e)
+        logging.debug("Loaded stats from CSV: combined shape=%s", frame.shape)
+    else:
+        count("stats_cache_hits")
+        logging.debug("Loaded stats from cache: combined shape=%s", frame.shape)
+
+    store = StatsStore(frame)
+    _STORES[key] = (signature, store)
+    return store
+
 
-    atp_df = pd.read_csv(ATP_FILE)
-    wta_df = pd.read_csv(WTA_FILE)
-    combined = pd.concat([atp_df, wta_df], ignore_index=True)
-    logging.debug(f"Loaded stats: combined shape={combined.shape}")
-    return combined
+def stats_version(atp_file=ATP_FILE, wta_file=WTA_FILE):
+    """
+    Cheap version tag of the stats sources (from file mtimes and sizes),
+    without loading them.
+    """
+    paths = [atp_file, wta_file]
+    if not all(os.path.exists(p) for p in paths):
+        return "missing"
+    return hashlib.sha1(json.dumps(_source_signature(paths)).encode()).hexdigest()
+
+
+def load_player_stats():
+    """Combine atp.csv + wta.csv into one DataFrame with standard columns."""
+    return load_stats_store().frame
@@ -0,0 +1,226 @@
+# sim_results.py
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from functions.sim_stats import SimStats, stats_from_chunks
+
+RESULTS_DIR = "data/sim_results"
+
+EVENT_NAMES = [
+    'games_won', 'games_lost', 'sets_won', 'sets_lost', 'match_won',
+    'aces', 'double_faults', 'breaks', 'clean_sets', 'straight_sets',
+]
+
+# Event counts are small; int8 covers every best-of-5 count but aces
+EVENT_DTYPES = {name: np.int8 for name in EVENT_NAMES}
+EVENT_DTYPES['aces'] = np.int16
+EVENT_DTYPES['straight_sets'] = np.bool_
+
+_META = "meta.json"
+_SCORES = "scores.npy"
+_STATS = "stats.npz"
+
+
+def _events_file(name):
+    return f"events_{name}.npy"
+
+
+class SimResultsWriter:
+    """
+    Streams a simulation run to a results directory, chunk by chunk:
+
+      meta.json         player categories, per-column player codes, salaries
+      scores.npy        float32 (n_sims, n_columns), memory-mapped
+      events_<e>.npy    optional small-int event counts, same shape
+      stats.npz         running SimStats (moments, covariance, quantiles)
+
+    Columns follow the simulate_all_matches_batch layout; a player that
+    appears in several columns shares one category code.
+    """
+
+    def __init__(self, path, players, salaries, n_sims, store_events=False):
+        self.path = path
+        self.n_sims = n_sims
+        os.makedirs(path, exist_ok=True)
+
+        codes, categories = pd.factorize(pd.Series(players, dtype=object))
+        self.meta = {
+            "n_sims": int(n_sims),
+            "rows_written": 0,
+            "complete": False,
+            "categories": [str(c) for c in categories],
+            "codes": codes.tolist(),
+            "salaries": [None if pd.isna(s) else float(s) for s in salaries],
+            "events": EVENT_NAMES if store_events else [],
+        }
+        shape = (n_sims, len(codes))
+        self.scores = np.lib.format.open_memmap(
+            os.path.join(path, _SCORES), mode="w+", dtype=np.float32, shape=shape
+        )
+        self.events = {
+            name: np.lib.format.open_memmap(
+                os.path.join(path, _events_file(name)), mode="w+",
+                dtype=EVENT_DTYPES[name], shape=shape
+            )
+            for name in self.meta["events"]
+        }
+        self.stats = SimStats(players)
+        self._write_meta()
+
+    def _write_meta(self):
+        tmp = os.path.join(self.path, _META + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.meta, f)
+        os.replace(tmp, os.path.join(self.path, _META))
+
+    def write(self, start, scores, events=None):
+        """
+        Store rows [start, start + len(scores)) and record progress, so a
+        reader can follow a run that is still going.
+        """
+        stop = start + len(scores)
+        self.scores[start:stop] = scores
+        for name, out in self.events.items():
+            out[start:stop] = events[name]
+        # Running summary stats, so readers never need the full matrix
+        self.stats.update(scores, events["match_won"] if events is not None else None)
+        self.stats.save(os.path.join(self.path, _STATS))
+        self.meta["rows_written"] = max(self.meta["rows_written"], stop)
+        self._write_meta()
+
+    def close(self):
+        self.scores.flush()
+        for out in self.events.values():
+            out.flush()
+        self.meta["complete"] = self.meta["rows_written"] >= self.n_sims
+        self._write_meta()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class SimResults:
+    """
+    Lazy reader for a results directory written by SimResultsWriter.
+    Nothing is loaded until asked for; scores and events are read-only
+    memory maps limited to the rows written so far.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.refresh()
+
+    def refresh(self):
+        """Re-read meta.json (e.g. to follow a run in progress)."""
+        with open(os.path.join(self.path, _META)) as f:
+            self.meta = json.load(f)
+        self.categories = np.array(self.meta["categories"], dtype=object)
+        self.codes = np.array(self.meta["codes"], dtype=np.int32)
+        self.salaries = np.array(self.meta["salaries"], dtype=float)
+        self._scores = None
+
+    @property
+    def players(self):
+        """Player name of every column."""
+        return self.categories[self.codes]
+
+    @property
+    def n_sims(self):
+        """Simulations written so far."""
+        return self.meta["rows_written"]
+
+    @property
+    def complete(self):
+        return self.meta["complete"]
+
+    @property
+    def scores(self):
+        if self._scores is None:
+            self._scores = np.load(os.path.join(self.path, _SCORES), mmap_mode="r")
+        return self._scores[:self.n_sims]
+
+    def events(self, name):
+        """Memory-mapped counts of one event, (n_sims, n_columns)."""
+        if name not in self.meta["events"]:
+            raise KeyError(f"Event '{name}' was not stored with these results.")
+        return np.load(os.path.join(self.path, _events_file(name)), mmap_mode="r")[:self.n_sims]
+
+    def columns(self, players):
+        """Column indices for player names (first column per player)."""
+        first = pd.Series(np.arange(len(self.codes)), index=self.players)
+        first = first[~first.index.duplicated()]
+        return first.loc[list(players)].to_numpy()
+
+    def score_slice(self, rows=slice(None), players=None):
+        """
+        Scores for a row slice and optional player names as an in-memory
+        array; only that part of the file is read.
+        """
+        if players is None:
+            return np.array(self.scores[rows])
+        return np.array(self.scores[rows][:, self.columns(players)])
+
+    def iter_chunks(self, chunk_size=10000):
+        """Yield (start, scores chunk) over the rows written so far."""
+        for start in range(0, self.n_sims, chunk_size):
+            yield start, np.array(self.scores[start:start + chunk_size])
+
+    def as_batch_result(self):
+        """
+        simulate_all_matches_batch-style dict backed by the memory maps, for
+        code that indexes result['scores'] directly.
+        """
+        return {"players": self.players, "salaries": self.salaries, "scores": self.scores}
+
+    def projections(self, stat="mean", chunk_size=10000):
+        """
+        Per-player projection ('mean', 'median' or e.g. 'p90') as a Series.
+        The mean streams over chunks; quantiles read one column at a time.
+        """
+        if stat == "mean":
+            total = np.zeros(len(self.codes))
+            for _, chunk in self.iter_chunks(chunk_size):
+                total += chunk.sum(axis=0, dtype=np.float64)
+            values = total / max(self.n_sims, 1)
+        else:
+            q = 50.0 if stat == "median" else float(stat[1:])
+            values = np.array([np.percentile(self.scores[:, j], q) for j in range(len(self.codes))])
+        projections = pd.Series(values, index=self.players)
+        return projections[~projections.index.duplicated()]
+
+    def stats(self, chunk_size=10000):
+        """
+        SimStats over the simulations written so far: the writer's running
+        copy when present (so a run in progress gives live estimates), else
+        streamed from the score chunks.
+        """
+        path = os.path.join(self.path, _STATS)
+        if os.path.exists(path):
+            return SimStats.load(path)
+        won = self.events("match_won") if "match_won" in self.meta["events"] else None
+        chunks = ((chunk, None if won is None else np.array(won[start:start + len(chunk)]))
+                  for start, chunk in self.iter_chunks(chunk_size))
+        return stats_from_chunks(self.players, chunks)
+
+    def to_long_frame(self, rows=slice(0, 100)):
+        """
+        The old simulate_all_matches long format (Sim, Player, Salary,
+        DK_Score) for a slice of simulations, for display.
+        """
+        block = self.score_slice(rows)
+        first = rows.start or 0
+        n_rows, n_cols = block.shape
+        return pd.DataFrame({
+            "Sim": np.repeat(np.arange(first, first + n_rows), n_cols),
+            "Player": pd.Categorical.from_codes(np.tile(self.codes, n_rows), self.categories),
+            "Salary": np.tile(self.salaries, n_rows),
+            "DK_Score": block.ravel(),
+        })
@@ -0,0 +1,198 @@
+# sim_stats.py
+
+import os
+
+import numpy as np
+import pandas as pd
+
+# Score histogram used as the quantile sketch: DK points per match sit well
+# inside this range; anything outside lands in the edge bins (the exact
+# min / max are tracked separately)
+HIST_LOW = -50.0
+HIST_HIGH = 250.0
+HIST_BIN_WIDTH = 0.1
+
+
+class SimStats:
+    """
+    Streaming per-column statistics of a simulation score matrix, updated
+    chunk by chunk so the full matrix never has to be in memory:
+
+      - mean, variance and the full covariance matrix, merged across chunks
+        with the pairwise (Chan / Welford) update, which stays accurate
+        where naive sums of squares cancel
+      - quantiles (floor / ceiling percentiles) from a fixed-width
+        histogram per column, accurate to HIST_BIN_WIDTH points
+      - win rate from 'match_won' events (NaN unless every chunk came
+        with them: the higher DK score does not always win the match)
+
+    Columns follow the simulate_all_matches_batch layout; summary frames
+    are indexed by player, keeping a player's first column.
+    """
+
+    def __init__(self, players, low=HIST_LOW, high=HIST_HIGH, bin_width=HIST_BIN_WIDTH):
+        self.players = np.asarray(players, dtype=object)
+        n_columns = len(self.players)
+        self.low = low
+        self.bin_width = bin_width
+        self.n_bins = int(round((high - low) / bin_width))
+        self.n = 0
+        self.mean = np.zeros(n_columns)
+        self.m2 = np.zeros((n_columns, n_columns))
+        self.hist = np.zeros((n_columns, self.n_bins), dtype=np.int64)
+        self.min = np.full(n_columns, np.inf)
+        self.max = np.full(n_columns, -np.inf)
+        self.wins = np.zeros(n_columns, dtype=np.int64)
+        self.has_wins = True
+
+    def update(self, scores, match_won=None):
+        """Add a (n_sims, n_columns) chunk of scores (and match_won events)."""
+        x = np.asarray(scores, dtype=np.float64)
+        n_b = x.shape[0]
+        if n_b == 0:
+            return self
+        mean_b = x.mean(axis=0)
+        centered = x - mean_b
+        m2_b = centered.T @ centered
+
+        # Pairwise merge of (n, mean, co-moments)
+        n = self.n + n_b
+        delta = mean_b - self.mean
+        self.m2 += m2_b + np.outer(delta, delta) * (self.n * n_b / n)
+        self.mean += delta * (n_b / n)
+        self.n = n
+
+        n_columns = x.shape[1]
+        bins = np.clip(np.floor((x - self.low) / self.bin_width), 0, self.n_bins - 1)
+        flat = bins.astype(np.int64) + np.arange(n_columns) * self.n_bins
+        self.hist += np.bincount(flat.ravel(), minlength=n_columns * self.n_bins).reshape(
+            n_columns, self.n_bins)
+        np.minimum(self.min, x.min(axis=0), out=self.min)
+        np.maximum(self.max, x.max(axis=0), out=self.max)
+
+        if match_won is None:
+            self.has_wins = False
+        else:
+            self.wins += np.asarray(match_won, dtype=bool).sum(axis=0)
+        return self
+
+    def merge(self, other):
+        """Combine with the stats of another run over the same columns."""
+        if other.n == 0:
+            return self
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + np.outer(delta, delta) * (self.n * other.n / n)
+        self.mean += delta * (other.n / n)
+        self.n = n
+        self.hist += other.hist
+        np.minimum(self.min, other.min, out=self.min)
+        np.maximum(self.max, other.max, out=self.max)
+        self.wins += other.wins
+        self.has_wins = self.has_wins and other.has_wins
+        return self
+
+    # -- estimates --------------------------------------------------------
+
+    def variance(self):
+        return np.diag(self.m2) / max(self.n - 1, 1)
+
+    def covariance(self):
+        return self.m2 / max(self.n - 1, 1)
+
+    def correlation(self):
+        std = np.sqrt(np.diag(self.m2))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            corr = self.m2 / np.outer(std, std)
+        np.fill_diagonal(corr, 1.0)
+        return corr
+
+    def quantile(self, q):
+        """Per-column q-quantile (0-1), interpolated within histogram bins."""
+        cum = np.cumsum(self.hist, axis=1)
+        target = q * self.n
+        b = np.minimum((cum < target).sum(axis=1), self.n_bins - 1)
+        rows = np.arange(len(b))
+        in_bin = self.hist[rows, b]
+        before = cum[rows, b] - in_bin
+        frac = np.where(in_bin > 0, (target - before) / np.maximum(in_bin, 1), 0.0)
+        values = self.low + (b + frac) * self.bin_width
+        return np.clip(values, self.min, self.max)
+
+    def win_rate(self):
+        if not self.has_wins:
+            return np.full(len(self.wins), np.nan)
+        return self.wins / max(self.n, 1)
+
+    # -- frames -----------------------------------------------------------
+
+    def _first_columns(self):
+        return ~pd.Index(self.players).duplicated()
+
+    def summary(self, percentiles=(10, 50, 90)):
+        """
+        Per-player Sims, Mean, Std, percentiles (P10 = floor, P90 = ceiling
+        by default), Min, Max and WinRate.
+        """
+        frame = pd.DataFrame({
+            "Sims": self.n,
+            "Mean": self.mean,
+            "Std": np.sqrt(self.variance()),
+        }, index=pd.Index(self.players, name="Player"))
+        for q in percentiles:
+            frame[f"P{q}"] = self.quantile(q / 100)
+        frame["Min"] = self.min
+        frame["Max"] = self.max
+        frame["WinRate"] = self.win_rate()
+        return frame[self._first_columns()]
+
+    def correlation_frame(self):
+        keep = self._first_columns()
+        players = self.players[keep]
+        return pd.DataFrame(self.correlation()[np.ix_(keep, keep)], index=players, columns=players)
+
+    def covariance_frame(self):
+        keep = self._first_columns()
+        players = self.players[keep]
+        return pd.DataFrame(self.covariance()[np.ix_(keep, keep)], index=players, columns=players)
+
+    # -- persistence ------------------------------------------------------
+
+    def save(self, path):
+        """Write to path (.npz), replacing it atomically."""
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, players=self.players.astype(str), n=self.n, mean=self.mean, m2=self.m2,
+                 hist=self.hist, min=self.min, max=self.max, wins=self.wins,
+                 has_wins=self.has_wins,
+                 layout=np.array([self.low, self.bin_width, self.n_bins]))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            low, bin_width, n_bins = data["layout"]
+            stats = cls(data["players"], low, low + n_bins * bin_width, bin_width)
+            stats.n = int(data["n"])
+            stats.mean = data["mean"]
+            stats.m2 = data["m2"]
+            stats.hist = data["hist"]
+            stats.min = data["min"]
+            stats.max = data["max"]
+            stats.wins = data["wins"]
+            stats.has_wins = bool(data["has_wins"])
+        return stats
+
+
+def stats_from_chunks(players, chunks):
+    """
+    SimStats over an iterable of score chunks, or of (scores, match_won)
+    pairs.
+    """
+    stats = SimStats(players)
+    for chunk in chunks:
+        if isinstance(chunk, tuple):
+            stats.update(*chunk)
+        else:
+            stats.update(chunk)
+    return stats
+
@@ -0,0 +1,33 @@
+# tests/test_app_cache.py
+
+import pandas as pd
+
+from functions import app_cache
+
+
+def test_cache_is_bounded_lru(monkeypatch):
+    monkeypatch.setattr(app_cache, "MAX_ENTRIES", 3)
+    app_cache.invalidate()
+    calls = []
+
+    def get(i):
+        return app_cache._cached("test", i, 0, lambda: calls.append(i) or i)
+
+    for i in range(3):
+        get(i)
+    get(0)              # 0 is now the most recently used
+    get(3)              # evicts 1
+    assert len(app_cache._CACHE) == 3
+    get(0)
+    get(1)
+    assert calls == [0, 1, 2, 3, 1]
+    app_cache.invalidate()
+
+
+def test_csv_reread_when_file_changes(tmp_path):
+    path = str(tmp_path / "pool.csv")
+    pd.DataFrame({"a": [1]}).to_csv(path, index=False)
+    assert app_cache.load_csv(path)["a"].tolist() == [1]
+    pd.DataFrame({"a": [1, 2]}).to_csv(path, index=False)
+    assert app_cache.load_csv(path)["a"].tolist() == [1, 2]
+    app_cache.invalidate()
@@ -0,0 +1,42 @@
+# tests/test_baseline_estimation.py
+
+import numpy as np
+import pytest
+
+from functions.match_engine import match_win_probability, serve_point_probability
+from functions.sim_prep.baseline_estimation import implied_serve_return
+
+
+def _win_probability(sgw, rgw, opponent_sgw, opponent_rgw, best_of):
+    pa = serve_point_probability((sgw + 1 - opponent_rgw) / 2)
+    pb = serve_point_probability((opponent_sgw + 1 - rgw) / 2)
+    return match_win_probability(pa, pb, best_of)
+
+
+@pytest.mark.parametrize("best_of", [3, 5])
+def test_solved_rates_give_implied_win_probability(best_of):
+    rng = np.random.default_rng(0)
+    n = 40
+    wp = rng.uniform(25, 75, n)
+    opponent_sgw, opponent_rgw = rng.uniform(0.6, 0.85, n), rng.uniform(0.15, 0.4, n)
+    field_sgw, field_rgw = rng.uniform(0.6, 0.8, n), rng.uniform(0.2, 0.35, n)
+
+    sgw, rgw = implied_serve_return(wp, opponent_sgw, opponent_rgw, field_sgw, field_rgw, best_of)
+    assert sgw.shape == rgw.shape == (n,)
+    # One shift on both serve and return (no rate is clipped in this range)
+    np.testing.assert_allclose(sgw - field_sgw, rgw - field_rgw, atol=1e-12)
+    np.testing.assert_allclose(_win_probability(sgw, rgw, opponent_sgw, opponent_rgw, best_of),
+                               wp / 100, atol=1e-6)
+
+
+def test_even_matchup_keeps_field_rates():
+    sgw, rgw = implied_serve_return([50.0], [0.7], [0.3], [0.7], [0.3])
+    np.testing.assert_allclose(sgw, [0.7], atol=1e-6)
+    np.testing.assert_allclose(rgw, [0.3], atol=1e-6)
+
+
+def test_unreachable_win_probability_hits_the_clip():
+    # Against a near-unbeatable opponent even the strongest shift falls short
+    sgw, rgw = implied_serve_return([99.0], [0.99], [0.9], [0.6], [0.3])
+    assert sgw[0] == pytest.approx(0.99)
+    assert rgw[0] == pytest.approx(0.9)
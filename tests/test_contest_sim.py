@@ -0,0 +1,75 @@
+# tests/test_contest_sim.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from functions.contest_sim import _contest_chunk, payout_table, payout_vector, simulate_contest
+from functions.opto import load_pool
+from functions.sim import simulate_all_matches_batch
+
+
+def brute_force(ours, field, prizes, depth):
+    """Places and payouts from a full sort of every entry, sim by sim."""
+    places = np.empty(ours.shape, dtype=int)
+    payouts = np.empty(ours.shape)
+    for s in range(ours.shape[0]):
+        everyone = np.sort(np.concatenate([ours[s], field[s]]))[::-1]
+        for i, value in enumerate(ours[s]):
+            ahead = int((everyone > value).sum())
+            tied = int((everyone == value).sum())
+            places[s, i] = min(ahead + 1, depth + 1)
+            payouts[s, i] = prizes[ahead:ahead + tied].mean()
+    return places, payouts
+
+
+@pytest.mark.parametrize("seed, n_field, depth, levels", [
+    (0, 40, 5, 8),      # heavy ties, across the cutoff too
+    (1, 60, 10, 30),
+    (2, 12, 12, 6),     # depth reaches the whole field
+    (3, 200, 3, 1000),  # few ties
+])
+def test_places_and_split_prizes_match_full_sort(seed, n_field, depth, levels):
+    rng = np.random.default_rng(seed)
+    n_sims, n_ours = 50, 7
+    # Integer scores on a few levels force ties among ours, the field and both
+    ours = rng.integers(0, levels, (n_sims, n_ours)).astype(np.float32)
+    field = rng.integers(0, levels, (n_sims, n_field)).astype(np.float32)
+    prizes = np.zeros(n_ours + n_field)
+    prizes[:depth] = np.sort(rng.uniform(1, 100, depth))[::-1]
+
+    place, payout = _contest_chunk(ours, field, prizes, depth)
+    expected_place, expected_payout = brute_force(ours, field, prizes, depth)
+    np.testing.assert_array_equal(place, expected_place)
+    np.testing.assert_allclose(payout, expected_payout)
+
+
+def test_payouts_add_up_to_the_prize_pool():
+    rng = np.random.default_rng(4)
+    prizes = payout_vector(payout_table(100, 20.0), 100)
+    ours = rng.integers(0, 5, (30, 100)).astype(np.float32)
+    _, payout = _contest_chunk(ours[:, :10], ours[:, 10:], prizes, 100)
+    # Our entries' share plus the field's share is the whole pool, so ours
+    # never exceeds it even when everyone ties
+    assert (payout.sum(axis=1) <= prizes.sum() + 1e-6).all()
+    everyone_tied = np.zeros((1, 100), dtype=np.float32)
+    _, tied = _contest_chunk(everyone_tied[:, :10], everyone_tied[:, 10:], prizes, 100)
+    np.testing.assert_allclose(tied, prizes.sum() / 100)
+
+
+def test_simulate_contest_against_a_fixed_field():
+    pool = load_pool("csvs/pool.csv")
+    df = pd.read_csv("data/sim_ready.csv")
+    sim_result = simulate_all_matches_batch(df, n_sims=300, rng=0)
+    rng = np.random.default_rng(5)
+    lineups = [tuple(sorted(rng.choice(len(pool), 6, replace=False))) for _ in range(3)]
+    field = [tuple(sorted(rng.choice(len(pool), 6, replace=False))) for _ in range(50)]
+
+    contest = simulate_contest(sim_result, pool, lineups, field=field, entry_fee=10.0,
+                               chunk_size=64)
+    entries = contest["entries"]
+    assert len(entries) == 3
+    assert ((entries["CashRate"] >= entries["WinRate"]) & (entries["BestPlace"] >= 1)).all()
+    assert contest["portfolio"]["profit"].shape == (300,)
+    np.testing.assert_allclose(contest["portfolio"]["mean_profit"],
+                               (entries["MeanPayout"].sum() - 3 * 10.0), rtol=1e-5)
@@ -0,0 +1,52 @@
+# tests/test_dk_scoring.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from functions.dk_scoring import calculate_draftkings_points, calculate_draftkings_points_array
+
+
+def random_events(n, rng):
+    return {
+        'games_won': rng.integers(0, 25, n),
+        'games_lost': rng.integers(0, 25, n),
+        'sets_won': rng.integers(0, 4, n),
+        'sets_lost': rng.integers(0, 4, n),
+        'match_won': rng.integers(0, 2, n),
+        'aces': rng.integers(0, 30, n),
+        'double_faults': rng.integers(0, 4, n),
+        'breaks': rng.integers(0, 8, n),
+        'clean_sets': rng.integers(0, 3, n),
+        'straight_sets': rng.integers(0, 2, n).astype(bool),
+    }
+
+
+def scalar_points(events, best_of_3):
+    return np.array([
+        calculate_draftkings_points({k: v[i] for k, v in events.items()}, bool(best_of_3[i]))
+        for i in range(len(best_of_3))
+    ], dtype=np.float32)
+
+
+@pytest.mark.parametrize("best_of_3", [True, False])
+def test_array_matches_scalar_per_format(best_of_3):
+    rng = np.random.default_rng(int(best_of_3))
+    events = random_events(5000, rng)
+    expected = scalar_points(events, np.full(5000, best_of_3))
+    np.testing.assert_array_equal(calculate_draftkings_points_array(events, best_of_3), expected)
+
+
+def test_array_matches_scalar_mixed_formats():
+    rng = np.random.default_rng(2)
+    events = random_events(5000, rng)
+    best_of_3 = rng.integers(0, 2, 5000).astype(bool)
+    expected = scalar_points(events, best_of_3)
+    np.testing.assert_array_equal(calculate_draftkings_points_array(events, best_of_3), expected)
+
+
+def test_array_accepts_dataframe():
+    rng = np.random.default_rng(3)
+    events = random_events(200, rng)
+    np.testing.assert_array_equal(calculate_draftkings_points_array(pd.DataFrame(events)),
+                                  calculate_draftkings_points_array(events))
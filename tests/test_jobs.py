@@ -0,0 +1,93 @@
+# tests/test_jobs.py
+
+import os
+import time
+
+import pandas as pd
+import pytest
+
+from functions.jobs import JobRunner
+from functions.sim_prep import config
+
+
+def wait(job, timeout=120):
+    deadline = time.monotonic() + timeout
+    while not job.done:
+        assert time.monotonic() < deadline, f"job {job.key} still {job.status}"
+        time.sleep(0.1)
+    assert job.status == "done", job.error
+    return job
+
+
+@pytest.fixture
+def runner(tmp_path):
+    runner = JobRunner(jobs_dir=str(tmp_path / "jobs"), max_workers=1)
+    yield runner
+    runner.shutdown()
+
+
+@pytest.fixture
+def prep_paths(tmp_path, monkeypatch):
+    """
+    Sim prep writes into tmp_path: settings go to the spawned workers through
+    SIM_PREP_* variables, and are patched here for this process.
+    """
+    paths = {
+        "OUTPUT_FILE": tmp_path / "sim_ready.csv",
+        "NAMES_DB": tmp_path / "names.db",
+        "PENDING_FILE": tmp_path / "pending_approvals.csv",
+        "CACHE_DIR": tmp_path / "cache",
+        "PREP_STATE_FILE": tmp_path / "cache" / "sim_prep_state.json",
+    }
+    for name, path in paths.items():
+        monkeypatch.setenv(config.ENV_PREFIX + name, str(path))
+        monkeypatch.setattr(config, name, str(path))
+    return paths
+
+
+def test_finished_simulation_is_reused(runner):
+    df = pd.read_csv("data/sim_ready.csv").head(4)
+    job = wait(runner.submit_simulation(df, 2000, reuse_matches=False))
+    assert job.result().n_sims == 2000
+    assert job.partial_percentiles()["Sims"].iloc[0] == 2000
+
+    # A fresh runner (another session / restart) finds the finished job on disk
+    other = JobRunner(jobs_dir=runner.jobs_dir)
+    again = other.submit_simulation(df, 2000, reuse_matches=False)
+    assert again.key == job.key and again.future is None and again.status == "done"
+    other.shutdown()
+
+
+def settled_sim_prep(runner):
+    """
+    Finished sim prep job that a resubmit reuses. The first run creates the
+    names database and stores new mappings, which are inputs of the key.
+    """
+    job = wait(runner.submit_sim_prep())
+    for _ in range(3):
+        again = wait(runner.submit_sim_prep())
+        if again is job:
+            return job
+        job = again
+    raise AssertionError("sim prep job key never settled")
+
+
+def test_sim_prep_reruns_when_its_output_is_gone(runner, prep_paths):
+    output = prep_paths["OUTPUT_FILE"]
+    first = settled_sim_prep(runner)
+    assert output.exists()
+
+    output.unlink()
+    rerun = wait(runner.submit_sim_prep())
+    assert rerun is not first
+    assert output.exists()
+    assert len(pd.read_csv(output)) == len(first.result())
+
+
+def test_sim_prep_reruns_when_its_output_is_overwritten(runner, prep_paths):
+    output = prep_paths["OUTPUT_FILE"]
+    first = settled_sim_prep(runner)
+    pd.read_csv(output).head(2).to_csv(output, index=False)
+    rerun = wait(runner.submit_sim_prep())
+    assert rerun is not first
+    assert len(pd.read_csv(output)) == len(first.result())
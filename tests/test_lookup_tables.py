@@ -0,0 +1,67 @@
+# tests/test_lookup_tables.py
+
+import numpy as np
+import pytest
+
+from functions.lookup_tables import HOLD_STEP, LookupTables, build_tables, hold_grid
+from functions.match_engine import match_win_probability, serve_point_probability
+
+
+@pytest.fixture(scope="module")
+def tables(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("lookup"))
+    build_tables(path, samples=64, seed=0)
+    return LookupTables(path)
+
+
+@pytest.mark.parametrize("best_of", [3, 5])
+def test_match_win_on_grid_matches_engine(tables, best_of):
+    # Up to the serve point probability round trip (an interpolated inverse)
+    grid = hold_grid()[::5]
+    hold_a, hold_b = np.meshgrid(grid, grid, indexing="ij")
+    expected = match_win_probability(serve_point_probability(hold_a),
+                                     serve_point_probability(hold_b), best_of)
+    np.testing.assert_allclose(tables.match_win(hold_a, hold_b, best_of), expected, atol=1e-6)
+
+
+def test_match_win_between_grid_points(tables):
+    rng = np.random.default_rng(1)
+    hold_a = rng.uniform(0.55, 0.9, 50)
+    hold_b = rng.uniform(0.55, 0.9, 50)
+    best_of = rng.choice([3, 5], 50)
+    pa, pb = serve_point_probability(hold_a), serve_point_probability(hold_b)
+    expected = np.where(best_of == 3, match_win_probability(pa, pb, 3),
+                        match_win_probability(pa, pb, 5))
+    assert np.abs(tables.match_win(hold_a, hold_b, best_of) - expected).max() < 0.02
+
+
+def test_holds_outside_grid_are_clipped(tables):
+    grid = hold_grid()
+    assert tables.match_win(0.1, 0.5, 3) == pytest.approx(tables.match_win(grid[0], 0.5, 3))
+    assert tables.match_win(0.999, 0.5, 3) == pytest.approx(tables.match_win(grid[-1], 0.5, 3))
+
+
+def test_unsupported_format_raises(tables):
+    with pytest.raises(ValueError):
+        tables.match_win(0.8, 0.7, 4)
+
+
+def test_expected_points_shape_and_symmetry(tables):
+    hold_a, hold_b = np.array([0.80, 0.65]), np.array([0.70, 0.77])
+    points = tables.expected_points(hold_a, hold_b, 0.4, 0.3, 0.25, 0.3, [3, 5])
+    assert points.shape == (2, 2)
+    # Swapping the players swaps the columns
+    swapped = tables.expected_points(hold_b, hold_a, 0.3, 0.4, 0.3, 0.25, [3, 5])
+    np.testing.assert_allclose(points, swapped[:, ::-1])
+
+
+def test_sampled_scores_centre_on_expected_points(tables):
+    hold_a = np.array([0.80, 0.66 + HOLD_STEP / 2])
+    hold_b = np.array([0.70, 0.77])
+    args = (hold_a, hold_b, np.array([0.4, 0.2]), np.array([0.3, 0.5]),
+            np.array([0.25, 0.1]), np.array([0.3, 0.2]), np.array([3, 5]))
+    scores = tables.sample_scores(*args, n_sims=40000, rng=np.random.default_rng(2))
+    assert scores.shape == (40000, 4)
+    assert scores.dtype == np.float32
+    expected = tables.expected_points(*args).ravel()
+    np.testing.assert_allclose(scores.mean(axis=0), expected, atol=0.25)
@@ -0,0 +1,91 @@
+# tests/test_metrics.py
+
+import json
+import os
+
+import pytest
+
+from functions import metrics
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def test_timer_as_context_manager_and_decorator():
+    with metrics.timer("stage"):
+        pass
+
+    @metrics.timer("stage")
+    def work(x):
+        return x * 2
+
+    assert work(21) == 42
+    assert work.__name__ == "work"
+    entry = metrics.snapshot()['timers']['stage']
+    assert entry['calls'] == 2
+    assert 0 <= entry['max'] <= entry['seconds']
+
+
+def test_decorated_timer_records_failing_calls():
+    @metrics.timer("fails")
+    def fail():
+        raise KeyError("x")
+
+    with pytest.raises(KeyError):
+        fail()
+    assert metrics.snapshot()['timers']['fails']['calls'] == 1
+
+
+def test_counters_snapshot_and_reset():
+    metrics.count("hits")
+    metrics.count("hits", 4)
+    data = metrics.snapshot()
+    assert data['counters'] == {'hits': 5}
+
+    # The snapshot is a copy
+    data['counters']['hits'] = 0
+    assert metrics.snapshot()['counters']['hits'] == 5
+    assert "hits" in metrics.summary()
+
+    metrics.reset()
+    assert metrics.snapshot() == {'timers': {}, 'counters': {}}
+
+
+def test_write_json(tmp_path):
+    metrics.count("rows", 3)
+    with metrics.timer("csv_write"):
+        pass
+    path = metrics.write_json(str(tmp_path / "out" / "metrics.json"))
+    with open(path) as f:
+        data = json.load(f)
+    assert data['counters'] == {'rows': 3}
+    assert data['timers']['csv_write']['calls'] == 1
+    assert "written_at" in data
+    assert not os.path.exists(path + ".tmp")
+
+
+def test_profiled_cprofile_writes_profile_and_metrics(tmp_path, monkeypatch):
+    # The metrics snapshot goes to the relative METRICS_FILE
+    monkeypatch.chdir(tmp_path)
+    out_dir = tmp_path / "profiles"
+    with metrics.profiled("run", tool="cprofile", out_dir=str(out_dir)):
+        sum(range(1000))
+
+    profiles = os.listdir(out_dir)
+    assert len(profiles) == 1 and profiles[0].startswith("run_") and profiles[0].endswith(".prof")
+    assert metrics.snapshot()['timers']['run']['calls'] == 1
+    with open(tmp_path / metrics.METRICS_FILE) as f:
+        assert json.load(f)['timers']['run']['calls'] == 1
+
+
+def test_profiled_without_tool_only_times(tmp_path, monkeypatch):
+    monkeypatch.delenv(metrics.PROFILE_ENV, raising=False)
+    out_dir = tmp_path / "profiles"
+    with metrics.profiled("run", out_dir=str(out_dir)):
+        pass
+    assert not out_dir.exists()
+    assert metrics.snapshot()['timers']['run']['calls'] == 1
@@ -0,0 +1,44 @@
+# tests/test_name_store.py
+
+import os
+
+import pytest
+
+from functions.sim_prep import name_store
+
+
+@pytest.fixture
+def db_file(tmp_path, monkeypatch):
+    # New databases would otherwise be seeded from the repo's CSVs
+    monkeypatch.setattr(name_store, "NAMES_FILE", str(tmp_path / "names.csv"))
+    monkeypatch.setattr(name_store, "PENDING_FILE", str(tmp_path / "pending.csv"))
+    return str(tmp_path / "names.db")
+
+
+def test_recreated_database_is_not_served_from_cache(db_file):
+    name_store.upsert_mappings([("A. Player", "Alpha Player")], db_file)
+    assert name_store.load_mapping(db_file) == {"A. Player": "Alpha Player"}
+
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_file + suffix):
+            os.remove(db_file + suffix)
+    # Same path and same revision count as the first database
+    name_store.upsert_mappings([("B. Player", "Beta Player")], db_file)
+    assert name_store.load_mapping(db_file) == {"B. Player": "Beta Player"}
+
+
+def test_auto_mappings_keep_the_first_mapping(db_file):
+    name_store.approve_mapping("A. Player", "Alpha Player", db_file)
+    name_store.upsert_mappings([("A. Player", "Alfa Player"), ("B. Player", "Beta Player")],
+                               db_file)
+    assert name_store.load_mapping(db_file) == {"A. Player": "Alpha Player",
+                                                "B. Player": "Beta Player"}
+
+
+def test_approval_replaces_a_mapping(db_file):
+    name_store.upsert_mappings([("A. Player", "Alfa Player")], db_file)
+    name_store.upsert_pending([name_store.pending_row("A. Player", [("Alpha Player", 95)])],
+                              db_file)
+    name_store.approve_mapping("A. Player", "Alpha Player", db_file)
+    assert name_store.load_mapping(db_file) == {"A. Player": "Alpha Player"}
+    assert name_store.load_pending(db_file).empty
@@ -0,0 +1,122 @@
+# tests/test_odds_ingest.py
+
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+from functions.sim_prep.odds_ingest import (
+    HttpJsonProvider, OddsIngestionService, OddsProvider, devig, parse_quotes
+)
+
+CONTEXT = pd.DataFrame({
+    "Name": ["Bernarda Pera", "Evgeniya Rodina"],
+    "Opponent": ["Evgeniya Rodina", "Bernarda Pera"],
+    "Surface": ["Clay", "Clay"],
+    "ImpliedWinPercentage": [65, 35],
+})
+
+
+@pytest.fixture
+def stub_feed():
+    """Local HTTP server serving the quotes list it yields (mutable)."""
+    quotes = [{"player": "Bernarda Pera", "opponent": "Evgeniya Rodina",
+               "player_odds": -180, "opponent_odds": 150}]
+
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/odds":
+                self.send_error(404)
+                return
+            body = json.dumps(quotes).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", quotes
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def context_file(tmp_path):
+    path = tmp_path / "match_context.csv"
+    CONTEXT.to_csv(path, index=False)
+    return str(path)
+
+
+def test_devig_sums_to_100():
+    a, b = devig(-180, 150)
+    assert a + b == pytest.approx(100)
+    assert a > b
+
+
+def test_parse_quotes_accepts_aliases_and_drops_incomplete():
+    quotes = parse_quotes({"quotes": [
+        {"home": "A", "away": "B", "home_odds": -110, "away_odds": -110, "surface": "Hard"},
+        {"player": "C", "opponent": "D", "player_odds": 120},
+    ]})
+    assert quotes == [{"Name": "A", "Opponent": "B", "NameOdds": -110, "OpponentOdds": -110,
+                       "Surface": "Hard"}]
+
+
+def test_provider_is_abstract():
+    with pytest.raises(TypeError):
+        OddsProvider()
+
+
+def test_run_once_updates_both_rows(stub_feed, context_file):
+    url, _ = stub_feed
+    service = OddsIngestionService([HttpJsonProvider(url + "/odds")], context_file=context_file)
+    assert asyncio.run(service.run_once()) == 2
+
+    df = pd.read_csv(context_file)
+    expected = devig(-180, 150)
+    assert df["ImpliedWinPercentage"].tolist() == [round(expected[0], 2), round(expected[1], 2)]
+    # Unchanged odds change nothing
+    assert asyncio.run(service.run_once()) == 0
+
+
+def test_run_once_survives_a_failing_provider(stub_feed, context_file):
+    url, _ = stub_feed
+    providers = [HttpJsonProvider(url + "/missing"), HttpJsonProvider(url + "/odds")]
+    service = OddsIngestionService(providers, context_file=context_file)
+    assert asyncio.run(service.run_once()) == 2
+
+
+def test_run_adds_new_matches_and_calls_on_update(stub_feed, context_file):
+    url, quotes = stub_feed
+    quotes.append({"player": "Elise Mertens", "opponent": "Alycia Parks",
+                   "player_odds": -150, "opponent_odds": 130, "surface": "Grass"})
+    updates = []
+
+    async def scenario():
+        done = asyncio.Event()
+
+        def on_update(changed):
+            updates.append(changed)
+            done.set()
+
+        service = OddsIngestionService([HttpJsonProvider(url + "/odds", interval=0.05)],
+                                       context_file=context_file, debounce=0.0,
+                                       on_update=on_update)
+        task = asyncio.create_task(service.run())
+        await asyncio.wait_for(done.wait(), timeout=10)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(scenario())
+    assert updates[0] == 4
+    df = pd.read_csv(context_file)
+    assert len(df) == 4
+    assert set(df["Name"]) == {"Bernarda Pera", "Evgeniya Rodina", "Elise Mertens", "Alycia Parks"}
@@ -0,0 +1,62 @@
+# tests/test_sim_cache.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from functions import sim_cache
+from functions.sim_cache import SimCache, simulate_slate_cached, simulate_to_disk_cached
+
+
+@pytest.fixture
+def df():
+    return pd.read_csv("data/sim_ready.csv").head(8)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SimCache(str(tmp_path / "sims"))
+
+
+# The points engine also reads the opponent's stats from the mirrored row
+@pytest.mark.parametrize("engine, dirty", [("poisson", [3]), ("points", [2, 3])])
+def test_only_changed_matches_are_resimulated(df, cache, engine, dirty):
+    first = simulate_slate_cached(df, 2000, engine=engine, cache=cache)
+    assert len(first["resimulated"]) == len(df)
+
+    changed = df.copy()
+    changed.loc[3, "Elo"] += 50
+    changed.loc[3, "ServiceGamesWon"] += 0.05
+    second = simulate_slate_cached(changed, 2000, engine=engine, cache=cache)
+    assert second["resimulated"].tolist() == dirty
+    unchanged = np.setdiff1d(np.arange(16), [2 * j + side for j in dirty for side in (0, 1)])
+    np.testing.assert_array_equal(second["scores"][:, unchanged], first["scores"][:, unchanged])
+
+
+def test_match_won_is_one_side_per_match(df, cache):
+    result = simulate_slate_cached(df, 2000, cache=cache)
+    won = result["events"]["match_won"]
+    np.testing.assert_array_equal(won[:, 0::2] + won[:, 1::2], 1)
+
+
+def test_disk_results_match_in_memory_slate(df, cache, tmp_path):
+    expected = simulate_slate_cached(df, 2500, cache=cache)
+    results = simulate_to_disk_cached(df, 2500, str(tmp_path / "results"), cache=cache,
+                                      chunk_size=1000)
+    assert results.n_sims == 2500
+    np.testing.assert_array_equal(np.asarray(results.scores), expected["scores"])
+    summary = results.stats().summary()
+    assert summary["WinRate"].notna().all()
+
+
+def test_entry_evicted_before_read_is_resimulated(df, cache, tmp_path, monkeypatch):
+    expected = simulate_slate_cached(df, 1000, cache=cache)
+    read_chunk = sim_cache._read_chunk
+
+    def evict_then_read(cache, slate, start, stop):
+        cache.clear()  # another process emptied the store in between
+        return read_chunk(cache, slate, start, stop)
+
+    monkeypatch.setattr(sim_cache, "_read_chunk", evict_then_read)
+    results = simulate_to_disk_cached(df, 1000, str(tmp_path / "results"), cache=cache)
+    np.testing.assert_array_equal(np.asarray(results.scores), expected["scores"])
@@ -0,0 +1,66 @@
+# tests/test_sim_stats.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from functions.sim import simulate_all_matches_batch
+from functions.sim_stats import HIST_BIN_WIDTH, SimStats, stats_from_chunks
+
+
+@pytest.fixture(scope="module")
+def chunks():
+    df = pd.read_csv("data/sim_ready.csv").head(6)
+    batches = [simulate_all_matches_batch(df, n_sims=n, rng=i, return_events=True)
+               for i, n in enumerate([3000, 1, 2500, 4000])]
+    return batches
+
+
+def test_streamed_moments_match_concatenated_matrix(chunks):
+    stats = stats_from_chunks(chunks[0]["players"],
+                              [(b["scores"], b["events"]["match_won"]) for b in chunks])
+    scores = np.concatenate([b["scores"] for b in chunks]).astype(np.float64)
+
+    assert stats.n == len(scores)
+    np.testing.assert_allclose(stats.mean, scores.mean(axis=0), rtol=1e-10)
+    np.testing.assert_allclose(stats.covariance(), np.cov(scores, rowvar=False),
+                               rtol=1e-8, atol=1e-8)
+    np.testing.assert_allclose(stats.correlation(), np.corrcoef(scores, rowvar=False), atol=1e-8)
+    np.testing.assert_array_equal(stats.min, scores.min(axis=0))
+    np.testing.assert_array_equal(stats.max, scores.max(axis=0))
+
+
+@pytest.mark.parametrize("q", [0.1, 0.5, 0.9])
+def test_quantiles_within_one_bin(chunks, q):
+    stats = SimStats(chunks[0]["players"])
+    for b in chunks:
+        stats.update(b["scores"])
+    scores = np.concatenate([b["scores"] for b in chunks])
+    expected = np.percentile(scores, 100 * q, axis=0)
+    assert np.abs(stats.quantile(q) - expected).max() <= HIST_BIN_WIDTH + 1e-6
+
+
+def test_win_rate_needs_every_chunk_with_events(chunks):
+    won = np.concatenate([b["events"]["match_won"] for b in chunks])
+    full = stats_from_chunks(chunks[0]["players"],
+                             [(b["scores"], b["events"]["match_won"]) for b in chunks])
+    np.testing.assert_allclose(full.win_rate(), won.mean(axis=0))
+
+    partial = SimStats(chunks[0]["players"])
+    partial.update(chunks[0]["scores"], chunks[0]["events"]["match_won"])
+    partial.update(chunks[1]["scores"])
+    assert np.isnan(partial.win_rate()).all()
+
+
+def test_merge_and_save_round_trip(chunks, tmp_path):
+    players = chunks[0]["players"]
+    left = stats_from_chunks(players, [b["scores"] for b in chunks[:2]])
+    right = stats_from_chunks(players, [b["scores"] for b in chunks[2:]])
+    merged = left.merge(right)
+    whole = stats_from_chunks(players, [b["scores"] for b in chunks])
+    np.testing.assert_allclose(merged.covariance(), whole.covariance(), rtol=1e-8, atol=1e-8)
+
+    path = str(tmp_path / "stats.npz")
+    merged.save(path)
+    loaded = SimStats.load(path)
+    pd.testing.assert_frame_equal(loaded.summary(), merged.summary())